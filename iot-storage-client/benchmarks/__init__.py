@@ -0,0 +1 @@
+"""benchmarks for the iot storage clients"""
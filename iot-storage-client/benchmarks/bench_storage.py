@@ -0,0 +1,321 @@
+"""
+benchmark the sync and async storage clients against a local blob emulator
+and write the latency and throughput of each operation as json
+
+    python -m benchmarks.bench_storage --output results.json
+    python -m benchmarks.bench_storage --baseline results.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence
+
+from iot.storage.client import (
+    CredentialType,
+    IoTStorageClient,
+    IoTStorageClientAsync,
+    LocationType,
+    __version__,
+)
+
+# the well-known development account of the azurite emulator
+AZURITE_CONNECTION_STRING = (
+    "DefaultEndpointsProtocol=http;AccountName=devstoreaccount1;"
+    "AccountKey=Eby8vdM02xNOcqFlqUwJPLlmEtlCDXJ1OUzFT50uSRZ6IFsuFq2UVErCz4I6tq/"
+    "K1SZFPTOtr/KBHBeksoGMGw==;"
+    "BlobEndpoint=http://127.0.0.1:10000/devstoreaccount1;"
+)
+
+DEFAULT_SIZES = [1024, 1024 * 1024, 16 * 1024 * 1024]
+DEFAULT_COUNTS = [10, 100]
+
+Call = Callable[..., Awaitable]
+
+
+def percentile(samples: Sequence[float], pct: float) -> float:
+    """nearest-rank percentile of samples"""
+    ordered = sorted(samples)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def summarize(
+    client: str, operation: str, samples: List[float], size: int, count: int
+) -> Dict:
+    """latency percentiles and throughput of one operation's timed calls"""
+    total = sum(samples)
+    moved = size * count if operation not in ("list_files", "delete_dir") else 0
+    return {
+        "client": client,
+        "operation": operation,
+        "size": size,
+        "count": count,
+        "runs": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+        "mean_ms": round(total / len(samples) * 1000, 3),
+        "ops_per_sec": round(len(samples) / total, 3) if total else None,
+        "mb_per_sec": (
+            round(moved * len(samples) / total / 1e6, 3) if moved and total else None
+        ),
+    }
+
+
+def compare(results: List[Dict], baseline: List[Dict], tolerance: float) -> List[str]:
+    """describe every operation whose p50 latency regressed past tolerance"""
+
+    def key(result: Dict):
+        return result["client"], result["operation"], result["size"], result["count"]
+
+    previous = {key(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get(key(result))
+        if before and result["p50_ms"] > before["p50_ms"] * (1 + tolerance):
+            regressions.append(
+                "{} {} size={} count={}: p50 {}ms -> {}ms".format(
+                    *key(result), before["p50_ms"], result["p50_ms"]
+                )
+            )
+    return regressions
+
+
+def make_file(path: str, size: int) -> str:
+    """write size random bytes to path"""
+    with open(path, "wb") as file:
+        file.write(os.urandom(size))
+    return path
+
+
+def make_dir(path: str, count: int, size: int) -> str:
+    """write count files of size random bytes under path"""
+    os.makedirs(path, exist_ok=True)
+    for index in range(count):
+        make_file(os.path.join(path, f"{index:05d}.bin"), size)
+    return path
+
+
+async def timed(samples: List[float], call: Call, func: Callable, *args) -> None:
+    """time one client call, failing the benchmark if the call failed"""
+    start = time.perf_counter()
+    result = await call(func, *args)
+    samples.append(time.perf_counter() - start)
+    if result is False or result is None:
+        raise Exception(f"{func.__name__} failed during the benchmark")
+
+
+async def run_scenarios(
+    client: str,
+    storage_client,
+    call: Call,
+    workdir: str,
+    sizes: List[int],
+    counts: List[int],
+    repeat: int,
+) -> List[Dict]:
+    """run every operation against one client in a fresh container"""
+    container = f"bench-{client}-{uuid.uuid4().hex[:8]}"
+    await call(storage_client.create_container, container)
+    results = []
+    try:
+        for size in sizes:
+            source = make_file(os.path.join(workdir, f"{size}.bin"), size)
+            download = os.path.join(workdir, "download.bin")
+            samples = {"upload_file": [], "download_file": [], "copy_file": []}
+            for run in range(repeat):
+                name = f"files/{size}/{run}.bin"
+                await timed(
+                    samples["upload_file"],
+                    call,
+                    storage_client.upload_file,
+                    container,
+                    source,
+                    name,
+                )
+                await timed(
+                    samples["download_file"],
+                    call,
+                    storage_client.download_file,
+                    container,
+                    name,
+                    download,
+                )
+                await timed(
+                    samples["copy_file"],
+                    call,
+                    storage_client.copy_file,
+                    container,
+                    name,
+                    container,
+                    f"copies/{size}/{run}.bin",
+                )
+            results += [
+                summarize(client, operation, operation_samples, size, 1)
+                for operation, operation_samples in samples.items()
+            ]
+
+        # directory operations use the smallest file size
+        size = min(sizes)
+        for count in counts:
+            source = make_dir(os.path.join(workdir, f"dir-{count}"), count, size)
+            samples = {"upload_dir": [], "list_files": [], "delete_dir": []}
+            for run in range(repeat):
+                prefix = f"dirs/{count}/{run}"
+                await timed(
+                    samples["upload_dir"],
+                    call,
+                    storage_client.upload_dir,
+                    container,
+                    source,
+                    prefix,
+                )
+                await timed(
+                    samples["list_files"],
+                    call,
+                    storage_client.list_files,
+                    container,
+                    prefix,
+                    True,
+                )
+                await timed(
+                    samples["delete_dir"],
+                    call,
+                    storage_client.delete_dir,
+                    container,
+                    prefix,
+                )
+            results += [
+                summarize(client, operation, operation_samples, size, count)
+                for operation, operation_samples in samples.items()
+            ]
+    finally:
+        await call(storage_client.delete_container, container)
+    return results
+
+
+async def call_sync(func: Callable, *args):
+    """call a sync client method, nothing else runs on the loop meanwhile"""
+    return func(*args)
+
+
+async def call_async(func: Callable, *args):
+    """await an async client method"""
+    return await func(*args)
+
+
+async def bench(
+    connection_string: str,
+    clients: List[str],
+    sizes: List[int],
+    counts: List[int],
+    repeat: int,
+) -> List[Dict]:
+    """benchmark each requested client in turn"""
+    options = dict(
+        credential_type=CredentialType.CONNECTION_STRING,
+        location_type=LocationType.CLOUD_BASED,
+        account_name="",
+        credential=connection_string,
+        raise_errors=True,
+    )
+    results = []
+    workdir = tempfile.mkdtemp(prefix="iot-storage-bench-")
+    try:
+        if "sync" in clients:
+            storage_client = IoTStorageClient(**options)
+            try:
+                results += await run_scenarios(
+                    "sync", storage_client, call_sync, workdir, sizes, counts, repeat
+                )
+            finally:
+                storage_client.close()
+        if "async" in clients:
+            async with IoTStorageClientAsync(**options) as storage_client:
+                results += await run_scenarios(
+                    "async", storage_client, call_async, workdir, sizes, counts, repeat
+                )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def parse_ints(value: str) -> List[int]:
+    """parse a comma separated list of integers"""
+    return [int(item) for item in value.split(",") if item]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--connection-string",
+        default=os.environ.get(
+            "AZURE_STORAGE_CONNECTION_STRING", AZURITE_CONNECTION_STRING
+        ),
+        help="storage account to benchmark, azurite on localhost by default",
+    )
+    parser.add_argument("--clients", default="sync,async")
+    parser.add_argument(
+        "--sizes",
+        type=parse_ints,
+        default=DEFAULT_SIZES,
+        help="comma separated file sizes in bytes",
+    )
+    parser.add_argument(
+        "--counts",
+        type=parse_ints,
+        default=DEFAULT_COUNTS,
+        help="comma separated numbers of files for directory operations",
+    )
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", help="write the results to this json file")
+    parser.add_argument(
+        "--baseline", help="exit non-zero if p50 latencies regressed from this file"
+    )
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(
+        bench(
+            args.connection_string,
+            args.clients.split(","),
+            args.sizes,
+            args.counts,
+            args.repeat,
+        )
+    )
+    report = {
+        "version": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "repeat": args.repeat,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.baseline:
+        with open(args.baseline, "r") as file:
+            baseline = json.load(file)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"regression: {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,29 @@
 from ._aioclient import IoTStorageClientAsync
+from ._append import AppendBlobWriter
 from ._client import IoTStorageClient
-from ._types import CredentialType, LocationType
+from ._exceptions import (
+    CircuitOpenError,
+    ConflictError,
+    IoTStorageError,
+    NotFoundError,
+    ThrottledError,
+    TransientError,
+)
+from ._instrumentation import (
+    CallbackInstrumentation,
+    Instrumentation,
+    MetricsRecorder,
+    OpenTelemetryInstrumentation,
+    OperationRecord,
+)
+from ._queue import UploadQueue
+from ._registry import ClientRegistry, client_registry
+from ._retry import RetryPolicy
+from ._types import (
+    CompressionType,
+    CredentialType,
+    LocationType,
+    SyncDirection,
+    SyncStatus,
+)
 from ._version import __version__
@@ -1,28 +1,73 @@
 """wrapper for azure blob storage async interactions"""
 
+import asyncio
+import functools
 import os
 import tempfile
-import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import List, Optional, Union
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple, Union
 
+import aiohttp
+from azure.core import MatchConditions
+from azure.core.exceptions import (
+    HttpResponseError,
+    ResourceExistsError,
+    ResourceNotFoundError,
+)
 from azure.storage.blob import (
+    BlobBlock,
+    BlobProperties,
     ContentSettings,
     BlobSasPermissions,
     generate_blob_sas,
     generate_container_sas,
 )
-from azure.storage.blob.aio import BlobClient, BlobServiceClient, ContainerClient
+from azure.core.pipeline.transport import AioHttpTransport
+from azure.storage.blob.aio import (
+    BlobClient,
+    BlobPrefix,
+    BlobServiceClient,
+    ContainerClient,
+    StorageStreamDownloader,
+)
 
+from ._blocks import BlockRange, plan_blocks, upload_block_ids
+from ._buffers import BufferWriter, as_view, split_view
+from ._cache import CachedProperties, PropertiesCache
+from ._checkpoint import DownloadCheckpoint
+from ._compression import (
+    StoredEncodingPolicy,
+    compress_file,
+    decompress_file,
+    is_compressed,
+    should_compress,
+)
+from ._exceptions import classify_error, copy_unsupported
+from ._fileio import allocate_file, read_at, read_file, write_at
 from ._helpers import (
+    LISTING_THRESHOLD,
     generate_cloud_conn_str,
     generate_cloud_sas_url,
     generate_edge_conn_str,
     generate_edge_sas_url,
     generate_local_conn_str,
     generate_local_sas_url,
+    split_batches,
+    walk_upload_paths,
+)
+from ._instrumentation import (
+    Instrumentation,
+    count_transfer,
+    instrumented,
+    note_error,
 )
-from ._types import CredentialType, LocationType
+from ._listing import BlobTree, merge_listings, parent_dirs
+from ._poller import CopyPoller
+from ._retry import AsyncRetryPipelinePolicy, RetryPolicy
+from ._sas import SasTokenCache, sas_expiry
+from ._sync import SyncManifest, file_md5, is_unchanged, pair_paths
+from ._types import CredentialType, LocationType, SyncDirection, SyncStatus
 
 
 class IoTStorageClientAsync:
@@ -37,6 +82,15 @@ class IoTStorageClientAsync:
     module: Optional[str] = None
     host: Optional[str] = None
     port: Optional[str] = None
+    max_chunk_size: int = 4 * 1024 * 1024
+    connection_pool_limit: int = 100
+    connection_pool_limit_per_host: int = 0
+    properties_cache: Optional[PropertiesCache] = None
+    sas_cache: Optional[SasTokenCache] = None
+    retry_policy: Optional[RetryPolicy] = None
+    raise_errors: bool = False
+    instrumentation: Optional[Instrumentation] = None
+    file_io_workers: int = 4
 
     service_client: BlobServiceClient
     container_client: ContainerClient
@@ -51,6 +105,16 @@ class IoTStorageClientAsync:
         module: Optional[str] = None,
         host: Optional[str] = None,
         port: Optional[str] = None,
+        max_chunk_size: Optional[int] = 4 * 1024 * 1024,
+        connection_pool_limit: Optional[int] = 100,
+        connection_pool_limit_per_host: Optional[int] = 0,
+        cache_ttl: Optional[float] = None,
+        cache_max_entries: Optional[int] = 1024,
+        sas_refresh_margin: Optional[float] = 300.0,
+        retry_policy: Optional[RetryPolicy] = None,
+        raise_errors: Optional[bool] = False,
+        instrumentation: Optional[Instrumentation] = None,
+        file_io_workers: Optional[int] = 4,
     ) -> None:
         self.credential_type = credential_type
         self.location_type = location_type
@@ -59,6 +123,26 @@ class IoTStorageClientAsync:
         self.module = module
         self.host = host
         self.port = port
+        self.max_chunk_size = max_chunk_size
+        self.connection_pool_limit = connection_pool_limit
+        self.connection_pool_limit_per_host = connection_pool_limit_per_host
+        self.properties_cache = (
+            PropertiesCache(cache_ttl, cache_max_entries) if cache_ttl else None
+        )
+        self.sas_cache = (
+            SasTokenCache(sas_refresh_margin)
+            if sas_refresh_margin is not None
+            else None
+        )
+        self.retry_policy = retry_policy
+        self.raise_errors = raise_errors
+        self.instrumentation = instrumentation
+        self.file_io_workers = file_io_workers
+        self._opened = False
+        self._open_lock = None
+        self._loop = None
+        self._file_executor = None
+        self._copy_poller = CopyPoller()
         self.instantiate_service_client()
 
     def __repr__(self) -> str:
@@ -71,12 +155,32 @@ class IoTStorageClientAsync:
             f"credential: {self.credential[0:5]}****"
         )
 
+    async def __aenter__(self) -> "IoTStorageClientAsync":
+        await self.open()
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.close()
+
+    def _retry_pipeline_policy(self) -> Optional[AsyncRetryPipelinePolicy]:
+        """the pipeline policy for retry_policy, none for the sdk's default"""
+        return self.retry_policy.async_pipeline_policy() if self.retry_policy else None
+
     def instantiate_service_client(self) -> None:
         """init service_client based on credential and location types"""
+        # a single long-lived transport is shared by every call,
+        # its session is created by `open` and closed by `close`
+        self._transport = AioHttpTransport()
         if self.credential_type == CredentialType.CONNECTION_STRING:
             self.connection_string = self.credential
             self.service_client = BlobServiceClient.from_connection_string(
-                self.credential
+                self.credential,
+                max_single_get_size=self.max_chunk_size,
+                max_chunk_get_size=self.max_chunk_size,
+                transport=self._transport,
+                retry_policy=self._retry_pipeline_policy(),
+                raw_response_hook=count_transfer,
+                _additional_pipeline_policies=[StoredEncodingPolicy()],
             )
         else:
             if self.location_type == LocationType.CLOUD_BASED:
@@ -91,7 +195,13 @@ class IoTStorageClientAsync:
                 )
                 self.connection_string = connection_string
                 self.service_client = BlobServiceClient.from_connection_string(
-                    connection_string
+                    connection_string,
+                    max_single_get_size=self.max_chunk_size,
+                    max_chunk_get_size=self.max_chunk_size,
+                    transport=self._transport,
+                    retry_policy=self._retry_pipeline_policy(),
+                    raw_response_hook=count_transfer,
+                    _additional_pipeline_policies=[StoredEncodingPolicy()],
                 )
             if self.location_type == LocationType.EDGE_BASED:
                 connection_string = generate_edge_conn_str(
@@ -107,7 +217,13 @@ class IoTStorageClientAsync:
                 )
                 self.connection_string = connection_string
                 self.service_client = BlobServiceClient.from_connection_string(
-                    connection_string
+                    connection_string,
+                    max_single_get_size=self.max_chunk_size,
+                    max_chunk_get_size=self.max_chunk_size,
+                    transport=self._transport,
+                    retry_policy=self._retry_pipeline_policy(),
+                    raw_response_hook=count_transfer,
+                    _additional_pipeline_policies=[StoredEncodingPolicy()],
                 )
             if self.location_type == LocationType.LOCAL_BASED:
                 connection_string = generate_local_conn_str(
@@ -123,65 +239,284 @@ class IoTStorageClientAsync:
                 )
                 self.connection_string = connection_string
                 self.service_client = BlobServiceClient.from_connection_string(
-                    connection_string
+                    connection_string,
+                    max_single_get_size=self.max_chunk_size,
+                    max_chunk_get_size=self.max_chunk_size,
+                    transport=self._transport,
+                    retry_policy=self._retry_pipeline_policy(),
+                    raw_response_hook=count_transfer,
+                    _additional_pipeline_policies=[StoredEncodingPolicy()],
                 )
 
+    async def open(self) -> None:
+        """open the pooled connection shared by every call on this client"""
+        if self._opened and self._loop is asyncio.get_running_loop():
+            return
+        stale = self._bind_loop()
+        async with self._open_lock:
+            if stale:
+                await self._close_stale()
+            if self._opened:
+                return
+            self._transport.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.connection_pool_limit,
+                    limit_per_host=self.connection_pool_limit_per_host,
+                ),
+                cookie_jar=aiohttp.DummyCookieJar(),
+                auto_decompress=False,
+                trust_env=True,
+            )
+            await self.service_client.__aenter__()
+            self._opened = True
+
+    async def close(self) -> None:
+        """close the pooled connection, it is reopened by the next call"""
+        if self._file_executor is not None:
+            self._file_executor.shutdown(wait=False)
+            self._file_executor = None
+        stale = self._bind_loop()
+        async with self._open_lock:
+            if stale:
+                await self._close_stale()
+            if not self._opened:
+                return
+            self._opened = False
+            await self.service_client.close()
+
+    def _bind_loop(self) -> bool:
+        """
+        move the client to the running event loop, true if its session was
+        left open on another one - the lock and session only work on the
+        loop that made them, so a client reused from a later asyncio.run
+        starts over
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return False
+        self._loop = loop
+        self._open_lock = asyncio.Lock()
+        stale, self._opened = self._opened, False
+        return stale
+
+    async def _close_stale(self) -> None:
+        """close a session opened on an event loop that has since finished"""
+        try:
+            await self.service_client.close()
+        except RuntimeError as ex:
+            # its loop is closed, the sockets go when the session is collected
+            print(f"unable to close stale connection: {ex}")
+
+    def _handle_error(self, ex: Exception) -> None:
+        """raise ex as a typed error when raise_errors is set, else print it"""
+        note_error(ex)
+        if self.raise_errors:
+            error = classify_error(ex)
+            if error is ex:
+                raise error
+            raise error from ex
+        print(f"unexpected exception occurred: {ex}")
+
+    async def _run_io(self, func: Callable, *args, **kwargs):
+        """run blocking local file work on the client's own executor"""
+        if self._file_executor is None:
+            self._file_executor = ThreadPoolExecutor(
+                max_workers=max(1, self.file_io_workers),
+                thread_name_prefix="iot-storage-io",
+            )
+        return await asyncio.get_running_loop().run_in_executor(
+            self._file_executor, functools.partial(func, *args, **kwargs)
+        )
+
+    @instrumented
     async def container_exists(self, container_name: str) -> bool:
         """check if a container exists"""
         try:
-            async with self.service_client:
-                container_client = self.service_client.get_container_client(
-                    container=container_name
-                )
-                exists = await container_client.exists()
-                return exists
+            if self.properties_cache is not None:
+                return (await self._cached_properties(container_name)).exists
+            await self.open()
+            container_client = self.service_client.get_container_client(
+                container=container_name
+            )
+            exists = await container_client.exists()
+            return exists
         except Exception as ex:
-            print(f"unexpected exception occurred: {ex}")
-            pass
+            self._handle_error(ex)
         return False
 
+    @instrumented
     async def file_exists(self, container_name: str, file_name: str) -> bool:
         """check if a file exists"""
         try:
-            async with self.service_client:
-                blob_client = self.service_client.get_blob_client(
-                    container=container_name, blob=file_name
-                )
-                exists = await blob_client.exists()
-                return exists
+            if self.properties_cache is not None:
+                return (await self._cached_properties(container_name, file_name)).exists
+            await self.open()
+            blob_client = self.service_client.get_blob_client(
+                container=container_name, blob=file_name
+            )
+            exists = await blob_client.exists()
+            return exists
         except Exception as ex:
-            print(f"unexpected exception occurred: {ex}")
-            pass
+            self._handle_error(ex)
         return False
 
-    async def create_container(self, container_name: str) -> bool:
-        """create a new container"""
+    @instrumented
+    async def files_exist(
+        self,
+        container_name: str,
+        names: List[str],
+        max_concurrency: Optional[int] = 16,
+        use_listing: Optional[bool] = None,
+    ) -> Union[Dict[str, bool], None]:
+        """check if many files exist, keyed by blob name"""
+        results = await self.get_properties_many(
+            container_name, names, max_concurrency, use_listing
+        )
+        if results is None:
+            return None
+        return {name: props is not None for name, props in results.items()}
+
+    @instrumented
+    async def get_properties_many(
+        self,
+        container_name: str,
+        names: List[str],
+        max_concurrency: Optional[int] = 16,
+        use_listing: Optional[bool] = None,
+    ) -> Union[Dict[str, Optional[BlobProperties]], None]:
+        """
+        get the properties of many files, keyed by blob name with none for
+        missing files, from one listing pass or concurrent head requests
+        """
         try:
-            async with self.service_client:
+            await self.open()
+            container_client = self.service_client.get_container_client(
+                container=container_name
+            )
+            wanted = list(dict.fromkeys(names))
+            results = {name: None for name in wanted}
+            if not wanted:
+                return results
+
+            prefix = os.path.commonprefix(wanted)
+            if use_listing is None:
+                use_listing = bool(prefix) and len(wanted) >= LISTING_THRESHOLD
+            if use_listing:
+                # listings are sorted, stop once past the last wanted name
+                last = max(wanted)
+                async for blob in container_client.list_blobs(name_starts_with=prefix):
+                    if blob.name > last:
+                        break
+                    if blob.name in results:
+                        results[blob.name] = blob
+            else:
+                semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+                async def head(name: str) -> None:
+                    async with semaphore:
+                        blob_client = container_client.get_blob_client(name)
+                        try:
+                            results[name] = await blob_client.get_blob_properties()
+                        except ResourceNotFoundError:
+                            pass
+
+                await asyncio.gather(*[head(name) for name in wanted])
+
+            if self.properties_cache is not None:
+                for name, props in results.items():
+                    self.properties_cache.put(
+                        container_name,
+                        name,
+                        CachedProperties.from_properties(props)
+                        if props is not None
+                        else CachedProperties(exists=False),
+                    )
+            return results
+        except Exception as ex:
+            self._handle_error(ex)
+        return None
+
+    async def _cached_properties(
+        self, container_name: str, blob: Optional[str] = None
+    ) -> CachedProperties:
+        """properties from the cache, fetched or revalidated once stale"""
+        entry, fresh = self.properties_cache.get(container_name, blob)
+        if fresh:
+            return entry
+        # requests must go through the pooled session, not the sdk's default one
+        await self.open()
+        try:
+            if blob is None:
                 container_client = self.service_client.get_container_client(
                     container=container_name
                 )
-                await container_client.create_container()
-                return True
+                props = await container_client.get_container_properties()
+            else:
+                blob_client = self.service_client.get_blob_client(
+                    container=container_name, blob=blob
+                )
+                if entry is not None and entry.etag:
+                    # a 304 confirms the cached entry without resending it
+                    props = await blob_client.get_blob_properties(
+                        etag=entry.etag, match_condition=MatchConditions.IfModified
+                    )
+                else:
+                    props = await blob_client.get_blob_properties()
+            entry = CachedProperties.from_properties(props)
+        except ResourceNotFoundError:
+            entry = CachedProperties(exists=False)
+        except HttpResponseError as ex:
+            # the sdk raises a 304 as a plain or condition error
+            if ex.status_code != 304 or entry is None:
+                raise
+        self.properties_cache.put(container_name, blob, entry)
+        return entry
+
+    def _invalidate(
+        self, container_name: str, blobs: Optional[List[str]] = None
+    ) -> None:
+        """drop cached properties of blobs, or a whole container, after a write"""
+        if self.properties_cache is None:
+            return
+        if blobs is None:
+            self.properties_cache.invalidate(container_name)
+            return
+        for blob in blobs:
+            self.properties_cache.invalidate(container_name, blob)
+
+    @instrumented
+    async def create_container(self, container_name: str) -> bool:
+        """create a new container"""
+        try:
+            await self.open()
+            container_client = self.service_client.get_container_client(
+                container=container_name
+            )
+            await container_client.create_container()
+            return True
         except Exception as ex:
-            print(f"unexpected exception occurred: {ex}")
-            pass
+            self._handle_error(ex)
+        finally:
+            self._invalidate(container_name)
         return False
 
+    @instrumented
     async def delete_container(self, container_name: str) -> bool:
         """delete a container"""
         try:
-            async with self.service_client:
-                container_client = self.service_client.get_container_client(
-                    container=container_name
-                )
-                await container_client.delete_container()
-                return True
+            await self.open()
+            container_client = self.service_client.get_container_client(
+                container=container_name
+            )
+            await container_client.delete_container()
+            return True
         except Exception as ex:
-            print(f"unexpected exception occurred: {ex}")
-            pass
+            self._handle_error(ex)
+        finally:
+            self._invalidate(container_name)
         return False
 
+    @instrumented
     async def download(self, container_name: str, source: str, dest: str) -> bool:
         """download a file or directory to a path on the local filesystem"""
         try:
@@ -206,60 +541,359 @@ class IoTStorageClientAsync:
                 await self.download_file(container_name, source, dest)
             return True
         except Exception as ex:
-            print(f"unexpected exception occurred: {ex}")
-            pass
+            self._handle_error(ex)
         return False
 
-    async def download_file(self, container_name: str, source: str, dest: str) -> bool:
+    @instrumented
+    async def download_file(
+        self,
+        container_name: str,
+        source: str,
+        dest: str,
+        max_concurrency: Optional[int] = 1,
+        resumable: Optional[bool] = False,
+        range_size: Optional[int] = 4 * 1024 * 1024,
+        decompress: Optional[bool] = True,
+    ) -> bool:
         """download a file to a path on the local filesystem"""
         try:
             if dest.endswith("."):
                 dest += "/"
             blob_dest = dest + os.path.basename(source) if dest.endswith("/") else dest
 
-            os.makedirs(os.path.dirname(blob_dest), exist_ok=True)
+            await self._run_io(
+                os.makedirs, os.path.dirname(blob_dest) or ".", exist_ok=True
+            )
 
-            async with self.service_client:
-                blob_client = self.service_client.get_blob_client(
-                    container=container_name, blob=source
-                )
+            await self.open()
+            blob_client = self.service_client.get_blob_client(
+                container=container_name, blob=source
+            )
 
-                if not dest.endswith("/"):
-                    with open(blob_dest, "wb") as file:
-                        data = await blob_client.download_blob()
-                        file.write(data.readall())
-                    return True
-                return False
+            if not dest.endswith("/"):
+                if resumable or max_concurrency > 1:
+                    encoding = await self._download_ranges(
+                        blob_client,
+                        blob_dest,
+                        max_concurrency,
+                        range_size if resumable else self.max_chunk_size,
+                        resumable,
+                    )
+                else:
+                    data = await blob_client.download_blob()
+                    await self._write_chunks(data, blob_dest)
+                    encoding = data.properties.content_settings.content_encoding
+                if decompress and is_compressed(encoding):
+                    await self._run_io(decompress_file, blob_dest, encoding)
+                return True
+            return False
         except Exception as ex:
-            print(f"unexpected exception occurred: {ex}")
-            pass
+            self._handle_error(ex)
         return False
 
+    async def _write_chunks(self, data: StorageStreamDownloader, dest: str) -> None:
+        """write downloaded chunks to disk while the next chunk downloads"""
+        file = await self._run_io(open, dest, "wb")
+        try:
+            await self._pipe_chunks(data, file)
+        finally:
+            await self._run_io(file.close)
+
+    async def _pipe_chunks(self, data: StorageStreamDownloader, stream) -> int:
+        """
+        write downloaded chunks to a stream while the next chunk downloads,
+        awaiting its write when it is async, returning the bytes written
+        """
+        pending = None
+        written = 0
+        async for chunk in data.chunks():
+            if pending is not None:
+                await pending
+            if asyncio.iscoroutinefunction(stream.write):
+                pending = asyncio.ensure_future(stream.write(chunk))
+            else:
+                pending = asyncio.ensure_future(self._run_io(stream.write, chunk))
+            written += len(chunk)
+        if pending is not None:
+            await pending
+        return written
+
+    async def _download_ranges(
+        self,
+        blob_client: BlobClient,
+        dest: str,
+        max_concurrency: int,
+        range_size: int,
+        resumable: bool,
+    ) -> Optional[str]:
+        """
+        download byte ranges concurrently, checkpointing each one when
+        resumable, returning the blob's content encoding
+        """
+        props = await blob_client.get_blob_properties()
+        if resumable:
+            checkpoint = await self._run_io(
+                DownloadCheckpoint.load, dest, props.etag, props.size, range_size
+            )
+        else:
+            checkpoint = DownloadCheckpoint(dest, props.etag, props.size, range_size)
+            await self._run_io(allocate_file, dest, props.size)
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def fetch(index: int, offset: int, length: int) -> None:
+            async with semaphore:
+                # fails with a 412 if the blob changed since the checkpoint
+                data = await blob_client.download_blob(
+                    offset=offset,
+                    length=length,
+                    etag=checkpoint.etag,
+                    match_condition=MatchConditions.IfNotModified,
+                )
+                await self._run_io(write_at, dest, offset, await data.readall())
+                if resumable:
+                    await self._run_io(checkpoint.mark, index)
+
+        await asyncio.gather(*[fetch(*item) for item in checkpoint.missing()])
+        if resumable:
+            await self._run_io(checkpoint.remove)
+        return props.content_settings.content_encoding
+
+    @instrumented
+    async def download_to_stream(
+        self,
+        container_name: str,
+        source: str,
+        stream,
+        offset: Optional[int] = None,
+        length: Optional[int] = None,
+        max_concurrency: Optional[int] = 1,
+    ) -> Optional[int]:
+        """download a file into a writable file-like object, returning the bytes written"""
+        try:
+            await self.open()
+            blob_client = self.service_client.get_blob_client(
+                container=container_name, blob=source
+            )
+            data = await blob_client.download_blob(
+                offset=offset, length=length, max_concurrency=max_concurrency
+            )
+            if max_concurrency > 1:
+                # the sdk writes concurrent chunks at their offsets itself
+                return await data.readinto(stream)
+            return await self._pipe_chunks(data, stream)
+        except Exception as ex:
+            self._handle_error(ex)
+        return None
+
+    @instrumented
+    async def download_into(
+        self,
+        container_name: str,
+        source: str,
+        buffer: Union[bytearray, memoryview],
+        offset: Optional[int] = None,
+        length: Optional[int] = None,
+        max_concurrency: Optional[int] = 1,
+    ) -> Optional[int]:
+        """download a file into a preallocated buffer, returning the bytes filled"""
+        try:
+            writer = BufferWriter(buffer)
+            await self.open()
+            blob_client = self.service_client.get_blob_client(
+                container=container_name, blob=source
+            )
+            data = await blob_client.download_blob(
+                offset=offset, length=length, max_concurrency=max_concurrency
+            )
+            if data.size > writer.capacity:
+                raise Exception(
+                    f"{source} needs {data.size} bytes, "
+                    f"the buffer holds {writer.capacity}"
+                )
+            # writes to memory are cheap enough to make on the event loop
+            return await data.readinto(writer)
+        except Exception as ex:
+            self._handle_error(ex)
+        return None
+
+    @instrumented
     async def upload(self, container_name: str, source: str, dest: str) -> bool:
         """upload a file or directory to a path inside the container"""
-        if os.path.isdir(source):
+        if await self._run_io(os.path.isdir, source):
             return await self.upload_dir(container_name, source, dest)
         else:
             return await self.upload_file(container_name, source, dest)
 
-    async def upload_dir(self, container_name: str, source: str, dest: str) -> bool:
-        """upload a directory to a path inside the container"""
-        try:
-            prefix = "" if dest == "" else dest + "/"
-            prefix + os.path.basename(source) + "/"
-            for root, dirs, files in os.walk(source):
-                for name in files:
-                    dir_part = os.path.relpath(root, source)
-                    dir_part = "" if dir_part == "." else dir_part + "/"
-                    file_path = os.path.join(root, name)
-                    blob_path = prefix + dir_part + name
-                    await self.upload_file(container_name, file_path, blob_path)
-            return True
+    @instrumented
+    async def upload_dir(
+        self,
+        container_name: str,
+        source: str,
+        dest: str,
+        max_concurrency: Optional[int] = 8,
+        progress_callback: Optional[Callable[[str, str, bool], None]] = None,
+    ) -> bool:
+        """upload a directory to a path inside the container concurrently"""
+        try:
+            semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+            async def upload(file_path: str, blob_path: str) -> bool:
+                async with semaphore:
+                    result = await self.upload_file(
+                        container_name, file_path, blob_path
+                    )
+                if progress_callback:
+                    progress_callback(file_path, blob_path, result)
+                return result
+
+            await self.open()
+            paths = await self._run_io(walk_upload_paths, source, dest)
+            results = await asyncio.gather(
+                *[upload(file_path, blob_path) for file_path, blob_path in paths]
+            )
+            return all(results)
         except Exception as ex:
-            print(f"unexpected exception occurred: {ex}")
-            pass
+            self._handle_error(ex)
         return False
 
+    @instrumented
+    async def sync_dir(
+        self,
+        container_name: str,
+        source: str,
+        dest: str,
+        direction: Optional[str] = SyncDirection.UPLOAD,
+        delete_orphans: Optional[bool] = False,
+        manifest: Optional[str] = None,
+        max_concurrency: Optional[int] = 8,
+    ) -> Union[Dict[str, str], None]:
+        """transfer only changed files between a directory and a container path"""
+        try:
+            await self.open()
+            container_client = self.service_client.get_container_client(
+                container=container_name
+            )
+            if direction == SyncDirection.UPLOAD:
+                local_dir, prefix = source, dest.strip("/")
+            else:
+                local_dir, prefix = dest, source.strip("/")
+
+            sync_manifest = await self._run_io(SyncManifest, manifest)
+            blobs = {}
+            async for blob in container_client.list_blobs(
+                name_starts_with=prefix + "/" if prefix else None
+            ):
+                if not blob.name.endswith("/"):
+                    blobs[blob.name] = blob
+            pairs, orphans = await self._run_io(
+                pair_paths,
+                local_dir,
+                prefix,
+                blobs,
+                direction,
+                exclude=[manifest, manifest + ".tmp"] if manifest else [],
+            )
+
+            results = {}
+            semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+            async def sync(name: str, local_path: str) -> None:
+                async with semaphore:
+                    results[name] = await self._sync_file(
+                        container_client,
+                        name,
+                        local_path,
+                        blobs.get(name),
+                        direction,
+                        sync_manifest,
+                    )
+
+            await asyncio.gather(
+                *[sync(name, local_path) for name, local_path in pairs.items()]
+            )
+
+            if delete_orphans and orphans:
+                if direction == SyncDirection.UPLOAD:
+                    deleted = (
+                        await self.delete_files(
+                            container_name, list(orphans), max_concurrency
+                        )
+                        or {}
+                    )
+                    for name in orphans:
+                        results[name] = (
+                            SyncStatus.DELETED
+                            if deleted.get(name)
+                            else SyncStatus.FAILED
+                        )
+                else:
+                    for name, local_path in orphans.items():
+                        try:
+                            await self._run_io(os.remove, local_path)
+                            results[name] = SyncStatus.DELETED
+                        except OSError as ex:
+                            print(f"unable to delete {local_path}: {ex}")
+                            results[name] = SyncStatus.FAILED
+                for name in orphans:
+                    if results[name] == SyncStatus.DELETED:
+                        sync_manifest.forget(name)
+
+            await self._run_io(sync_manifest.save)
+            return results
+        except Exception as ex:
+            self._handle_error(ex)
+        return None
+
+    async def _sync_file(
+        self,
+        container_client: ContainerClient,
+        name: str,
+        local_path: str,
+        blob: Optional[BlobProperties],
+        direction: str,
+        manifest: SyncManifest,
+    ) -> str:
+        """transfer one file unless unchanged and record it in the manifest"""
+        try:
+            if (
+                blob is not None
+                and await self._run_io(os.path.isfile, local_path)
+                and await self._run_io(
+                    is_unchanged, name, local_path, blob, manifest, direction
+                )
+            ):
+                await self._run_io(manifest.record, name, local_path, blob.etag)
+                return SyncStatus.UNCHANGED
+
+            if direction == SyncDirection.UPLOAD:
+                # store the md5 so later syncs can compare content
+                content_settings = ContentSettings(
+                    content_type="application/octet-stream",
+                    content_md5=bytearray(await self._run_io(file_md5, local_path)),
+                )
+                etag = await self._upload_path(
+                    container_client.container_name,
+                    local_path,
+                    name,
+                    content_settings,
+                )
+                self._invalidate(container_client.container_name, [name])
+            else:
+                await self._run_io(
+                    os.makedirs, os.path.dirname(local_path), exist_ok=True
+                )
+                downloader = await container_client.get_blob_client(
+                    name
+                ).download_blob()
+                await self._write_chunks(downloader, local_path)
+                etag = downloader.properties.etag
+            await self._run_io(manifest.record, name, local_path, etag)
+            return SyncStatus.TRANSFERRED
+        except Exception as ex:
+            self._handle_error(ex)
+        return SyncStatus.FAILED
+
+    @instrumented
     async def upload_file(
         self,
         container_name: str,
@@ -267,31 +901,281 @@ class IoTStorageClientAsync:
         dest: str,
         content_type: Optional[str] = "application/octet-stream",
         overwrite: Optional[bool] = True,
+        block_size: Optional[int] = None,
+        max_concurrency: Optional[int] = 8,
+        compression: Optional[str] = None,
+        compression_threshold: Optional[int] = 1024,
     ) -> bool:
         """upload a single file to a path inside the container"""
+        compressed, origin = None, None
         try:
-            async with self.service_client:
-                container_client = self.service_client.get_container_client(
-                    container=container_name
+            await self.open()
+            content_settings = ContentSettings(content_type=content_type)
+            if compression and should_compress(
+                content_type,
+                await self._run_io(os.path.getsize, source),
+                compression_threshold,
+            ):
+                # upload a compressed copy, removed once the upload is done
+                compressed = await self._run_io(compress_file, source, compression)
+                content_settings.content_encoding = compression
+                source, origin = compressed, source
+
+            await self._upload_path(
+                container_name,
+                source,
+                dest,
+                content_settings,
+                overwrite,
+                block_size,
+                max_concurrency,
+                origin,
+            )
+            return True
+        except Exception as ex:
+            self._handle_error(ex)
+        finally:
+            self._invalidate(container_name, [dest])
+            if compressed:
+                await self._run_io(os.remove, compressed)
+        return False
+
+    async def _upload_path(
+        self,
+        container_name: str,
+        source: str,
+        dest: str,
+        content_settings: ContentSettings,
+        overwrite: Optional[bool] = True,
+        block_size: Optional[int] = None,
+        max_concurrency: Optional[int] = 8,
+        origin: Optional[str] = None,
+    ) -> str:
+        """
+        upload a local file, reading it off the event loop, and return
+        the new etag - files above max_chunk_size are sent as blocks
+        """
+        size = await self._run_io(os.path.getsize, source)
+        if size > 0 and (block_size or size > self.max_chunk_size):
+            return await self._upload_blocks(
+                container_name,
+                source,
+                dest,
+                content_settings,
+                overwrite,
+                block_size or self.max_chunk_size,
+                max_concurrency,
+                origin,
+            )
+
+        blob_client = self.service_client.get_blob_client(
+            container=container_name, blob=dest
+        )
+        response = await blob_client.upload_blob(
+            await self._run_io(read_file, source),
+            overwrite=overwrite,
+            content_settings=content_settings,
+        )
+        return response["etag"]
+
+    async def _upload_blocks(
+        self,
+        container_name: str,
+        source: str,
+        dest: str,
+        content_settings: ContentSettings,
+        overwrite: bool,
+        block_size: int,
+        max_concurrency: int,
+        origin: Optional[str] = None,
+    ) -> str:
+        """
+        stage the file as blocks concurrently, skipping staged ones,
+        then commit them and return the new etag
+        """
+        blob_client = self.service_client.get_blob_client(
+            container=container_name, blob=dest
+        )
+        if not overwrite and await blob_client.exists():
+            raise ResourceExistsError(f"blob {dest} already exists")
+
+        # a compressed copy is rewritten on every call, so its blocks
+        # are identified by the original file
+        blocks = await self._run_io(plan_blocks, source, block_size, origin)
+        try:
+            # blocks staged by an interrupted upload of the same file
+            _, uncommitted = await blob_client.get_block_list("uncommitted")
+            staged = {(block.id, block.size) for block in uncommitted}
+        except ResourceNotFoundError:
+            staged = set()
+        missing = [
+            block for block in blocks if (block.block_id, block.length) not in staged
+        ]
+
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def stage(block: BlockRange) -> None:
+            async with semaphore:
+                # read once admitted to hold at most one block per slot
+                data = await self._run_io(read_at, source, block.offset, block.length)
+                await blob_client.stage_block(block.block_id, data, length=block.length)
+
+        await asyncio.gather(*[stage(block) for block in missing])
+
+        conditions = {} if overwrite else {"match_condition": MatchConditions.IfMissing}
+        response = await blob_client.commit_block_list(
+            [BlobBlock(block_id=block.block_id) for block in blocks],
+            content_settings=content_settings,
+            **conditions,
+        )
+        return response["etag"]
+
+    @instrumented
+    async def upload_bytes(
+        self,
+        container_name: str,
+        data: Union[bytes, bytearray, memoryview],
+        dest: str,
+        content_type: Optional[str] = "application/octet-stream",
+        overwrite: Optional[bool] = True,
+        max_concurrency: Optional[int] = 8,
+    ) -> bool:
+        """upload bytes held in memory to a path inside the container"""
+        try:
+            await self.open()
+            content_settings = ContentSettings(content_type=content_type)
+            blob_client = self.service_client.get_blob_client(
+                container=container_name, blob=dest
+            )
+            if isinstance(data, bytes) and len(data) <= self.max_chunk_size:
+                # the sdk sends bytes in a single request without copying them
+                await blob_client.upload_blob(
+                    data, overwrite=overwrite, content_settings=content_settings
                 )
+                return True
 
-                with open(source, "rb") as data:
-                    await container_client.upload_blob(
-                        name=dest,
-                        data=data,
-                        overwrite=overwrite,
-                        content_settings=ContentSettings(content_type=content_type),
-                    )
+            async def chunks() -> AsyncIterator[memoryview]:
+                # blocks are slices sharing the caller's memory
+                for chunk in split_view(as_view(data), self.max_chunk_size):
+                    yield chunk
+
+            await self._stage_chunks(
+                blob_client, chunks(), content_settings, overwrite, max_concurrency
+            )
+            return True
+        except Exception as ex:
+            self._handle_error(ex)
+        finally:
+            self._invalidate(container_name, [dest])
+        return False
+
+    @instrumented
+    async def upload_stream(
+        self,
+        container_name: str,
+        stream,
+        dest: str,
+        content_type: Optional[str] = "application/octet-stream",
+        overwrite: Optional[bool] = True,
+        max_concurrency: Optional[int] = 8,
+    ) -> bool:
+        """upload the rest of a readable file-like object to a path inside the container"""
+        try:
+            await self.open()
+            content_settings = ContentSettings(content_type=content_type)
+            blob_client = self.service_client.get_blob_client(
+                container=container_name, blob=dest
+            )
+
+            async def read() -> bytes:
+                if asyncio.iscoroutinefunction(stream.read):
+                    return await stream.read(self.max_chunk_size)
+                return await self._run_io(stream.read, self.max_chunk_size)
+
+            first = await read()
+            following = await read() if first else b""
+            if not following:
+                await blob_client.upload_blob(
+                    first, overwrite=overwrite, content_settings=content_settings
+                )
                 return True
+
+            async def chunks() -> AsyncIterator[bytes]:
+                yield first
+                yield following
+                while True:
+                    chunk = await read()
+                    if not chunk:
+                        return
+                    yield chunk
+
+            await self._stage_chunks(
+                blob_client, chunks(), content_settings, overwrite, max_concurrency
+            )
+            return True
         except Exception as ex:
-            print(f"unexpected exception occurred: {ex}")
-            pass
+            self._handle_error(ex)
+        finally:
+            self._invalidate(container_name, [dest])
         return False
 
-    async def delete_dir(self, container_name: str, path: str) -> bool:
+    async def _stage_chunks(
+        self,
+        blob_client: BlobClient,
+        chunks: AsyncIterator[Union[bytes, memoryview]],
+        content_settings: ContentSettings,
+        overwrite: bool,
+        max_concurrency: int,
+    ) -> str:
+        """
+        stage chunks as the blocks of a new blob then commit them and return
+        the new etag, taking the next chunk only once a slot is free so at
+        most max_concurrency chunks are held at a time
+        """
+        if not overwrite and await blob_client.exists():
+            raise ResourceExistsError(f"blob {blob_client.blob_name} already exists")
+
+        block_ids = upload_block_ids()
+        staged: List[str] = []
+        slots = max(1, max_concurrency)
+        pending = set()
+        try:
+            async for chunk in chunks:
+                if len(pending) >= slots:
+                    done, pending = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    for task in done:
+                        task.result()
+                staged.append(next(block_ids))
+                pending.add(
+                    asyncio.ensure_future(
+                        blob_client.stage_block(staged[-1], chunk, length=len(chunk))
+                    )
+                )
+            if pending:
+                await asyncio.gather(*pending)
+        finally:
+            for task in pending:
+                task.cancel()
+
+        conditions = {} if overwrite else {"match_condition": MatchConditions.IfMissing}
+        response = await blob_client.commit_block_list(
+            [BlobBlock(block_id=block_id) for block_id in staged],
+            content_settings=content_settings,
+            **conditions,
+        )
+        return response["etag"]
+
+    @instrumented
+    async def delete_dir(
+        self, container_name: str, path: str, max_concurrency: Optional[int] = 4
+    ) -> bool:
         """remove a directory and its contents recursively"""
         try:
             blobs = await self.list_files(container_name, path, recursive=True)
+            if blobs is None:
+                return False
             if not blobs:
                 return True
 
@@ -299,89 +1183,422 @@ class IoTStorageClientAsync:
                 path += "/"
             blobs = [path + blob for blob in blobs]
 
-            async with self.service_client:
-                container_client = self.service_client.get_container_client(
-                    container=container_name
-                )
-                await container_client.delete_blobs(*blobs)
-                return True
+            results = await self.delete_files(container_name, blobs, max_concurrency)
+            return results is not None and all(results.values())
         except Exception as ex:
-            print(f"unexpected exception occurred: {ex}")
-            pass
+            self._handle_error(ex)
         return False
 
+    @instrumented
+    async def delete_files(
+        self,
+        container_name: str,
+        paths: List[str],
+        max_concurrency: Optional[int] = 4,
+    ) -> Union[Dict[str, bool], None]:
+        """remove many files in service-sized batches sent concurrently"""
+        try:
+            await self.open()
+            container_client = self.service_client.get_container_client(
+                container=container_name
+            )
+            semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+            async def delete(batch: List[str]) -> Dict[str, bool]:
+                async with semaphore:
+                    return await self._delete_batch(container_client, batch)
+
+            results = {}
+            for batch_results in await asyncio.gather(
+                *[delete(batch) for batch in split_batches(paths)]
+            ):
+                results.update(batch_results)
+            return results
+        except Exception as ex:
+            self._handle_error(ex)
+        finally:
+            self._invalidate(container_name, paths)
+        return None
+
+    async def _delete_batch(
+        self, container_client: ContainerClient, batch: List[str]
+    ) -> Dict[str, bool]:
+        """send a single delete batch and report each sub-request"""
+        try:
+            responses = await container_client.delete_blobs(
+                *batch, raise_on_any_failure=False
+            )
+            statuses = [response.status_code async for response in responses]
+            return {blob: 200 <= status < 300 for blob, status in zip(batch, statuses)}
+        except Exception as ex:
+            self._handle_error(ex)
+        return {blob: False for blob in batch}
+
+    @instrumented
     async def delete_file(self, container_name: str, path: str) -> bool:
         """remove a single file from a path inside the container"""
         try:
-            async with self.service_client:
-                container_client = self.service_client.get_container_client(
-                    container=container_name
-                )
-                await container_client.delete_blob(path)
-                return True
+            await self.open()
+            container_client = self.service_client.get_container_client(
+                container=container_name
+            )
+            await container_client.delete_blob(path)
+            return True
         except Exception as ex:
-            print(f"unexpected exception occurred: {ex}")
-            pass
+            self._handle_error(ex)
+        finally:
+            self._invalidate(container_name, [path])
         return False
 
+    @instrumented
     async def list_files(
         self, container_name: str, path: str, recursive: Optional[bool] = False
     ) -> Union[List[str], None]:
         """list files under a path, optionally recursive"""
+        try:
+            if not recursive:
+                items = await self._walk_level(container_name, path)
+                return [name for name, is_dir in items if not is_dir]
+
+            index = await self.index_blobs(container_name, path)
+            return index.files(recursive=True) if index else None
+        except Exception as ex:
+            self._handle_error(ex)
+        return None
+
+    @instrumented
+    async def list_files_parallel(
+        self,
+        container_name: str,
+        path: str,
+        partitions: Optional[List[str]] = None,
+        partition_depth: Optional[int] = 1,
+        max_concurrency: Optional[int] = 8,
+    ) -> Union[List[str], None]:
+        """
+        list files under a path recursively, listing prefix partitions
+        concurrently and merging them in name order
+        """
         try:
             if not path == "" and not path.endswith("/"):
                 path += "/"
 
-            async with self.service_client:
-                container_client = self.service_client.get_container_client(
-                    container=container_name
+            await self.open()
+            container_client = self.service_client.get_container_client(
+                container=container_name
+            )
+            semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+            async def list_partition(prefix: str) -> List[str]:
+                async with semaphore:
+                    # the service lists each partition in name order
+                    return [
+                        blob.name[len(path) :]
+                        async for blob in container_client.list_blobs(
+                            name_starts_with=path + prefix
+                        )
+                    ]
+
+            files = []
+            if partitions is None:
+                files, partitions = await self._find_partitions(
+                    semaphore, container_name, path, partition_depth
                 )
-                blob_iter = await container_client.list_blobs(name_starts_with=path)
-
-                files = []
-                for blob in blob_iter:
-                    relative_path = os.path.relpath(blob.name, path)
-                    if recursive or not "/" in relative_path:
-                        files.append(relative_path)
-                return files
+            listings = await asyncio.gather(*[list_partition(p) for p in partitions])
+            return merge_listings([files] + listings)
         except Exception as ex:
-            print(f"unexpected exception occurred: {ex}")
-            pass
+            self._handle_error(ex)
         return None
 
+    async def _find_partitions(
+        self,
+        semaphore: asyncio.Semaphore,
+        container_name: str,
+        path: str,
+        depth: int,
+    ) -> Tuple[List[str], List[str]]:
+        """
+        walk depth levels under path concurrently, returning the files
+        found on the way and the prefixes below them, relative to path
+        """
+
+        async def walk(prefix: str) -> List[Tuple[str, bool]]:
+            async with semaphore:
+                return await self._walk_level(container_name, path + prefix)
+
+        files, prefixes = [], [""]
+        for _ in range(depth):
+            levels = await asyncio.gather(*[walk(prefix) for prefix in prefixes])
+            level = []
+            for prefix, items in zip(prefixes, levels):
+                for name, is_dir in items:
+                    if is_dir:
+                        level.append(f"{prefix}{name}/")
+                    else:
+                        files.append(prefix + name)
+            prefixes = level
+        return sorted(files), prefixes
+
+    @instrumented
     async def list_dirs(
         self, container_name: str, path: str, recursive: Optional[bool] = False
     ) -> Union[List[str], None]:
         """list directories under a path, optionally recursive"""
+        try:
+            if not recursive:
+                items = await self._walk_level(container_name, path)
+                return [name for name, is_dir in items if is_dir]
+
+            index = await self.index_blobs(container_name, path)
+            return index.dirs(recursive=True) if index else None
+        except Exception as ex:
+            self._handle_error(ex)
+        return None
+
+    async def iter_pages(
+        self,
+        container_name: str,
+        path: str,
+        recursive: Optional[bool] = False,
+        results_per_page: Optional[int] = None,
+        continuation_token: Optional[str] = None,
+    ) -> AsyncIterator[Tuple[List[str], List[str], Optional[str]]]:
+        """
+        yield (files, dirs, continuation_token) for each page the service
+        returns under a path, the token resumes the listing after that page
+        """
         try:
             if not path == "" and not path.endswith("/"):
                 path += "/"
 
-            async with self.service_client:
-                container_client = self.service_client.get_container_client(
-                    container=container_name
-                )
-                blob_iter = await container_client.list_blobs(name_starts_with=path)
-
-                dirs = []
-                for blob in blob_iter:
-                    relative_dir = os.path.dirname(os.path.relpath(blob.name, path))
-                    if (
-                        relative_dir
-                        and (recursive or not "/" in relative_dir)
-                        and not relative_dir in dirs
-                    ):
-                        dirs.append(relative_dir)
-                return dirs
+            await self.open()
+            container_client = self.service_client.get_container_client(
+                container=container_name
+            )
+            if recursive:
+                pager = container_client.list_blobs(
+                    name_starts_with=path, results_per_page=results_per_page
+                ).by_page(continuation_token=continuation_token)
+            else:
+                pager = container_client.walk_blobs(
+                    name_starts_with=path,
+                    delimiter="/",
+                    results_per_page=results_per_page,
+                ).by_page(continuation_token=continuation_token)
+
+            # directories already yielded by a recursive listing
+            seen_dirs = set()
+            async for page in pager:
+                files, dirs = [], []
+                async for item in page:
+                    name = item.name[len(path) :]
+                    if isinstance(item, BlobPrefix):
+                        dirs.append(name.rstrip("/"))
+                        continue
+                    files.append(name)
+                    if recursive:
+                        for parent in parent_dirs(name):
+                            if parent not in seen_dirs:
+                                seen_dirs.add(parent)
+                                dirs.append(parent)
+                yield files, dirs, pager.continuation_token
+        except Exception as ex:
+            self._handle_error(ex)
+
+    async def iter_files(
+        self,
+        container_name: str,
+        path: str,
+        recursive: Optional[bool] = False,
+        results_per_page: Optional[int] = None,
+        continuation_token: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        """lazily yield files under a path as each page arrives"""
+        async for files, _, _ in self.iter_pages(
+            container_name, path, recursive, results_per_page, continuation_token
+        ):
+            for name in files:
+                yield name
+
+    async def iter_dirs(
+        self,
+        container_name: str,
+        path: str,
+        recursive: Optional[bool] = False,
+        results_per_page: Optional[int] = None,
+        continuation_token: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        """lazily yield directories under a path as each page arrives"""
+        async for _, dirs, _ in self.iter_pages(
+            container_name, path, recursive, results_per_page, continuation_token
+        ):
+            for name in dirs:
+                yield name
+
+    @instrumented
+    async def index_blobs(
+        self, container_name: str, path: str
+    ) -> Union[BlobTree, None]:
+        """list every blob under a path once into a queryable prefix tree"""
+        try:
+            if not path == "" and not path.endswith("/"):
+                path += "/"
+
+            await self.open()
+            container_client = self.service_client.get_container_client(
+                container=container_name
+            )
+
+            index = BlobTree()
+            async for blob in container_client.list_blobs(name_starts_with=path):
+                index.add(blob.name[len(path) :])
+            return index
         except Exception as ex:
-            print(f"unexpected exception occurred: {ex}")
-            pass
+            self._handle_error(ex)
         return None
 
+    async def _walk_level(
+        self, container_name: str, path: str
+    ) -> List[Tuple[str, bool]]:
+        """list a single level under path with a delimited listing"""
+        if not path == "" and not path.endswith("/"):
+            path += "/"
+
+        await self.open()
+        container_client = self.service_client.get_container_client(
+            container=container_name
+        )
+
+        items = []
+        async for item in container_client.walk_blobs(
+            name_starts_with=path, delimiter="/"
+        ):
+            # prefixes are the sub-directories at this level
+            is_dir = isinstance(item, BlobPrefix)
+            name = item.name[len(path) :]
+            items.append((name.rstrip("/") if is_dir else name, is_dir))
+        return items
+
+    @instrumented
     async def copy_file(
-        self, container_name: str, source: str, dest_container: str, dest: str
+        self,
+        container_name: str,
+        source: str,
+        dest_container: str,
+        dest: str,
+        timeout: Optional[int] = 100,
     ) -> bool:
         """copy a file between any location within the same storage account"""
+        try:
+            await self.open()
+            if await self._copy_server_side(
+                container_name, source, dest_container, dest, timeout
+            ):
+                return True
+
+            # fall back to a download/upload round trip for targets
+            # that can't copy server-side (e.g. AzureBlobStorageonIoTEdge)
+            return await self._copy_via_temp_file(
+                container_name, source, dest_container, dest
+            )
+        except Exception as ex:
+            self._handle_error(ex)
+        finally:
+            self._invalidate(dest_container, [dest])
+        return False
+
+    @instrumented
+    async def copy_files(
+        self,
+        container_name: str,
+        files: Dict[str, str],
+        dest_container: str,
+        max_concurrency: Optional[int] = 8,
+        timeout: Optional[int] = 100,
+    ) -> Union[Dict[str, bool], None]:
+        """copy many files (source path -> dest path) concurrently"""
+        try:
+            semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+            async def copy(source: str, dest: str) -> bool:
+                async with semaphore:
+                    return await self.copy_file(
+                        container_name, source, dest_container, dest, timeout
+                    )
+
+            await self.open()
+            results = await asyncio.gather(
+                *[copy(source, dest) for source, dest in files.items()]
+            )
+            return dict(zip(files.keys(), results))
+        except Exception as ex:
+            self._handle_error(ex)
+        return None
+
+    def _get_source_url(self, container_name: str, source: str, timeout: int) -> str:
+        """build a readable URL for a blob, signing it with the account key"""
+        blob_client = self.service_client.get_blob_client(
+            container=container_name, blob=source
+        )
+        account_key = getattr(self.service_client.credential, "account_key", None)
+        if not account_key:
+            # SAS credentials are already part of the blob URL
+            return blob_client.url
+
+        sas_token = generate_blob_sas(
+            account_name=blob_client.account_name,
+            container_name=container_name,
+            blob_name=source,
+            account_key=account_key,
+            permission=BlobSasPermissions(read=True),
+            expiry=datetime.utcnow() + timedelta(minutes=15, seconds=timeout),
+        )
+        return f"{blob_client.url}?{sas_token}"
+
+    async def _copy_server_side(
+        self,
+        container_name: str,
+        source: str,
+        dest_container: str,
+        dest: str,
+        timeout: Optional[int] = 100,
+    ) -> bool:
+        """
+        copy a file inside the storage service without a local round trip,
+        false if the target can't copy from a url
+        """
+        blob_client = self.service_client.get_blob_client(
+            container=dest_container, blob=dest
+        )
+        try:
+            copy = await blob_client.start_copy_from_url(
+                self._get_source_url(container_name, source, timeout)
+            )
+        except HttpResponseError as ex:
+            # anything else, like a missing source, would fail
+            # a download/upload round trip just the same
+            if not copy_unsupported(ex):
+                raise
+            print(f"server-side copy unavailable: {ex}")
+            return False
+        status = copy["copy_status"]
+
+        # same-account copies usually complete synchronously,
+        # otherwise wait on the shared poller until `timeout` seconds
+        if status == "pending":
+            status = await self._copy_poller.track(blob_client, timeout)
+
+        if status == "pending":
+            await blob_client.abort_copy(copy["copy_id"])
+            raise Exception(f"copy to {dest_container}/{dest} timed out")
+        if status != "success":
+            raise Exception(f"copy to {dest_container}/{dest} ended {status}")
+        return True
+
+    async def _copy_via_temp_file(
+        self, container_name: str, source: str, dest_container: str, dest: str
+    ) -> bool:
+        """copy a file by downloading it to a tempfile and re-uploading it"""
         try:
             # download to tempfile
             temp_file = tempfile.NamedTemporaryFile()
@@ -410,14 +1627,14 @@ class IoTStorageClientAsync:
             temp_file.close()
             return True
         except Exception as ex:
-            print(f"unexpected exception occurred: {ex}")
             try:
                 temp_file.close()
             except Exception:
                 pass
-            pass
+            self._handle_error(ex)
         return False
 
+    @instrumented
     async def move_file(
         self, container_name: str, source: str, dest_container: str, dest: str
     ) -> bool:
@@ -438,10 +1655,10 @@ class IoTStorageClientAsync:
                 return False
             return True
         except Exception as ex:
-            print(f"unexpected exception occurred: {ex}")
-            pass
+            self._handle_error(ex)
         return False
 
+    @instrumented
     async def copy_from_url(
         self,
         source_url: str,
@@ -451,34 +1668,42 @@ class IoTStorageClientAsync:
     ) -> bool:
         """copy a file from a URL to a path inside the container"""
         try:
-            async with self.service_client:
-                blob_client = self.service_client.get_blob_client(
-                    container=container_name, blob=dest
-                )
-                await blob_client.start_copy_from_url(source_url)
-                for i in range(10):
-                    props = await blob_client.get_blob_properties()
-                    print(f"copy status: {props.copy.status}")
-                    if props.copy.status == "success":
-                        # complete!
-                        break
-                    time.sleep(timeout / 10)
+            await self.open()
+            blob_client = self.service_client.get_blob_client(
+                container=container_name, blob=dest
+            )
+            copy = await blob_client.start_copy_from_url(source_url)
+            status = copy["copy_status"]
+            if status == "pending":
+                # poll without blocking the event loop
+                status = await self._copy_poller.track(blob_client, timeout)
+            print(f"copy status: {status}")
 
-                if props.copy.status != "success":
-                    # if not complete after `timeout` seconds,
-                    # abort the operation safely
-                    props = await blob_client.get_blob_properties()
-                    print(f"timeout status: {props.copy.status}")
-                    await blob_client.abort_copy(props.copy.id)
-                    props = await blob_client.get_blob_properties()
-                    print(f"abort status: {props.copy.status}")
-                    return False
-                return True
+            if status == "pending":
+                # if not complete after `timeout` seconds,
+                # abort the operation safely
+                await blob_client.abort_copy(copy["copy_id"])
+                props = await blob_client.get_blob_properties()
+                print(f"abort status: {props.copy.status}")
+                return False
+            return status == "success"
         except Exception as ex:
-            print(f"unexpected exception occurred: {ex}")
-            pass
+            self._handle_error(ex)
+        finally:
+            self._invalidate(container_name, [dest])
         return False
 
+    def _sas_token(
+        self,
+        key: Tuple,
+        expiry: Optional[Union[datetime, str]],
+        sign: Callable[[Union[datetime, str]], str],
+    ) -> str:
+        """sign a SAS token, reusing a cached one while the sas cache has it"""
+        if self.sas_cache is None:
+            return sign(sas_expiry(expiry))
+        return self.sas_cache.get_or_create(key, expiry, sign)
+
     async def generate_file_sas_url(
         self,
         container_name: str,
@@ -487,61 +1712,65 @@ class IoTStorageClientAsync:
         write: Optional[bool] = False,
         delete: Optional[bool] = False,
         start: Optional[Union[datetime, str]] = None,
-        expiry: Optional[Union[datetime, str]] = datetime.utcnow()
-        + timedelta(minutes=15),
+        expiry: Optional[Union[datetime, str]] = None,
     ) -> Union[str, None]:
         """generate a SAS URL for a given file inside the container"""
         try:
-            async with self.service_client:
-                account_key = self.service_client.credential.account_key
-                sas_token = generate_blob_sas(
+            account_key = self.service_client.credential.account_key
+            permission = BlobSasPermissions(
+                read=read,
+                add=write,
+                create=write,
+                delete=delete,
+                tag=write,
+            )
+
+            def sign(expiry: Union[datetime, str]) -> str:
+                return generate_blob_sas(
                     account_name=self.account_name,
                     container_name=container_name,
                     blob_name=source,
                     account_key=account_key,
-                    permission=BlobSasPermissions(
-                        read=read,
-                        add=write,
-                        create=write,
-                        delete=delete,
-                        tag=write,
-                    ),
+                    permission=permission,
                     start=start,
                     expiry=expiry,
                     ip=self.host,
                 )
-                if not sas_token:
-                    print(
-                        f"unable to generate SAS token: {self.account_name}/{container_name}/{source}"
-                    )
-                    return None
 
-                if self.location_type == LocationType.CLOUD_BASED:
-                    return generate_cloud_sas_url(
-                        account=self.account_name,
-                        account_sas=sas_token,
-                        blob_path=f"{container_name}/{source}",
-                    )
-                if self.location_type == LocationType.EDGE_BASED:
-                    return generate_edge_sas_url(
-                        host=self.host,
-                        port=self.port,
-                        account=self.account_name,
-                        account_sas=sas_token,
-                        blob_path=f"{container_name}/{source}",
-                    )
-                if self.location_type == LocationType.LOCAL_BASED:
-                    return generate_local_sas_url(
-                        module=self.module,
-                        port=self.port,
-                        account=self.account_name,
-                        account_sas=sas_token,
-                        blob_path=f"{container_name}/{source}",
-                    )
+            sas_token = self._sas_token(
+                (container_name, source, str(permission), start, expiry), expiry, sign
+            )
+            if not sas_token:
+                print(
+                    f"unable to generate SAS token: {self.account_name}/{container_name}/{source}"
+                )
                 return None
+
+            if self.location_type == LocationType.CLOUD_BASED:
+                return generate_cloud_sas_url(
+                    account=self.account_name,
+                    account_sas=sas_token,
+                    blob_path=f"{container_name}/{source}",
+                )
+            if self.location_type == LocationType.EDGE_BASED:
+                return generate_edge_sas_url(
+                    host=self.host,
+                    port=self.port,
+                    account=self.account_name,
+                    account_sas=sas_token,
+                    blob_path=f"{container_name}/{source}",
+                )
+            if self.location_type == LocationType.LOCAL_BASED:
+                return generate_local_sas_url(
+                    module=self.module,
+                    port=self.port,
+                    account=self.account_name,
+                    account_sas=sas_token,
+                    blob_path=f"{container_name}/{source}",
+                )
+            return None
         except Exception as ex:
-            print(f"unexpected exception occurred: {ex}")
-            pass
+            self._handle_error(ex)
         return None
 
     async def generate_container_sas_url(
@@ -551,58 +1780,62 @@ class IoTStorageClientAsync:
         write: Optional[bool] = False,
         delete: Optional[bool] = False,
         start: Optional[Union[datetime, str]] = None,
-        expiry: Optional[Union[datetime, str]] = datetime.utcnow()
-        + timedelta(minutes=15),
+        expiry: Optional[Union[datetime, str]] = None,
     ) -> Union[str, None]:
         """generate a SAS URL for a given storage account container"""
         try:
-            async with self.service_client:
-                account_key = self.service_client.credential.account_key
-                sas_token = generate_container_sas(
+            account_key = self.service_client.credential.account_key
+            permission = BlobSasPermissions(
+                read=read,
+                add=write,
+                create=write,
+                delete=delete,
+                tag=write,
+            )
+
+            def sign(expiry: Union[datetime, str]) -> str:
+                return generate_container_sas(
                     account_name=self.account_name,
                     container_name=container_name,
                     account_key=account_key,
-                    permission=BlobSasPermissions(
-                        read=read,
-                        add=write,
-                        create=write,
-                        delete=delete,
-                        tag=write,
-                    ),
+                    permission=permission,
                     start=start,
                     expiry=expiry,
                     ip=self.host,
                 )
-                if not sas_token:
-                    print(
-                        f"unable to generate SAS token: {self.account_name}/{container_name}"
-                    )
-                    return None
 
-                if self.location_type == LocationType.CLOUD_BASED:
-                    return generate_cloud_sas_url(
-                        account=self.account_name,
-                        account_sas=sas_token,
-                        blob_path=container_name,
-                    )
-                if self.location_type == LocationType.EDGE_BASED:
-                    return generate_edge_sas_url(
-                        host=self.host,
-                        port=self.port,
-                        account=self.account_name,
-                        account_sas=sas_token,
-                        blob_path=container_name,
-                    )
-                if self.location_type == LocationType.LOCAL_BASED:
-                    return generate_local_sas_url(
-                        module=self.module,
-                        port=self.port,
-                        account=self.account_name,
-                        account_sas=sas_token,
-                        blob_path=container_name,
-                    )
+            sas_token = self._sas_token(
+                (container_name, None, str(permission), start, expiry), expiry, sign
+            )
+            if not sas_token:
+                print(
+                    f"unable to generate SAS token: {self.account_name}/{container_name}"
+                )
                 return None
+
+            if self.location_type == LocationType.CLOUD_BASED:
+                return generate_cloud_sas_url(
+                    account=self.account_name,
+                    account_sas=sas_token,
+                    blob_path=container_name,
+                )
+            if self.location_type == LocationType.EDGE_BASED:
+                return generate_edge_sas_url(
+                    host=self.host,
+                    port=self.port,
+                    account=self.account_name,
+                    account_sas=sas_token,
+                    blob_path=container_name,
+                )
+            if self.location_type == LocationType.LOCAL_BASED:
+                return generate_local_sas_url(
+                    module=self.module,
+                    port=self.port,
+                    account=self.account_name,
+                    account_sas=sas_token,
+                    blob_path=container_name,
+                )
+            return None
         except Exception as ex:
-            print(f"unexpected exception occurred: {ex}")
-            pass
+            self._handle_error(ex)
         return None
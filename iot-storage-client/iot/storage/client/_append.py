@@ -0,0 +1,407 @@
+"""buffered append blob writer for continuously produced telemetry and logs"""
+
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Deque, Dict, List, Optional, Tuple, Union
+
+from azure.core import MatchConditions
+from azure.core.exceptions import (
+    HttpResponseError,
+    ResourceExistsError,
+    ResourceNotFoundError,
+)
+from azure.storage.blob import BlobClient, BlobType, ContentSettings
+
+from ._blocks import MAX_BLOCKS
+from ._client import IoTStorageClient
+from ._exceptions import classify_error
+
+# the largest block a single append block request accepts
+MAX_APPEND_BLOCK_SIZE = 4 * 1024 * 1024
+
+
+class AppendBlobWriter:
+    """
+    buffer records in memory and append them to append blobs in blocks
+    bounded by size or age, flushing in the background and rotating to a
+    new blob by size or time
+    """
+
+    storage_client: IoTStorageClient
+    container_name: str
+    dest: str
+    content_type: str
+    separator: bytes
+    block_size: int
+    flush_interval: float
+    max_blob_size: Optional[int]
+    rotate_interval: Optional[float]
+    max_buffer_size: int
+    initial_backoff: float
+    max_backoff: float
+
+    def __init__(
+        self,
+        storage_client: IoTStorageClient,
+        container_name: str,
+        dest: str,
+        content_type: Optional[str] = "application/octet-stream",
+        separator: Optional[bytes] = b"\n",
+        block_size: Optional[int] = MAX_APPEND_BLOCK_SIZE,
+        flush_interval: Optional[float] = 1.0,
+        max_blob_size: Optional[int] = None,
+        rotate_interval: Optional[float] = None,
+        max_buffer_size: Optional[int] = 64 * 1024 * 1024,
+        initial_backoff: Optional[float] = 1.0,
+        max_backoff: Optional[float] = 60.0,
+    ) -> None:
+        if not 0 < block_size <= MAX_APPEND_BLOCK_SIZE:
+            raise ValueError(
+                f"block_size must be between 1 and {MAX_APPEND_BLOCK_SIZE} bytes"
+            )
+        if max_blob_size is not None and "{sequence}" not in dest:
+            raise ValueError("dest needs a {sequence} placeholder to rotate by size")
+        if rotate_interval is not None and not ("{sequence}" in dest or "%" in dest):
+            raise ValueError(
+                "dest needs a {sequence} placeholder or a date format to rotate by time"
+            )
+        self.storage_client = storage_client
+        self.container_name = container_name
+        self.dest = dest
+        self.content_type = content_type
+        self.separator = separator or b""
+        self.block_size = block_size
+        self.flush_interval = flush_interval
+        self.max_blob_size = max_blob_size
+        self.rotate_interval = rotate_interval
+        self.max_buffer_size = max_buffer_size
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.appended = 0
+        self.blocks = 0
+        self.rotations = 0
+        self.failed = 0
+        self.dropped = 0
+        # buffered records with the monotonic time each was written
+        self._records: Deque[Tuple[bytes, float]] = deque()
+        self._buffered = 0
+        self._lock = threading.Lock()
+        # serializes appends from the flush thread and callers of flush
+        self._append_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._retry_after: Optional[float] = None
+        self._sequence = 0
+        self._rotate = False
+        self._blob_name: Optional[str] = None
+        self._blob_client: Optional[BlobClient] = None
+        self._blob_size = 0
+        self._blob_blocks = 0
+        self._blob_opened = 0.0
+
+    def __repr__(self) -> str:
+        return (
+            "IoT Storage Append Blob Writer\n"
+            "---------------------\n"
+            f"container: {self.container_name}\n"
+            f"blob: {self._blob_name}\n"
+            f"buffered: {self._buffered} bytes"
+        )
+
+    def __enter__(self) -> "AppendBlobWriter":
+        self.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    @property
+    def blob_name(self) -> Optional[str]:
+        """the blob currently appended to, none before the first append"""
+        return self._blob_name
+
+    def write(self, record: Union[bytes, bytearray, memoryview, str]) -> None:
+        """
+        buffer one record followed by the separator - the oldest records
+        are dropped when max_buffer_size would be exceeded
+        """
+        data = record.encode("utf-8") if isinstance(record, str) else bytes(record)
+        data += self.separator
+        if len(data) > self.block_size:
+            raise ValueError(
+                f"a {len(data)} byte record does not fit in a {self.block_size} "
+                "byte append block"
+            )
+        with self._lock:
+            self._records.append((data, time.monotonic()))
+            self._buffered += len(data)
+            while self._buffered > self.max_buffer_size:
+                dropped, _ = self._records.popleft()
+                self._buffered -= len(dropped)
+                self.dropped += 1
+            # the flush thread sleeps until a block fills or the first
+            # record of an empty buffer starts its flush_interval
+            wake = self._buffered >= self.block_size or len(self._records) == 1
+        if wake:
+            self._wakeup.set()
+
+    def flush(self) -> bool:
+        """append every buffered record now, false if some are still buffered"""
+        return self._drain(force=True)
+
+    def rotate(self) -> None:
+        """start a new blob with the next append"""
+        with self._lock:
+            self._rotate = True
+
+    def buffered(self) -> int:
+        """number of bytes waiting to be appended"""
+        with self._lock:
+            return self._buffered
+
+    def lag(self) -> float:
+        """age in seconds of the oldest buffered record"""
+        with self._lock:
+            if not self._records:
+                return 0.0
+            return time.monotonic() - self._records[0][1]
+
+    def metrics(self) -> Dict[str, Union[float, str, None]]:
+        """buffer state, current blob and running totals for monitoring"""
+        return {
+            "buffered": self.buffered(),
+            "lag": self.lag(),
+            "blob": self._blob_name,
+            "blob_size": self._blob_size,
+            "appended": self.appended,
+            "blocks": self.blocks,
+            "rotations": self.rotations,
+            "failed": self.failed,
+            "dropped": self.dropped,
+        }
+
+    def start(self) -> None:
+        """start flushing in the background"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="iot-storage-append-writer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """stop flushing in the background, buffered records are kept"""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """stop the background flush and append what is still buffered"""
+        self.stop(timeout)
+        return self.flush()
+
+    def _run(self) -> None:
+        """append blocks as they fill or age, pausing while appends fail"""
+        backoff = 0.0
+        while not self._stopping.is_set():
+            self._wakeup.wait(self._next_due())
+            self._wakeup.clear()
+            if self._stopping.is_set():
+                return
+            if self._drain(force=False):
+                backoff = 0.0
+                continue
+
+            # the append failed, likely an outage - stop hammering it but
+            # never retry sooner than a throttling service asked
+            backoff = min(max(backoff * 2, self.initial_backoff), self.max_backoff)
+            self._stopping.wait(max(backoff, self._retry_after or 0.0))
+
+    def _next_due(self) -> Optional[float]:
+        """seconds until a block should be appended, none with nothing buffered"""
+        with self._lock:
+            if not self._records:
+                return None
+            if self._buffered >= self.block_size:
+                return 0.0
+            age = time.monotonic() - self._records[0][1]
+        return max(0.0, self.flush_interval - age)
+
+    def _take_block(self, force: bool) -> Optional[List[Tuple[bytes, float]]]:
+        """
+        the oldest records that fit in one block, none unless the block
+        is full, its oldest record is flush_interval old or force is set
+        """
+        with self._lock:
+            if not self._records:
+                return None
+            if (
+                not force
+                and self._buffered < self.block_size
+                and time.monotonic() - self._records[0][1] < self.flush_interval
+            ):
+                return None
+            records, size = [], 0
+            while self._records and size + len(self._records[0][0]) <= self.block_size:
+                data, written = self._records.popleft()
+                records.append((data, written))
+                size += len(data)
+            self._buffered -= size
+        return records
+
+    def _requeue(self, records: List[Tuple[bytes, float]]) -> None:
+        """put records back at the front of the buffer after a failed append"""
+        with self._lock:
+            self._records.extendleft(reversed(records))
+            self._buffered += sum(len(data) for data, _ in records)
+
+    def _drain(self, force: bool) -> bool:
+        """append due blocks until none are left, false if an append failed"""
+        with self._append_lock:
+            while True:
+                records = self._take_block(force)
+                if records is None:
+                    return True
+                try:
+                    self._append(b"".join(data for data, _ in records))
+                except Exception as ex:
+                    self._requeue(records)
+                    self.failed += 1
+                    self._retry_after = classify_error(ex).retry_after
+                    # reopen the blob on the next attempt in case it changed
+                    self._blob_client = None
+                    print(f"append to {self._blob_name} failed: {ex}")
+                    return False
+
+    def _append(self, data: bytes) -> None:
+        """append one block, rotating first when the current blob is done"""
+        if self._blob_client is None:
+            self._open()
+        if self._needs_rotation(len(data)):
+            self._sequence += 1
+            self.rotations += 1
+            self._open(rotated=True)
+
+        try:
+            response = self._blob_client.append_block(
+                data, length=len(data), appendpos_condition=self._blob_size
+            )
+            self._blob_blocks = response["blob_committed_block_count"]
+        except HttpResponseError as ex:
+            if getattr(ex, "error_code", None) != "AppendPositionConditionNotMet":
+                raise
+            # a retried request whose first attempt landed leaves
+            # the blob exactly one block longer than expected
+            props = self._blob_client.get_blob_properties()
+            if props.size != self._blob_size + len(data):
+                raise
+            self._blob_blocks = props.append_blob_committed_block_count
+        self._blob_size += len(data)
+        self.appended += len(data)
+        self.blocks += 1
+
+    def _needs_rotation(self, size: int) -> bool:
+        """check if the next block of size bytes belongs in a new blob"""
+        with self._lock:
+            rotate, self._rotate = self._rotate, False
+        return (
+            rotate
+            or self._blob_blocks >= MAX_BLOCKS
+            or (
+                self.max_blob_size is not None
+                and self._blob_size > 0
+                and self._blob_size + size > self.max_blob_size
+            )
+            or (
+                self.rotate_interval is not None
+                and time.monotonic() - self._blob_opened >= self.rotate_interval
+            )
+        )
+
+    def _open(self, rotated: Optional[bool] = False) -> None:
+        """
+        continue appending to the current blob name, creating it when it
+        is missing and moving on to the next name when it is full
+        """
+        if self._blob_name is None and "{sequence}" in self.dest:
+            # after a restart, pick up at the newest blob rather than the
+            # oldest one an earlier writer rotated away from
+            self._sequence = self._last_sequence()
+        while True:
+            name = self._format_name()
+            blob_client = self.storage_client.service_client.get_blob_client(
+                container=self.container_name, blob=name
+            )
+            try:
+                props = blob_client.get_blob_properties()
+            except ResourceNotFoundError:
+                try:
+                    blob_client.create_append_blob(
+                        content_settings=ContentSettings(
+                            content_type=self.content_type
+                        ),
+                        match_condition=MatchConditions.IfMissing,
+                    )
+                except ResourceExistsError:
+                    # created by another writer in the meantime
+                    continue
+                size, blocks = 0, 0
+            else:
+                if props.blob_type != BlobType.APPENDBLOB:
+                    raise Exception(f"{name} exists and is not an append blob")
+                size, blocks = props.size, props.append_blob_committed_block_count or 0
+                if blocks >= MAX_BLOCKS or (
+                    self.max_blob_size is not None and size >= self.max_blob_size
+                ):
+                    if "{sequence}" not in self.dest:
+                        raise Exception(f"{name} is full")
+                    self._sequence += 1
+                    continue
+
+            if rotated or name != self._blob_name:
+                self._blob_opened = time.monotonic()
+            self._blob_name = name
+            self._blob_client = blob_client
+            self._blob_size = size
+            self._blob_blocks = blocks
+            return
+
+    def _last_sequence(self) -> int:
+        """
+        the highest sequence with an existing blob for the current name,
+        doubling then bisecting since sequences are created in order
+        """
+        low, high = self._sequence, self._sequence + 1
+        while self._exists(high):
+            low, high = high, high * 2
+        while high - low > 1:
+            middle = (low + high) // 2
+            if self._exists(middle):
+                low = middle
+            else:
+                high = middle
+        return low
+
+    def _exists(self, sequence: int) -> bool:
+        """check if the blob for a rotation sequence exists"""
+        blob_client = self.storage_client.service_client.get_blob_client(
+            container=self.container_name, blob=self._format_name(sequence)
+        )
+        try:
+            blob_client.get_blob_properties()
+        except ResourceNotFoundError:
+            return False
+        return True
+
+    def _format_name(self, sequence: Optional[int] = None) -> str:
+        """the blob name for the current time and rotation sequence"""
+        if sequence is None:
+            sequence = self._sequence
+        name = datetime.now(timezone.utc).strftime(self.dest)
+        return name.replace("{sequence}", str(sequence))
@@ -0,0 +1,62 @@
+"""block planning for staged (resumable) block blob uploads"""
+
+import hashlib
+import os
+import uuid
+from typing import Iterator, List, NamedTuple, Optional
+
+# a block blob holds at most 50,000 committed blocks
+MAX_BLOCKS = 50000
+
+
+class BlockRange(NamedTuple):
+    """a block of the local file and the id it is staged under"""
+
+    block_id: str
+    offset: int
+    length: int
+
+
+def plan_blocks(
+    source: str, block_size: int, origin: Optional[str] = None
+) -> List[BlockRange]:
+    """
+    split a local file into blocks with ids that are stable for as long
+    as the file is unchanged, so a retried upload can skip staged blocks -
+    origin is the file source was derived from, like a compressed copy's
+    original, and is fingerprinted in its place
+    """
+    size = os.path.getsize(source)
+    stat = os.stat(origin or source)
+    count = (size + block_size - 1) // block_size
+    if count > MAX_BLOCKS:
+        raise Exception(
+            f"{source} needs {count} blocks, the maximum is {MAX_BLOCKS} - "
+            "increase the block size"
+        )
+
+    # every block id in a blob must have the same length
+    fingerprint = hashlib.md5(
+        f"{size}:{stat.st_mtime_ns}:{block_size}".encode()
+    ).hexdigest()[:16]
+    return [
+        BlockRange(
+            block_id=f"{fingerprint}-{index:05d}",
+            offset=index * block_size,
+            length=min(block_size, size - index * block_size),
+        )
+        for index in range(count)
+    ]
+
+
+def upload_block_ids() -> Iterator[str]:
+    """
+    block ids for one upload from memory or a stream, which cannot be
+    fingerprinted ahead of time so the ids are unique to the upload
+    """
+    prefix = uuid.uuid4().hex[:16]
+    for index in range(MAX_BLOCKS):
+        yield f"{prefix}-{index:05d}"
+    raise Exception(
+        f"the upload needs more than {MAX_BLOCKS} blocks - increase max_chunk_size"
+    )
@@ -0,0 +1,74 @@
+"""zero-copy views and writers for uploading from and downloading into memory"""
+
+from typing import Iterator, Union
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+def as_view(data: Buffer) -> memoryview:
+    """a flat view of the bytes of data, without copying them"""
+    view = memoryview(data)
+    if view.ndim == 1 and view.format == "B":
+        return view
+    return view.cast("B")
+
+
+def split_view(view: memoryview, size: int) -> Iterator[memoryview]:
+    """slices of at most size bytes, sharing the memory of view"""
+    for offset in range(0, len(view), size):
+        yield view[offset : offset + size]
+
+
+class BufferWriter:
+    """
+    a seekable file-like writer over a preallocated buffer, so downloads
+    land in the caller's memory - writing past its end raises
+    """
+
+    def __init__(self, buffer: Union[bytearray, memoryview]) -> None:
+        self.view = as_view(buffer)
+        if self.view.readonly:
+            raise TypeError("the buffer must be writable")
+        self.capacity = len(self.view)
+        self.position = 0
+        self.written = 0
+
+    def __repr__(self) -> str:
+        return (
+            "IoT Storage Buffer Writer\n"
+            "---------------------\n"
+            f"capacity: {self.capacity}\n"
+            f"written: {self.written}"
+        )
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        if whence == 1:
+            offset += self.position
+        elif whence == 2:
+            offset += self.capacity
+        if offset < 0:
+            raise ValueError(f"negative seek position {offset}")
+        self.position = offset
+        return self.position
+
+    def write(self, data: Buffer) -> int:
+        chunk = as_view(data)
+        end = self.position + len(chunk)
+        if end > self.capacity:
+            raise ValueError(
+                f"writing {len(chunk)} bytes at {self.position} overflows "
+                f"the {self.capacity} byte buffer"
+            )
+        self.view[self.position : end] = chunk
+        self.position = end
+        self.written = max(self.written, end)
+        return len(chunk)
@@ -0,0 +1,114 @@
+"""opt-in cache of container and blob properties"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional, Tuple
+
+CacheKey = Tuple[str, Optional[str]]
+
+
+class CachedProperties:
+    """existence, size, etag and last-modified time of a container or blob"""
+
+    __slots__ = ("exists", "size", "etag", "last_modified", "expires")
+
+    def __init__(
+        self,
+        exists: bool,
+        size: Optional[int] = None,
+        etag: Optional[str] = None,
+        last_modified: Optional[datetime] = None,
+    ) -> None:
+        self.exists = exists
+        self.size = size
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires = 0.0
+
+    def __repr__(self) -> str:
+        return (
+            "IoT Storage Cached Properties\n"
+            "---------------------\n"
+            f"exists: {self.exists}\n"
+            f"size: {self.size}\n"
+            f"etag: {self.etag}"
+        )
+
+    @classmethod
+    def from_properties(cls, props) -> "CachedProperties":
+        """build from the sdk's BlobProperties or ContainerProperties"""
+        return cls(
+            exists=True,
+            size=getattr(props, "size", None),
+            etag=props.etag,
+            last_modified=props.last_modified,
+        )
+
+
+class PropertiesCache:
+    """thread-safe lru cache of properties that go stale after ttl seconds"""
+
+    ttl: float
+    max_entries: int
+
+    def __init__(self, ttl: float, max_entries: Optional[int] = 1024) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[CacheKey, CachedProperties]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return (
+            "IoT Storage Properties Cache\n"
+            "---------------------\n"
+            f"entries: {len(self._entries)}/{self.max_entries}\n"
+            f"ttl: {self.ttl}s"
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(
+        self, container_name: str, blob: Optional[str] = None
+    ) -> Tuple[Optional[CachedProperties], bool]:
+        """
+        the cached properties of a container, or of a blob inside it,
+        and whether they are still fresh - stale entries are kept so
+        they can be revalidated with a conditional request
+        """
+        with self._lock:
+            entry = self._entries.get((container_name, blob))
+            if entry is None:
+                return None, False
+            self._entries.move_to_end((container_name, blob))
+            return entry, entry.expires > time.monotonic()
+
+    def put(
+        self, container_name: str, blob: Optional[str], entry: CachedProperties
+    ) -> None:
+        """store or refresh properties, evicting the least recently used"""
+        entry.expires = time.monotonic() + self.ttl
+        with self._lock:
+            self._entries[(container_name, blob)] = entry
+            self._entries.move_to_end((container_name, blob))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, container_name: str, blob: Optional[str] = None) -> None:
+        """
+        forget a blob, or a whole container with every
+        blob inside it when blob is none
+        """
+        with self._lock:
+            if blob is not None:
+                self._entries.pop((container_name, blob), None)
+                return
+            for key in [key for key in self._entries if key[0] == container_name]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        """forget every entry"""
+        with self._lock:
+            self._entries.clear()
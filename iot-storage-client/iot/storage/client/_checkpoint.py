@@ -0,0 +1,114 @@
+"""sidecar checkpoint files for resumable ranged downloads"""
+
+import json
+import os
+import threading
+from typing import List, Optional, Set, Tuple
+
+CHECKPOINT_SUFFIX = ".checkpoint"
+
+
+class DownloadCheckpoint:
+    """byte ranges of a blob already written to a local file"""
+
+    dest: str
+    etag: str
+    size: int
+    range_size: int
+    done: Set[int]
+
+    def __init__(
+        self,
+        dest: str,
+        etag: str,
+        size: int,
+        range_size: int,
+        done: Optional[Set[int]] = None,
+    ) -> None:
+        self.dest = dest
+        self.etag = etag
+        self.size = size
+        self.range_size = range_size
+        self.done = done or set()
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return (
+            "IoT Storage Download Checkpoint\n"
+            "---------------------\n"
+            f"dest: {self.dest}\n"
+            f"etag: {self.etag}\n"
+            f"ranges: {len(self.done)}/{len(self.ranges())}"
+        )
+
+    @property
+    def path(self) -> str:
+        """path of the sidecar file next to the download"""
+        return self.dest + CHECKPOINT_SUFFIX
+
+    @classmethod
+    def load(
+        cls, dest: str, etag: str, size: int, range_size: int
+    ) -> "DownloadCheckpoint":
+        """
+        resume from the sidecar file when it matches the blob's current etag,
+        otherwise start over with an empty file of the blob's size
+        """
+        checkpoint = cls(dest, etag, size, range_size)
+        try:
+            with open(checkpoint.path, "r") as file:
+                state = json.load(file)
+            if (
+                state["etag"] == etag
+                and state["size"] == size
+                and state["range_size"] == range_size
+                and os.path.getsize(dest) == size
+            ):
+                checkpoint.done = set(state["done"])
+                return checkpoint
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+        with open(dest, "wb") as file:
+            file.truncate(size)
+        checkpoint.save()
+        return checkpoint
+
+    def ranges(self) -> List[Tuple[int, int, int]]:
+        """list every (index, offset, length) range of the blob"""
+        return [
+            (index, offset, min(self.range_size, self.size - offset))
+            for index, offset in enumerate(range(0, self.size, self.range_size))
+        ]
+
+    def missing(self) -> List[Tuple[int, int, int]]:
+        """list the ranges that still need to be downloaded"""
+        return [item for item in self.ranges() if item[0] not in self.done]
+
+    def mark(self, index: int) -> None:
+        """record a written range and persist the checkpoint"""
+        with self._lock:
+            self.done.add(index)
+            self.save()
+
+    def save(self) -> None:
+        """atomically replace the sidecar file"""
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(
+                {
+                    "etag": self.etag,
+                    "size": self.size,
+                    "range_size": self.range_size,
+                    "done": sorted(self.done),
+                },
+                file,
+            )
+        os.replace(tmp_path, self.path)
+
+    def remove(self) -> None:
+        """delete the sidecar file once the download is complete"""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
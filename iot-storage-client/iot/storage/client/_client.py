@@ -1,13 +1,42 @@
 """wrapper for azure blob storage interactions"""
 
+import functools
+import itertools
+import mmap
 import os
 import tempfile
 import time
+import weakref
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
 from datetime import datetime, timedelta
-from typing import List, Optional, Union
+from typing import (
+    IO,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 
+from azure.core import MatchConditions
+from azure.core.exceptions import (
+    HttpResponseError,
+    ResourceExistsError,
+    ResourceNotFoundError,
+)
 from azure.storage.blob import (
+    BlobBlock,
     BlobClient,
+    BlobPrefix,
+    BlobProperties,
     BlobSasPermissions,
     BlobServiceClient,
     ContainerClient,
@@ -16,15 +45,42 @@ from azure.storage.blob import (
     generate_container_sas,
 )
 
+from ._blocks import BlockRange, plan_blocks, upload_block_ids
+from ._buffers import BufferWriter, as_view, split_view
+from ._cache import CachedProperties, PropertiesCache
+from ._checkpoint import DownloadCheckpoint
+from ._compression import (
+    StoredEncodingPolicy,
+    compress_file,
+    decompress_file,
+    is_compressed,
+    should_compress,
+)
+from ._exceptions import classify_error, copy_unsupported
 from ._helpers import (
+    LISTING_THRESHOLD,
     generate_cloud_conn_str,
     generate_cloud_sas_url,
     generate_edge_conn_str,
     generate_edge_sas_url,
     generate_local_conn_str,
     generate_local_sas_url,
+    split_batches,
+    walk_upload_paths,
+)
+from ._instrumentation import (
+    Instrumentation,
+    count_transfer,
+    instrumented,
+    note_error,
+    submit,
 )
-from ._types import CredentialType, LocationType
+from ._listing import BlobTree, merge_listings, parent_dirs
+from ._registry import client_registry, registry_key
+from ._retry import RetryPolicy
+from ._sas import SasTokenCache, sas_expiry
+from ._sync import SyncManifest, file_md5, is_unchanged, pair_paths
+from ._types import CredentialType, LocationType, SyncDirection, SyncStatus
 
 
 class IoTStorageClient:
@@ -39,6 +95,13 @@ class IoTStorageClient:
     module: Optional[str] = None
     host: Optional[str] = None
     port: Optional[str] = None
+    max_chunk_size: int = 4 * 1024 * 1024
+    shared_client: bool = False
+    properties_cache: Optional[PropertiesCache] = None
+    sas_cache: Optional[SasTokenCache] = None
+    retry_policy: Optional[RetryPolicy] = None
+    raise_errors: bool = False
+    instrumentation: Optional[Instrumentation] = None
 
     service_client: BlobServiceClient
     container_client: ContainerClient
@@ -53,6 +116,14 @@ class IoTStorageClient:
         module: Optional[str] = None,
         host: Optional[str] = None,
         port: Optional[str] = None,
+        max_chunk_size: Optional[int] = 4 * 1024 * 1024,
+        shared_client: Optional[bool] = False,
+        cache_ttl: Optional[float] = None,
+        cache_max_entries: Optional[int] = 1024,
+        sas_refresh_margin: Optional[float] = 300.0,
+        retry_policy: Optional[RetryPolicy] = None,
+        raise_errors: Optional[bool] = False,
+        instrumentation: Optional[Instrumentation] = None,
     ) -> None:
         self.credential_type = credential_type
         self.location_type = location_type
@@ -61,6 +132,21 @@ class IoTStorageClient:
         self.module = module
         self.host = host
         self.port = port
+        self.max_chunk_size = max_chunk_size
+        self.shared_client = shared_client
+        self.properties_cache = (
+            PropertiesCache(cache_ttl, cache_max_entries) if cache_ttl else None
+        )
+        self.sas_cache = (
+            SasTokenCache(sas_refresh_margin)
+            if sas_refresh_margin is not None
+            else None
+        )
+        self.retry_policy = retry_policy
+        self.raise_errors = raise_errors
+        self.instrumentation = instrumentation
+        self._release = None
+        self._compress_pool: Optional[ThreadPoolExecutor] = None
         self.instantiate_service_client()
 
     def __repr__(self) -> str:
@@ -77,9 +163,7 @@ class IoTStorageClient:
         """init service_client based on credential and location types"""
         if self.credential_type == CredentialType.CONNECTION_STRING:
             self.connection_string = self.credential
-            self.service_client = BlobServiceClient.from_connection_string(
-                self.credential
-            )
+            self.service_client = self._connect(self.credential)
         else:
             if self.location_type == LocationType.CLOUD_BASED:
                 connection_string = generate_cloud_conn_str(
@@ -92,9 +176,7 @@ class IoTStorageClient:
                     else None,
                 )
                 self.connection_string = connection_string
-                self.service_client = BlobServiceClient.from_connection_string(
-                    connection_string
-                )
+                self.service_client = self._connect(connection_string)
             if self.location_type == LocationType.EDGE_BASED:
                 connection_string = generate_edge_conn_str(
                     host=self.host,
@@ -108,9 +190,7 @@ class IoTStorageClient:
                     else None,
                 )
                 self.connection_string = connection_string
-                self.service_client = BlobServiceClient.from_connection_string(
-                    connection_string
-                )
+                self.service_client = self._connect(connection_string)
             if self.location_type == LocationType.LOCAL_BASED:
                 connection_string = generate_local_conn_str(
                     module=self.module,
@@ -124,34 +204,220 @@ class IoTStorageClient:
                     else None,
                 )
                 self.connection_string = connection_string
-                self.service_client = BlobServiceClient.from_connection_string(
-                    connection_string
-                )
+                self.service_client = self._connect(connection_string)
+
+    def _connect(self, connection_string: str) -> BlobServiceClient:
+        """create the service client, or borrow it from the shared registry"""
+
+        def factory() -> BlobServiceClient:
+            return BlobServiceClient.from_connection_string(
+                connection_string,
+                max_single_get_size=self.max_chunk_size,
+                max_chunk_get_size=self.max_chunk_size,
+                raw_response_hook=count_transfer,
+                retry_policy=self.retry_policy.pipeline_policy()
+                if self.retry_policy
+                else None,
+                _additional_pipeline_policies=[StoredEncodingPolicy()],
+            )
+
+        if self._release is not None:
+            self._release()
+            self._release = None
+        if not self.shared_client:
+            return factory()
+
+        key = registry_key(
+            self.credential_type,
+            self.location_type,
+            self.account_name,
+            self.credential,
+            module=self.module,
+            host=self.host,
+            port=self.port,
+            max_chunk_size=self.max_chunk_size,
+            retry_policy=self.retry_policy,
+        )
+        service_client = client_registry.acquire(key, factory)
+        # hand the client back when this instance is closed or collected
+        self._release = weakref.finalize(self, client_registry.release, key)
+        return service_client
+
+    def close(self) -> None:
+        """close the service client, or return it to the shared registry"""
+        if self._compress_pool is not None:
+            self._compress_pool.shutdown(wait=False)
+            self._compress_pool = None
+        if self._release is not None:
+            self._release()
+            self._release = None
+        else:
+            self.service_client.close()
+
+    def _handle_error(self, ex: Exception) -> None:
+        """raise ex as a typed error when raise_errors is set, else print it"""
+        note_error(ex)
+        if self.raise_errors:
+            error = classify_error(ex)
+            if error is ex:
+                raise error
+            raise error from ex
+        print(f"unexpected exception occurred: {ex}")
 
+    @instrumented
     def container_exists(self, container_name: str) -> bool:
         """check if a container exists"""
         try:
+            if self.properties_cache is not None:
+                return self._cached_properties(container_name).exists
             container_client = self.service_client.get_container_client(
                 container=container_name
             )
             return container_client.exists()
         except Exception as ex:
-            print(f"unexpected exception occurred: {ex}")
-            pass
+            self._handle_error(ex)
         return False
 
+    @instrumented
     def file_exists(self, container_name: str, file_name: str) -> bool:
         """check if a file exists"""
         try:
+            if self.properties_cache is not None:
+                return self._cached_properties(container_name, file_name).exists
             blob_client = self.service_client.get_blob_client(
                 container=container_name, blob=file_name
             )
             return blob_client.exists()
         except Exception as ex:
-            print(f"unexpected exception occurred: {ex}")
-            pass
+            self._handle_error(ex)
         return False
 
+    @instrumented
+    def files_exist(
+        self,
+        container_name: str,
+        names: List[str],
+        max_concurrency: Optional[int] = 16,
+        use_listing: Optional[bool] = None,
+    ) -> Union[Dict[str, bool], None]:
+        """check if many files exist, keyed by blob name"""
+        results = self.get_properties_many(
+            container_name, names, max_concurrency, use_listing
+        )
+        if results is None:
+            return None
+        return {name: props is not None for name, props in results.items()}
+
+    @instrumented
+    def get_properties_many(
+        self,
+        container_name: str,
+        names: List[str],
+        max_concurrency: Optional[int] = 16,
+        use_listing: Optional[bool] = None,
+    ) -> Union[Dict[str, Optional[BlobProperties]], None]:
+        """
+        get the properties of many files, keyed by blob name with none for
+        missing files, from one listing pass or concurrent head requests
+        """
+        try:
+            container_client = self.service_client.get_container_client(
+                container=container_name
+            )
+            wanted = list(dict.fromkeys(names))
+            results = {name: None for name in wanted}
+            if not wanted:
+                return results
+
+            prefix = os.path.commonprefix(wanted)
+            if use_listing is None:
+                use_listing = bool(prefix) and len(wanted) >= LISTING_THRESHOLD
+            if use_listing:
+                # listings are sorted, stop once past the last wanted name
+                last = max(wanted)
+                for blob in container_client.list_blobs(name_starts_with=prefix):
+                    if blob.name > last:
+                        break
+                    if blob.name in results:
+                        results[blob.name] = blob
+            else:
+
+                def head(name: str) -> None:
+                    blob_client = container_client.get_blob_client(name)
+                    try:
+                        results[name] = blob_client.get_blob_properties()
+                    except ResourceNotFoundError:
+                        pass
+
+                with ThreadPoolExecutor(
+                    max_workers=max(1, max_concurrency)
+                ) as executor:
+                    for future in as_completed(
+                        [submit(executor, head, name) for name in wanted]
+                    ):
+                        future.result()
+
+            if self.properties_cache is not None:
+                for name, props in results.items():
+                    self.properties_cache.put(
+                        container_name,
+                        name,
+                        CachedProperties.from_properties(props)
+                        if props is not None
+                        else CachedProperties(exists=False),
+                    )
+            return results
+        except Exception as ex:
+            self._handle_error(ex)
+        return None
+
+    def _cached_properties(
+        self, container_name: str, blob: Optional[str] = None
+    ) -> CachedProperties:
+        """properties from the cache, fetched or revalidated once stale"""
+        entry, fresh = self.properties_cache.get(container_name, blob)
+        if fresh:
+            return entry
+        try:
+            if blob is None:
+                container_client = self.service_client.get_container_client(
+                    container=container_name
+                )
+                props = container_client.get_container_properties()
+            else:
+                blob_client = self.service_client.get_blob_client(
+                    container=container_name, blob=blob
+                )
+                if entry is not None and entry.etag:
+                    # a 304 confirms the cached entry without resending it
+                    props = blob_client.get_blob_properties(
+                        etag=entry.etag, match_condition=MatchConditions.IfModified
+                    )
+                else:
+                    props = blob_client.get_blob_properties()
+            entry = CachedProperties.from_properties(props)
+        except ResourceNotFoundError:
+            entry = CachedProperties(exists=False)
+        except HttpResponseError as ex:
+            # the sdk raises a 304 as a plain or condition error
+            if ex.status_code != 304 or entry is None:
+                raise
+        self.properties_cache.put(container_name, blob, entry)
+        return entry
+
+    def _invalidate(
+        self, container_name: str, blobs: Optional[List[str]] = None
+    ) -> None:
+        """drop cached properties of blobs, or a whole container, after a write"""
+        if self.properties_cache is None:
+            return
+        if blobs is None:
+            self.properties_cache.invalidate(container_name)
+            return
+        for blob in blobs:
+            self.properties_cache.invalidate(container_name, blob)
+
+    @instrumented
     def create_container(self, container_name: str) -> bool:
         """create a new container"""
         try:
@@ -161,10 +427,12 @@ class IoTStorageClient:
             container_client.create_container()
             return True
         except Exception as ex:
-            print(f"unexpected exception occurred: {ex}")
-            pass
+            self._handle_error(ex)
+        finally:
+            self._invalidate(container_name)
         return False
 
+    @instrumented
     def delete_container(self, container_name: str) -> bool:
         """delete a container"""
         try:
@@ -174,11 +442,19 @@ class IoTStorageClient:
             container_client.delete_container()
             return True
         except Exception as ex:
-            print(f"unexpected exception occurred: {ex}")
-            pass
+            self._handle_error(ex)
+        finally:
+            self._invalidate(container_name)
         return False
 
-    def download(self, container_name: str, source: str, dest: str) -> bool:
+    @instrumented
+    def download(
+        self,
+        container_name: str,
+        source: str,
+        dest: str,
+        max_concurrency: Optional[int] = 8,
+    ) -> bool:
         """download a file or directory to a path on the local filesystem"""
         try:
             if not dest:
@@ -186,26 +462,84 @@ class IoTStorageClient:
 
             blobs = self.list_files(container_name, source, recursive=True)
             if blobs:
-                # if source is a directory, dest must also be a directory
-                if not source == "" and not source.endswith("/"):
-                    source += "/"
-                if not dest.endswith("/"):
-                    dest += "/"
-
-                # append the directory name from source to the destination
-                dest += os.path.basename(os.path.normpath(source)) + "/"
-                blobs = [source + blob for blob in blobs]
-                for blob in blobs:
-                    blob_dest = dest + os.path.relpath(blob, source)
-                    return self.download_file(container_name, blob, blob_dest)
-            else:
-                return self.download_file(container_name, source, dest)
+                results = self._download_blobs(
+                    container_name, source, dest, blobs, max_concurrency
+                )
+                return all(results.values())
+            return self.download_file(container_name, source, dest)
         except Exception as ex:
-            print(f"unexpected exception occurred: {ex}")
-            pass
+            self._handle_error(ex)
         return False
 
-    def download_file(self, container_name: str, source: str, dest: str) -> bool:
+    @instrumented
+    def download_dir(
+        self,
+        container_name: str,
+        source: str,
+        dest: str,
+        max_concurrency: Optional[int] = 8,
+    ) -> Union[Dict[str, bool], None]:
+        """download a directory to a path on the local filesystem in parallel"""
+        try:
+            if not dest:
+                raise Exception("a destination must be provided")
+
+            blobs = self.list_files(container_name, source, recursive=True)
+            if blobs is None:
+                return None
+            return self._download_blobs(
+                container_name, source, dest, blobs, max_concurrency
+            )
+        except Exception as ex:
+            self._handle_error(ex)
+        return None
+
+    def _download_blobs(
+        self,
+        container_name: str,
+        source: str,
+        dest: str,
+        blobs: List[str],
+        max_concurrency: Optional[int] = 8,
+    ) -> Dict[str, bool]:
+        """download blobs relative to source with a bounded thread pool"""
+        # if source is a directory, dest must also be a directory
+        if not source == "" and not source.endswith("/"):
+            source += "/"
+        if not dest.endswith("/"):
+            dest += "/"
+
+        # append the directory name from source to the destination
+        dest += os.path.basename(os.path.normpath(source)) + "/"
+        blobs = [source + blob for blob in blobs]
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+            futures = {
+                submit(
+                    executor,
+                    self.download_file,
+                    container_name,
+                    blob,
+                    dest + os.path.relpath(blob, source),
+                ): blob
+                for blob in blobs
+            }
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+        return results
+
+    @instrumented
+    def download_file(
+        self,
+        container_name: str,
+        source: str,
+        dest: str,
+        max_concurrency: Optional[int] = 1,
+        resumable: Optional[bool] = False,
+        range_size: Optional[int] = 4 * 1024 * 1024,
+        decompress: Optional[bool] = True,
+    ) -> bool:
         """download a file to a path on the local filesystem"""
         try:
             if dest.endswith("."):
@@ -218,16 +552,114 @@ class IoTStorageClient:
             )
 
             if not dest.endswith("/"):
-                with open(blob_dest, "wb") as file:
-                    data = blob_client.download_blob()
-                    file.write(data.readall())
+                if resumable:
+                    encoding = self._download_ranges(
+                        blob_client, blob_dest, max_concurrency, range_size
+                    )
+                else:
+                    with open(blob_dest, "wb") as file:
+                        # stream chunks straight to disk instead of buffering the blob
+                        data = blob_client.download_blob(
+                            max_concurrency=max_concurrency
+                        )
+                        data.readinto(file)
+                    encoding = data.properties.content_settings.content_encoding
+                if decompress and is_compressed(encoding):
+                    decompress_file(blob_dest, encoding)
                 return True
             return False
         except Exception as ex:
-            print(f"unexpected exception occurred: {ex}")
-            pass
+            self._handle_error(ex)
         return False
 
+    def _download_ranges(
+        self,
+        blob_client: BlobClient,
+        dest: str,
+        max_concurrency: int,
+        range_size: int,
+    ) -> Optional[str]:
+        """
+        download missing byte ranges in parallel, checkpointing each one,
+        returning the blob's content encoding
+        """
+        props = blob_client.get_blob_properties()
+        checkpoint = DownloadCheckpoint.load(dest, props.etag, props.size, range_size)
+
+        def fetch(index: int, offset: int, length: int) -> None:
+            # fails with a 412 if the blob changed since the checkpoint
+            data = blob_client.download_blob(
+                offset=offset,
+                length=length,
+                etag=checkpoint.etag,
+                match_condition=MatchConditions.IfNotModified,
+            )
+            with open(dest, "r+b") as file:
+                file.seek(offset)
+                data.readinto(file)
+            checkpoint.mark(index)
+
+        with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as pool:
+            for future in as_completed(
+                [submit(pool, fetch, *item) for item in checkpoint.missing()]
+            ):
+                future.result()
+        checkpoint.remove()
+        return props.content_settings.content_encoding
+
+    @instrumented
+    def download_to_stream(
+        self,
+        container_name: str,
+        source: str,
+        stream: IO[bytes],
+        offset: Optional[int] = None,
+        length: Optional[int] = None,
+        max_concurrency: Optional[int] = 1,
+    ) -> Optional[int]:
+        """download a file into a writable file-like object, returning the bytes written"""
+        try:
+            blob_client = self.service_client.get_blob_client(
+                container=container_name, blob=source
+            )
+            data = blob_client.download_blob(
+                offset=offset, length=length, max_concurrency=max_concurrency
+            )
+            return data.readinto(stream)
+        except Exception as ex:
+            self._handle_error(ex)
+        return None
+
+    @instrumented
+    def download_into(
+        self,
+        container_name: str,
+        source: str,
+        buffer: Union[bytearray, memoryview],
+        offset: Optional[int] = None,
+        length: Optional[int] = None,
+        max_concurrency: Optional[int] = 1,
+    ) -> Optional[int]:
+        """download a file into a preallocated buffer, returning the bytes filled"""
+        try:
+            writer = BufferWriter(buffer)
+            blob_client = self.service_client.get_blob_client(
+                container=container_name, blob=source
+            )
+            data = blob_client.download_blob(
+                offset=offset, length=length, max_concurrency=max_concurrency
+            )
+            if data.size > writer.capacity:
+                raise Exception(
+                    f"{source} needs {data.size} bytes, "
+                    f"the buffer holds {writer.capacity}"
+                )
+            return data.readinto(writer)
+        except Exception as ex:
+            self._handle_error(ex)
+        return None
+
+    @instrumented
     def upload(self, container_name: str, source: str, dest: str) -> bool:
         """upload a file or directory to a path inside the container"""
         if os.path.isdir(source):
@@ -235,24 +667,167 @@ class IoTStorageClient:
         else:
             return self.upload_file(container_name, source, dest)
 
-    def upload_dir(self, container_name: str, source: str, dest: str) -> bool:
-        """upload a directory to a path inside the container"""
-        try:
-            prefix = "" if dest == "" else dest + "/"
-            prefix + os.path.basename(source) + "/"
-            for root, dirs, files in os.walk(source):
-                for name in files:
-                    dir_part = os.path.relpath(root, source)
-                    dir_part = "" if dir_part == "." else dir_part + "/"
-                    file_path = os.path.join(root, name)
-                    blob_path = prefix + dir_part + name
-                    self.upload_file(container_name, file_path, blob_path)
-            return True
+    @instrumented
+    def upload_dir(
+        self,
+        container_name: str,
+        source: str,
+        dest: str,
+        max_concurrency: Optional[int] = 8,
+        progress_callback: Optional[Callable[[str, str, bool], None]] = None,
+    ) -> bool:
+        """upload a directory to a path inside the container in parallel"""
+        try:
+            results = []
+            with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+                futures = {
+                    submit(
+                        executor, self.upload_file, container_name, file_path, blob_path
+                    ): (file_path, blob_path)
+                    for file_path, blob_path in walk_upload_paths(source, dest)
+                }
+                for future in as_completed(futures):
+                    result = future.result()
+                    if progress_callback:
+                        progress_callback(*futures[future], result)
+                    results.append(result)
+            return all(results)
         except Exception as ex:
-            print(f"unexpected exception occurred: {ex}")
-            pass
+            self._handle_error(ex)
         return False
 
+    @instrumented
+    def sync_dir(
+        self,
+        container_name: str,
+        source: str,
+        dest: str,
+        direction: Optional[str] = SyncDirection.UPLOAD,
+        delete_orphans: Optional[bool] = False,
+        manifest: Optional[str] = None,
+        max_concurrency: Optional[int] = 8,
+    ) -> Union[Dict[str, str], None]:
+        """transfer only changed files between a directory and a container path"""
+        try:
+            container_client = self.service_client.get_container_client(
+                container=container_name
+            )
+            if direction == SyncDirection.UPLOAD:
+                local_dir, prefix = source, dest.strip("/")
+            else:
+                local_dir, prefix = dest, source.strip("/")
+
+            sync_manifest = SyncManifest(manifest)
+            blobs = {
+                blob.name: blob
+                for blob in container_client.list_blobs(
+                    name_starts_with=prefix + "/" if prefix else None
+                )
+                if not blob.name.endswith("/")
+            }
+            pairs, orphans = pair_paths(
+                local_dir,
+                prefix,
+                blobs,
+                direction,
+                exclude=[manifest, manifest + ".tmp"] if manifest else [],
+            )
+
+            results = {}
+            with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+                futures = {
+                    submit(
+                        executor,
+                        self._sync_file,
+                        container_client,
+                        name,
+                        local_path,
+                        blobs.get(name),
+                        direction,
+                        sync_manifest,
+                    ): name
+                    for name, local_path in pairs.items()
+                }
+                for future in as_completed(futures):
+                    results[futures[future]] = future.result()
+
+            if delete_orphans and orphans:
+                if direction == SyncDirection.UPLOAD:
+                    deleted = (
+                        self.delete_files(
+                            container_name, list(orphans), max_concurrency
+                        )
+                        or {}
+                    )
+                    for name in orphans:
+                        results[name] = (
+                            SyncStatus.DELETED
+                            if deleted.get(name)
+                            else SyncStatus.FAILED
+                        )
+                else:
+                    for name, local_path in orphans.items():
+                        try:
+                            os.remove(local_path)
+                            results[name] = SyncStatus.DELETED
+                        except OSError as ex:
+                            print(f"unable to delete {local_path}: {ex}")
+                            results[name] = SyncStatus.FAILED
+                for name in orphans:
+                    if results[name] == SyncStatus.DELETED:
+                        sync_manifest.forget(name)
+
+            sync_manifest.save()
+            return results
+        except Exception as ex:
+            self._handle_error(ex)
+        return None
+
+    def _sync_file(
+        self,
+        container_client: ContainerClient,
+        name: str,
+        local_path: str,
+        blob: Optional[BlobProperties],
+        direction: str,
+        manifest: SyncManifest,
+    ) -> str:
+        """transfer one file unless unchanged and record it in the manifest"""
+        try:
+            if (
+                blob is not None
+                and os.path.isfile(local_path)
+                and is_unchanged(name, local_path, blob, manifest, direction)
+            ):
+                manifest.record(name, local_path, blob.etag)
+                return SyncStatus.UNCHANGED
+
+            blob_client = container_client.get_blob_client(name)
+            if direction == SyncDirection.UPLOAD:
+                # store the md5 so later syncs can compare content
+                content_settings = ContentSettings(
+                    content_type="application/octet-stream",
+                    content_md5=bytearray(file_md5(local_path)),
+                )
+                with open(local_path, "rb") as data:
+                    result = blob_client.upload_blob(
+                        data, overwrite=True, content_settings=content_settings
+                    )
+                etag = result["etag"]
+                self._invalidate(container_client.container_name, [name])
+            else:
+                os.makedirs(os.path.dirname(local_path), exist_ok=True)
+                with open(local_path, "wb") as file:
+                    downloader = blob_client.download_blob()
+                    downloader.readinto(file)
+                etag = downloader.properties.etag
+            manifest.record(name, local_path, etag)
+            return SyncStatus.TRANSFERRED
+        except Exception as ex:
+            self._handle_error(ex)
+        return SyncStatus.FAILED
+
+    @instrumented
     def upload_file(
         self,
         container_name: str,
@@ -260,9 +835,35 @@ class IoTStorageClient:
         dest: str,
         content_type: Optional[str] = "application/octet-stream",
         overwrite: Optional[bool] = True,
+        block_size: Optional[int] = None,
+        max_concurrency: Optional[int] = 8,
+        compression: Optional[str] = None,
+        compression_threshold: Optional[int] = 1024,
     ) -> bool:
         """upload a single file to a path inside the container"""
+        compressed, origin = None, None
         try:
+            content_settings = ContentSettings(content_type=content_type)
+            if compression and should_compress(
+                content_type, os.path.getsize(source), compression_threshold
+            ):
+                # upload a compressed copy, removed once the upload is done
+                compressed = self._compress(source, compression)
+                content_settings.content_encoding = compression
+                source, origin = compressed, source
+
+            if block_size and os.path.getsize(source) > 0:
+                return self._upload_blocks(
+                    container_name,
+                    source,
+                    dest,
+                    content_settings,
+                    overwrite,
+                    block_size,
+                    max_concurrency,
+                    origin,
+                )
+
             container_client = self.service_client.get_container_client(
                 container=container_name
             )
@@ -272,18 +873,215 @@ class IoTStorageClient:
                     name=dest,
                     data=data,
                     overwrite=overwrite,
-                    content_settings=ContentSettings(content_type=content_type),
+                    content_settings=content_settings,
                 )
             return True
         except Exception as ex:
-            print(f"unexpected exception occurred: {ex}")
-            pass
+            self._handle_error(ex)
+        finally:
+            self._invalidate(container_name, [dest])
+            if compressed:
+                os.remove(compressed)
+        return False
+
+    def _compress(self, source: str, compression: str) -> str:
+        """
+        compress a file on the client's worker pool, sized to the cpu count
+        so concurrent uploads don't oversubscribe the device
+        """
+        if self._compress_pool is None:
+            self._compress_pool = ThreadPoolExecutor(
+                max_workers=os.cpu_count() or 1,
+                thread_name_prefix="iot-storage-compress",
+            )
+        return submit(self._compress_pool, compress_file, source, compression).result()
+
+    def _upload_blocks(
+        self,
+        container_name: str,
+        source: str,
+        dest: str,
+        content_settings: ContentSettings,
+        overwrite: bool,
+        block_size: int,
+        max_concurrency: int,
+        origin: Optional[str] = None,
+    ) -> bool:
+        """stage the file as blocks in parallel, skipping staged ones, then commit"""
+        blob_client = self.service_client.get_blob_client(
+            container=container_name, blob=dest
+        )
+        if not overwrite and blob_client.exists():
+            raise ResourceExistsError(f"blob {dest} already exists")
+
+        # a compressed copy is rewritten on every call, so its blocks
+        # are identified by the original file
+        blocks = plan_blocks(source, block_size, origin)
+        try:
+            # blocks staged by an interrupted upload of the same file
+            _, uncommitted = blob_client.get_block_list("uncommitted")
+            staged = {(block.id, block.size) for block in uncommitted}
+        except ResourceNotFoundError:
+            staged = set()
+        missing = [
+            block for block in blocks if (block.block_id, block.length) not in staged
+        ]
+
+        if missing:
+            with open(source, "rb") as file, mmap.mmap(
+                file.fileno(), 0, access=mmap.ACCESS_READ
+            ) as data:
+
+                def stage(block: BlockRange) -> None:
+                    # slice inside the worker to hold at most one block per thread
+                    blob_client.stage_block(
+                        block.block_id,
+                        data[block.offset : block.offset + block.length],
+                        length=block.length,
+                    )
+
+                with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as pool:
+                    for future in as_completed(
+                        [submit(pool, stage, block) for block in missing]
+                    ):
+                        future.result()
+
+        conditions = {} if overwrite else {"match_condition": MatchConditions.IfMissing}
+        blob_client.commit_block_list(
+            [BlobBlock(block_id=block.block_id) for block in blocks],
+            content_settings=content_settings,
+            **conditions,
+        )
+        return True
+
+    @instrumented
+    def upload_bytes(
+        self,
+        container_name: str,
+        data: Union[bytes, bytearray, memoryview],
+        dest: str,
+        content_type: Optional[str] = "application/octet-stream",
+        overwrite: Optional[bool] = True,
+        max_concurrency: Optional[int] = 8,
+    ) -> bool:
+        """upload bytes held in memory to a path inside the container"""
+        try:
+            content_settings = ContentSettings(content_type=content_type)
+            blob_client = self.service_client.get_blob_client(
+                container=container_name, blob=dest
+            )
+            if isinstance(data, bytes) and len(data) <= self.max_chunk_size:
+                # the sdk sends bytes in a single request without copying them
+                blob_client.upload_blob(
+                    data, overwrite=overwrite, content_settings=content_settings
+                )
+                return True
+            # blocks are slices sharing the caller's memory
+            return self._stage_chunks(
+                blob_client,
+                split_view(as_view(data), self.max_chunk_size),
+                content_settings,
+                overwrite,
+                max_concurrency,
+            )
+        except Exception as ex:
+            self._handle_error(ex)
+        finally:
+            self._invalidate(container_name, [dest])
+        return False
+
+    @instrumented
+    def upload_stream(
+        self,
+        container_name: str,
+        stream: IO[bytes],
+        dest: str,
+        content_type: Optional[str] = "application/octet-stream",
+        overwrite: Optional[bool] = True,
+        max_concurrency: Optional[int] = 8,
+    ) -> bool:
+        """upload the rest of a readable file-like object to a path inside the container"""
+        try:
+            content_settings = ContentSettings(content_type=content_type)
+            blob_client = self.service_client.get_blob_client(
+                container=container_name, blob=dest
+            )
+            first = stream.read(self.max_chunk_size)
+            following = stream.read(self.max_chunk_size) if first else b""
+            if not following:
+                blob_client.upload_blob(
+                    first, overwrite=overwrite, content_settings=content_settings
+                )
+                return True
+            chunks = itertools.chain(
+                (first, following),
+                iter(functools.partial(stream.read, self.max_chunk_size), b""),
+            )
+            return self._stage_chunks(
+                blob_client, chunks, content_settings, overwrite, max_concurrency
+            )
+        except Exception as ex:
+            self._handle_error(ex)
+        finally:
+            self._invalidate(container_name, [dest])
         return False
 
-    def delete_dir(self, container_name: str, path: str) -> bool:
+    def _stage_chunks(
+        self,
+        blob_client: BlobClient,
+        chunks: Iterable[Union[bytes, memoryview]],
+        content_settings: ContentSettings,
+        overwrite: bool,
+        max_concurrency: int,
+    ) -> bool:
+        """
+        stage chunks as the blocks of a new blob then commit them, taking
+        the next chunk only once a worker is free so at most max_concurrency
+        chunks are held at a time
+        """
+        if not overwrite and blob_client.exists():
+            raise ResourceExistsError(f"blob {blob_client.blob_name} already exists")
+
+        block_ids = upload_block_ids()
+        staged: List[str] = []
+        workers = max(1, max_concurrency)
+        pending = set()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for chunk in chunks:
+                if len(pending) >= workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+                staged.append(next(block_ids))
+                pending.add(
+                    submit(
+                        pool,
+                        blob_client.stage_block,
+                        staged[-1],
+                        chunk,
+                        length=len(chunk),
+                    )
+                )
+            for future in pending:
+                future.result()
+
+        conditions = {} if overwrite else {"match_condition": MatchConditions.IfMissing}
+        blob_client.commit_block_list(
+            [BlobBlock(block_id=block_id) for block_id in staged],
+            content_settings=content_settings,
+            **conditions,
+        )
+        return True
+
+    @instrumented
+    def delete_dir(
+        self, container_name: str, path: str, max_concurrency: Optional[int] = 4
+    ) -> bool:
         """remove a directory and its contents recursively"""
         try:
             blobs = self.list_files(container_name, path, recursive=True)
+            if blobs is None:
+                return False
             if not blobs:
                 return True
 
@@ -291,16 +1089,57 @@ class IoTStorageClient:
                 path += "/"
             blobs = [path + blob for blob in blobs]
 
+            results = self.delete_files(container_name, blobs, max_concurrency)
+            return results is not None and all(results.values())
+        except Exception as ex:
+            self._handle_error(ex)
+        return False
+
+    @instrumented
+    def delete_files(
+        self,
+        container_name: str,
+        paths: List[str],
+        max_concurrency: Optional[int] = 4,
+    ) -> Union[Dict[str, bool], None]:
+        """remove many files in service-sized batches sent concurrently"""
+        try:
             container_client = self.service_client.get_container_client(
                 container=container_name
             )
-            container_client.delete_blobs(*blobs)
-            return True
+
+            results = {}
+            with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+                futures = [
+                    submit(executor, self._delete_batch, container_client, batch)
+                    for batch in split_batches(paths)
+                ]
+                for future in as_completed(futures):
+                    results.update(future.result())
+            return results
         except Exception as ex:
-            print(f"unexpected exception occurred: {ex}")
-            pass
-        return False
+            self._handle_error(ex)
+        finally:
+            self._invalidate(container_name, paths)
+        return None
 
+    def _delete_batch(
+        self, container_client: ContainerClient, batch: List[str]
+    ) -> Dict[str, bool]:
+        """send a single delete batch and report each sub-request"""
+        try:
+            responses = container_client.delete_blobs(
+                *batch, raise_on_any_failure=False
+            )
+            return {
+                blob: 200 <= response.status_code < 300
+                for blob, response in zip(batch, responses)
+            }
+        except Exception as ex:
+            self._handle_error(ex)
+        return {blob: False for blob in batch}
+
+    @instrumented
     def delete_file(self, container_name: str, path: str) -> bool:
         """remove a single file from a path inside the container"""
         try:
@@ -310,14 +1149,40 @@ class IoTStorageClient:
             container_client.delete_blob(path)
             return True
         except Exception as ex:
-            print(f"unexpected exception occurred: {ex}")
-            pass
+            self._handle_error(ex)
+        finally:
+            self._invalidate(container_name, [path])
         return False
 
+    @instrumented
     def list_files(
         self, container_name: str, path: str, recursive: Optional[bool] = False
     ) -> Union[List[str], None]:
         """list files under a path, optionally recursive"""
+        try:
+            if not recursive:
+                items = self._walk_level(container_name, path)
+                return [name for name, is_dir in items if not is_dir]
+
+            index = self.index_blobs(container_name, path)
+            return index.files(recursive=True) if index else None
+        except Exception as ex:
+            self._handle_error(ex)
+        return None
+
+    @instrumented
+    def list_files_parallel(
+        self,
+        container_name: str,
+        path: str,
+        partitions: Optional[List[str]] = None,
+        partition_depth: Optional[int] = 1,
+        max_concurrency: Optional[int] = 8,
+    ) -> Union[List[str], None]:
+        """
+        list files under a path recursively, listing prefix partitions
+        concurrently and merging them in name order
+        """
         try:
             if not path == "" and not path.endswith("/"):
                 path += "/"
@@ -325,23 +1190,147 @@ class IoTStorageClient:
             container_client = self.service_client.get_container_client(
                 container=container_name
             )
-            blob_iter = container_client.list_blobs(name_starts_with=path)
 
-            files = []
-            for blob in blob_iter:
-                relative_path = os.path.relpath(blob.name, path)
-                if recursive or not "/" in relative_path:
-                    files.append(relative_path)
-            return files
+            def list_partition(prefix: str) -> List[str]:
+                # the service lists each partition in name order
+                return [
+                    blob.name[len(path) :]
+                    for blob in container_client.list_blobs(
+                        name_starts_with=path + prefix
+                    )
+                ]
+
+            with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as pool:
+                files = []
+                if partitions is None:
+                    files, partitions = self._find_partitions(
+                        pool, container_name, path, partition_depth
+                    )
+                futures = [submit(pool, list_partition, p) for p in partitions]
+                return merge_listings([files] + [f.result() for f in futures])
         except Exception as ex:
-            print(f"unexpected exception occurred: {ex}")
-            pass
+            self._handle_error(ex)
         return None
 
+    def _find_partitions(
+        self, pool: ThreadPoolExecutor, container_name: str, path: str, depth: int
+    ) -> Tuple[List[str], List[str]]:
+        """
+        walk depth levels under path concurrently, returning the files
+        found on the way and the prefixes below them, relative to path
+        """
+        files, prefixes = [], [""]
+        for _ in range(depth):
+            futures = [
+                submit(pool, self._walk_level, container_name, path + prefix)
+                for prefix in prefixes
+            ]
+            level = []
+            for prefix, future in zip(prefixes, futures):
+                for name, is_dir in future.result():
+                    if is_dir:
+                        level.append(f"{prefix}{name}/")
+                    else:
+                        files.append(prefix + name)
+            prefixes = level
+        return sorted(files), prefixes
+
+    @instrumented
     def list_dirs(
         self, container_name: str, path: str, recursive: Optional[bool] = False
     ) -> Union[List[str], None]:
         """list directories under a path, optionally recursive"""
+        try:
+            if not recursive:
+                items = self._walk_level(container_name, path)
+                return [name for name, is_dir in items if is_dir]
+
+            index = self.index_blobs(container_name, path)
+            return index.dirs(recursive=True) if index else None
+        except Exception as ex:
+            self._handle_error(ex)
+        return None
+
+    def iter_pages(
+        self,
+        container_name: str,
+        path: str,
+        recursive: Optional[bool] = False,
+        results_per_page: Optional[int] = None,
+        continuation_token: Optional[str] = None,
+    ) -> Iterator[Tuple[List[str], List[str], Optional[str]]]:
+        """
+        yield (files, dirs, continuation_token) for each page the service
+        returns under a path, the token resumes the listing after that page
+        """
+        try:
+            if not path == "" and not path.endswith("/"):
+                path += "/"
+
+            container_client = self.service_client.get_container_client(
+                container=container_name
+            )
+            if recursive:
+                pager = container_client.list_blobs(
+                    name_starts_with=path, results_per_page=results_per_page
+                ).by_page(continuation_token=continuation_token)
+            else:
+                pager = container_client.walk_blobs(
+                    name_starts_with=path,
+                    delimiter="/",
+                    results_per_page=results_per_page,
+                ).by_page(continuation_token=continuation_token)
+
+            # directories already yielded by a recursive listing
+            seen_dirs = set()
+            for page in pager:
+                files, dirs = [], []
+                for item in page:
+                    name = item.name[len(path) :]
+                    if isinstance(item, BlobPrefix):
+                        dirs.append(name.rstrip("/"))
+                        continue
+                    files.append(name)
+                    if recursive:
+                        for parent in parent_dirs(name):
+                            if parent not in seen_dirs:
+                                seen_dirs.add(parent)
+                                dirs.append(parent)
+                yield files, dirs, pager.continuation_token
+        except Exception as ex:
+            self._handle_error(ex)
+
+    def iter_files(
+        self,
+        container_name: str,
+        path: str,
+        recursive: Optional[bool] = False,
+        results_per_page: Optional[int] = None,
+        continuation_token: Optional[str] = None,
+    ) -> Iterator[str]:
+        """lazily yield files under a path as each page arrives"""
+        for files, _, _ in self.iter_pages(
+            container_name, path, recursive, results_per_page, continuation_token
+        ):
+            yield from files
+
+    def iter_dirs(
+        self,
+        container_name: str,
+        path: str,
+        recursive: Optional[bool] = False,
+        results_per_page: Optional[int] = None,
+        continuation_token: Optional[str] = None,
+    ) -> Iterator[str]:
+        """lazily yield directories under a path as each page arrives"""
+        for _, dirs, _ in self.iter_pages(
+            container_name, path, recursive, results_per_page, continuation_token
+        ):
+            yield from dirs
+
+    @instrumented
+    def index_blobs(self, container_name: str, path: str) -> Union[BlobTree, None]:
+        """list every blob under a path once into a queryable prefix tree"""
         try:
             if not path == "" and not path.endswith("/"):
                 path += "/"
@@ -349,27 +1338,159 @@ class IoTStorageClient:
             container_client = self.service_client.get_container_client(
                 container=container_name
             )
-            blob_iter = container_client.list_blobs(name_starts_with=path)
-
-            dirs = []
-            for blob in blob_iter:
-                relative_dir = os.path.dirname(os.path.relpath(blob.name, path))
-                if (
-                    relative_dir
-                    and (recursive or not "/" in relative_dir)
-                    and not relative_dir in dirs
-                ):
-                    dirs.append(relative_dir)
-            return dirs
-        except Exception as ex:
-            print(f"unexpected exception occurred: {ex}")
-            pass
+
+            index = BlobTree()
+            for blob in container_client.list_blobs(name_starts_with=path):
+                index.add(blob.name[len(path) :])
+            return index
+        except Exception as ex:
+            self._handle_error(ex)
         return None
 
+    def _walk_level(self, container_name: str, path: str) -> List[Tuple[str, bool]]:
+        """list a single level under path with a delimited listing"""
+        if not path == "" and not path.endswith("/"):
+            path += "/"
+
+        container_client = self.service_client.get_container_client(
+            container=container_name
+        )
+
+        items = []
+        for item in container_client.walk_blobs(name_starts_with=path, delimiter="/"):
+            # prefixes are the sub-directories at this level
+            is_dir = isinstance(item, BlobPrefix)
+            name = item.name[len(path) :]
+            items.append((name.rstrip("/") if is_dir else name, is_dir))
+        return items
+
+    @instrumented
     def copy_file(
-        self, container_name: str, source: str, dest_container: str, dest: str
+        self,
+        container_name: str,
+        source: str,
+        dest_container: str,
+        dest: str,
+        timeout: Optional[int] = 100,
     ) -> bool:
         """copy a file between any location within the same storage account"""
+        try:
+            if self._copy_server_side(
+                container_name, source, dest_container, dest, timeout
+            ):
+                return True
+
+            # fall back to a download/upload round trip for targets
+            # that can't copy server-side (e.g. AzureBlobStorageonIoTEdge)
+            return self._copy_via_temp_file(
+                container_name, source, dest_container, dest
+            )
+        except Exception as ex:
+            self._handle_error(ex)
+        finally:
+            self._invalidate(dest_container, [dest])
+        return False
+
+    @instrumented
+    def copy_files(
+        self,
+        container_name: str,
+        files: Dict[str, str],
+        dest_container: str,
+        max_concurrency: Optional[int] = 8,
+        timeout: Optional[int] = 100,
+    ) -> Union[Dict[str, bool], None]:
+        """copy many files (source path -> dest path) concurrently"""
+        try:
+            results = {}
+            with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+                futures = {
+                    submit(
+                        executor,
+                        self.copy_file,
+                        container_name,
+                        source,
+                        dest_container,
+                        dest,
+                        timeout,
+                    ): source
+                    for source, dest in files.items()
+                }
+                for future in as_completed(futures):
+                    results[futures[future]] = future.result()
+            return results
+        except Exception as ex:
+            self._handle_error(ex)
+        return None
+
+    def _get_source_url(self, container_name: str, source: str, timeout: int) -> str:
+        """build a readable URL for a blob, signing it with the account key"""
+        blob_client = self.service_client.get_blob_client(
+            container=container_name, blob=source
+        )
+        account_key = getattr(self.service_client.credential, "account_key", None)
+        if not account_key:
+            # SAS credentials are already part of the blob URL
+            return blob_client.url
+
+        sas_token = generate_blob_sas(
+            account_name=blob_client.account_name,
+            container_name=container_name,
+            blob_name=source,
+            account_key=account_key,
+            permission=BlobSasPermissions(read=True),
+            expiry=datetime.utcnow() + timedelta(minutes=15, seconds=timeout),
+        )
+        return f"{blob_client.url}?{sas_token}"
+
+    def _copy_server_side(
+        self,
+        container_name: str,
+        source: str,
+        dest_container: str,
+        dest: str,
+        timeout: Optional[int] = 100,
+    ) -> bool:
+        """
+        copy a file inside the storage service without a local round trip,
+        false if the target can't copy from a url
+        """
+        blob_client = self.service_client.get_blob_client(
+            container=dest_container, blob=dest
+        )
+        try:
+            copy = blob_client.start_copy_from_url(
+                self._get_source_url(container_name, source, timeout)
+            )
+        except HttpResponseError as ex:
+            # anything else, like a missing source, would fail
+            # a download/upload round trip just the same
+            if not copy_unsupported(ex):
+                raise
+            print(f"server-side copy unavailable: {ex}")
+            return False
+        status = copy["copy_status"]
+
+        # same-account copies usually complete synchronously,
+        # otherwise poll with backoff until `timeout` seconds
+        delay = 0.5
+        deadline = time.monotonic() + timeout
+        while status == "pending" and time.monotonic() < deadline:
+            time.sleep(delay)
+            delay = min(delay * 2, 10)
+            status = blob_client.get_blob_properties().copy.status
+
+        if status == "pending":
+            blob_client.abort_copy(copy["copy_id"])
+            raise Exception(f"copy to {dest_container}/{dest} timed out")
+        if status != "success":
+            raise Exception(f"copy to {dest_container}/{dest} ended {status}")
+        return True
+
+    def _copy_via_temp_file(
+        self, container_name: str, source: str, dest_container: str, dest: str
+    ) -> bool:
+        """copy a file by downloading it to a tempfile and re-uploading it"""
         try:
             # download to tempfile
             temp_file = tempfile.NamedTemporaryFile()
@@ -398,14 +1519,14 @@ class IoTStorageClient:
             temp_file.close()
             return True
         except Exception as ex:
-            print(f"unexpected exception occurred: {ex}")
             try:
                 temp_file.close()
             except Exception:
                 pass
-            pass
+            self._handle_error(ex)
         return False
 
+    @instrumented
     def move_file(
         self, container_name: str, source: str, dest_container: str, dest: str
     ) -> bool:
@@ -424,10 +1545,10 @@ class IoTStorageClient:
                 return False
             return True
         except Exception as ex:
-            print(f"unexpected exception occurred: {ex}")
-            pass
+            self._handle_error(ex)
         return False
 
+    @instrumented
     def copy_from_url(
         self,
         source_url: str,
@@ -460,10 +1581,22 @@ class IoTStorageClient:
                 return False
             return True
         except Exception as ex:
-            print(f"unexpected exception occurred: {ex}")
-            pass
+            self._handle_error(ex)
+        finally:
+            self._invalidate(container_name, [dest])
         return False
 
+    def _sas_token(
+        self,
+        key: Tuple,
+        expiry: Optional[Union[datetime, str]],
+        sign: Callable[[Union[datetime, str]], str],
+    ) -> str:
+        """sign a SAS token, reusing a cached one while the sas cache has it"""
+        if self.sas_cache is None:
+            return sign(sas_expiry(expiry))
+        return self.sas_cache.get_or_create(key, expiry, sign)
+
     def generate_file_sas_url(
         self,
         container_name: str,
@@ -472,28 +1605,34 @@ class IoTStorageClient:
         write: Optional[bool] = False,
         delete: Optional[bool] = False,
         start: Optional[Union[datetime, str]] = None,
-        expiry: Optional[Union[datetime, str]] = datetime.utcnow()
-        + timedelta(minutes=15),
+        expiry: Optional[Union[datetime, str]] = None,
     ) -> Union[str, None]:
         """generate a SAS URL for a given file inside the container"""
         try:
             account_key = self.service_client.credential.account_key
-            sas_token = generate_blob_sas(
-                account_name=self.account_name,
-                container_name=container_name,
-                blob_name=source,
-                account_key=account_key,
-                permission=BlobSasPermissions(
-                    read=read,
-                    add=write,
-                    create=write,
-                    write=write,
-                    delete=delete,
-                    tag=write,
-                ),
-                start=start,
-                expiry=expiry,
-                ip=self.host,
+            permission = BlobSasPermissions(
+                read=read,
+                add=write,
+                create=write,
+                write=write,
+                delete=delete,
+                tag=write,
+            )
+
+            def sign(expiry: Union[datetime, str]) -> str:
+                return generate_blob_sas(
+                    account_name=self.account_name,
+                    container_name=container_name,
+                    blob_name=source,
+                    account_key=account_key,
+                    permission=permission,
+                    start=start,
+                    expiry=expiry,
+                    ip=self.host,
+                )
+
+            sas_token = self._sas_token(
+                (container_name, source, str(permission), start, expiry), expiry, sign
             )
             if not sas_token:
                 print(
@@ -525,8 +1664,7 @@ class IoTStorageClient:
                 )
             return None
         except Exception as ex:
-            print(f"unexpected exception occurred: {ex}")
-            pass
+            self._handle_error(ex)
         return None
 
     def generate_container_sas_url(
@@ -536,27 +1674,33 @@ class IoTStorageClient:
         write: Optional[bool] = False,
         delete: Optional[bool] = False,
         start: Optional[Union[datetime, str]] = None,
-        expiry: Optional[Union[datetime, str]] = datetime.utcnow()
-        + timedelta(minutes=15),
+        expiry: Optional[Union[datetime, str]] = None,
     ) -> Union[str, None]:
         """generate a SAS URL for a given storage account container"""
         try:
             account_key = self.service_client.credential.account_key
-            sas_token = generate_container_sas(
-                account_name=self.account_name,
-                container_name=container_name,
-                account_key=account_key,
-                permission=BlobSasPermissions(
-                    read=read,
-                    add=write,
-                    create=write,
-                    write=write,
-                    delete=delete,
-                    tag=write,
-                ),
-                start=start,
-                expiry=expiry,
-                ip=self.host,
+            permission = BlobSasPermissions(
+                read=read,
+                add=write,
+                create=write,
+                write=write,
+                delete=delete,
+                tag=write,
+            )
+
+            def sign(expiry: Union[datetime, str]) -> str:
+                return generate_container_sas(
+                    account_name=self.account_name,
+                    container_name=container_name,
+                    account_key=account_key,
+                    permission=permission,
+                    start=start,
+                    expiry=expiry,
+                    ip=self.host,
+                )
+
+            sas_token = self._sas_token(
+                (container_name, None, str(permission), start, expiry), expiry, sign
             )
             if not sas_token:
                 print(
@@ -588,6 +1732,5 @@ class IoTStorageClient:
                 )
             return None
         except Exception as ex:
-            print(f"unexpected exception occurred: {ex}")
-            pass
+            self._handle_error(ex)
         return None
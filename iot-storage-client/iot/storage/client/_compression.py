@@ -0,0 +1,111 @@
+"""streaming compression for blob uploads and downloads"""
+
+import functools
+import gzip
+import os
+import shutil
+import tempfile
+from typing import Optional
+
+from azure.core.pipeline import PipelineRequest, PipelineResponse
+from azure.core.pipeline.policies import SansIOHTTPPolicy
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+from ._types import CompressionType
+
+CHUNK_SIZE = 1024 * 1024
+
+# content types that are already compressed and would only grow
+INCOMPRESSIBLE_TYPES = (
+    "image/",
+    "video/",
+    "audio/",
+    "application/gzip",
+    "application/x-gzip",
+    "application/zip",
+    "application/zstd",
+    "application/x-7z-compressed",
+    "application/x-bzip2",
+    "application/x-xz",
+)
+
+
+def should_compress(content_type: Optional[str], size: int, threshold: int) -> bool:
+    """compress files of at least threshold bytes not already compressed"""
+    if size < threshold:
+        return False
+    return not (content_type or "").lower().startswith(INCOMPRESSIBLE_TYPES)
+
+
+def _zstandard() -> "zstandard":
+    """the zstandard module, which is an optional dependency"""
+    if zstandard is None:
+        raise Exception(
+            "zstd compression requires the zstandard package - "
+            "pip install iot-storage-client[zstd]"
+        )
+    return zstandard
+
+
+def compress_file(source: str, compression: str) -> str:
+    """stream source into a compressed temporary file and return its path"""
+    fd, path = tempfile.mkstemp(suffix=f".{compression}")
+    try:
+        with open(source, "rb") as src, os.fdopen(fd, "wb") as dst:
+            if compression == CompressionType.GZIP:
+                # a zero mtime keeps the output stable for unchanged input
+                with gzip.GzipFile(fileobj=dst, mode="wb", mtime=0) as gz:
+                    shutil.copyfileobj(src, gz, CHUNK_SIZE)
+            elif compression == CompressionType.ZSTD:
+                _zstandard().ZstdCompressor().copy_stream(src, dst)
+            else:
+                raise Exception(f"unsupported compression type: {compression}")
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+
+class StoredEncodingPolicy(SansIOHTTPPolicy):
+    """
+    stream blob downloads as stored - the transports otherwise decode
+    a content-encoded body, leaving nothing for decompress_file and
+    failing outright on byte ranges of it
+    """
+
+    def on_response(self, request: PipelineRequest, response: PipelineResponse) -> None:
+        http_response = response.http_response
+        if not http_response.headers.get("Content-Encoding"):
+            return
+        # the sdk streams downloads without a way to pass decompress, and
+        # the aiohttp response decodes the body it loads by this flag
+        http_response.stream_download = functools.partial(
+            type(http_response).stream_download, http_response, decompress=False
+        )
+        if hasattr(http_response, "_decompress"):
+            http_response._decompress = False
+
+
+def is_compressed(content_encoding: Optional[str]) -> bool:
+    """check if a blob's content encoding is one this package decompresses"""
+    return content_encoding in (CompressionType.GZIP, CompressionType.ZSTD)
+
+
+def decompress_file(path: str, content_encoding: str) -> None:
+    """decompress a downloaded file in place"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with open(path, "rb") as src, os.fdopen(fd, "wb") as dst:
+            if content_encoding == CompressionType.GZIP:
+                with gzip.GzipFile(fileobj=src, mode="rb") as gz:
+                    shutil.copyfileobj(gz, dst, CHUNK_SIZE)
+            else:
+                _zstandard().ZstdDecompressor().copy_stream(src, dst)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
@@ -0,0 +1,125 @@
+"""typed errors raised by the storage clients when raise_errors is set"""
+
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+from azure.core.exceptions import (
+    HttpResponseError,
+    ResourceExistsError,
+    ResourceModifiedError,
+    ResourceNotFoundError,
+    ServiceRequestError,
+    ServiceResponseError,
+)
+
+THROTTLE_STATUSES = (429, 503)
+TRANSIENT_STATUSES = (408, 429, 500, 502, 503, 504)
+# how targets that can't copy from a url (e.g. AzureBlobStorageonIoTEdge)
+# reject start_copy_from_url
+COPY_UNSUPPORTED_STATUSES = (400, 403, 501)
+COPY_UNSUPPORTED_CODES = ("FeatureNotSupported", "CannotVerifyCopySource")
+
+
+class IoTStorageError(Exception):
+    """a storage operation that failed and will not succeed if retried as is"""
+
+    retryable = False
+
+    def __init__(
+        self,
+        message: str,
+        status_code: Optional[int] = None,
+        error_code: Optional[str] = None,
+        retry_after: Optional[float] = None,
+    ) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+        self.error_code = error_code
+        self.retry_after = retry_after
+
+
+class NotFoundError(IoTStorageError):
+    """the container or blob does not exist"""
+
+
+class ConflictError(IoTStorageError):
+    """the container or blob already exists or changed underneath the call"""
+
+
+class TransientError(IoTStorageError):
+    """a timeout, connection or server error that may succeed later"""
+
+    retryable = True
+
+
+class ThrottledError(TransientError):
+    """the service is throttling requests, wait retry_after seconds if set"""
+
+
+class CircuitOpenError(TransientError):
+    """requests to the endpoint are suspended after repeated failures"""
+
+
+def retry_after_seconds(headers) -> Optional[float]:
+    """seconds the service asked to wait, from retry-after-ms or retry-after"""
+    value = headers.get("retry-after-ms") or headers.get("x-ms-retry-after-ms")
+    if value:
+        try:
+            return max(0.0, float(value) / 1000)
+        except ValueError:
+            pass
+    value = headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        # an http date rather than a number of seconds
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def classify_error(ex: Exception) -> IoTStorageError:
+    """map an exception from the sdk to the matching typed error"""
+    if isinstance(ex, IoTStorageError):
+        return ex
+    if isinstance(ex, (ServiceRequestError, ServiceResponseError)):
+        return TransientError(str(ex))
+
+    status_code = getattr(ex, "status_code", None)
+    error_code = getattr(ex, "error_code", None)
+    if isinstance(ex, ResourceNotFoundError) or status_code == 404:
+        return NotFoundError(str(ex), status_code, error_code)
+    if isinstance(ex, (ResourceExistsError, ResourceModifiedError)) or status_code in (
+        409,
+        412,
+    ):
+        return ConflictError(str(ex), status_code, error_code)
+    if status_code in THROTTLE_STATUSES:
+        response = getattr(ex, "response", None)
+        return ThrottledError(
+            str(ex),
+            status_code,
+            error_code,
+            retry_after=retry_after_seconds(
+                response.headers if response is not None else {}
+            ),
+        )
+    if isinstance(ex, HttpResponseError) and status_code in TRANSIENT_STATUSES:
+        return TransientError(str(ex), status_code, error_code)
+    return IoTStorageError(str(ex), status_code, error_code)
+
+
+def copy_unsupported(ex: Exception) -> bool:
+    """check if a failed server-side copy means the target can't copy from a url"""
+    if not isinstance(ex, HttpResponseError):
+        return False
+    return (
+        ex.status_code in COPY_UNSUPPORTED_STATUSES
+        or getattr(ex, "error_code", None) in COPY_UNSUPPORTED_CODES
+    )
@@ -0,0 +1,30 @@
+"""blocking local file helpers the async client runs off the event loop"""
+
+import os
+
+
+def read_file(path: str) -> bytes:
+    """read a whole local file"""
+    with open(path, "rb") as file:
+        return file.read()
+
+
+def read_at(path: str, offset: int, length: int) -> bytes:
+    """read length bytes of a local file starting at offset"""
+    with open(path, "rb") as file:
+        file.seek(offset)
+        return file.read(length)
+
+
+def write_at(path: str, offset: int, data: bytes) -> None:
+    """write data into an existing local file at offset"""
+    with open(path, "r+b") as file:
+        file.seek(offset)
+        file.write(data)
+
+
+def allocate_file(path: str, size: int) -> None:
+    """create or truncate a local file to size bytes"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "wb") as file:
+        file.truncate(size)
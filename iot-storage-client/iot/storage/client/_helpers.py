@@ -1,6 +1,7 @@
 """helper functions for iot-storage-client"""
 
-from typing import Optional
+import os
+from typing import List, Optional, Tuple
 
 
 def generate_edge_conn_str(
@@ -148,3 +149,32 @@ def generate_cloud_sas_url(
         path=blob_path,
         sas=account_sas,
     )
+
+
+def walk_upload_paths(source: str, dest: str) -> List[Tuple[str, str]]:
+    """
+    walk a local directory and pair each file path
+    with its blob path under dest
+    """
+    prefix = "" if dest == "" else dest + "/"
+    paths = []
+    for root, dirs, files in os.walk(source):
+        for name in files:
+            dir_part = os.path.relpath(root, source)
+            dir_part = "" if dir_part == "." else dir_part + "/"
+            paths.append((os.path.join(root, name), prefix + dir_part + name))
+    return paths
+
+
+# bulk lookups of at least this many names under a shared
+# prefix list the prefix once instead of sending head requests
+LISTING_THRESHOLD = 50
+
+
+# the blob batch API accepts at most 256 sub-requests per batch
+MAX_BATCH_SIZE = 256
+
+
+def split_batches(items: List[str], size: int = MAX_BATCH_SIZE) -> List[List[str]]:
+    """split items into consecutive batches of at most size items"""
+    return [items[i : i + size] for i in range(0, len(items), size)]
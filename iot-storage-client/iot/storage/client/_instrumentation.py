@@ -0,0 +1,335 @@
+"""operation timing, byte and error instrumentation for the storage clients"""
+
+import contextvars
+import functools
+import inspect
+import threading
+import time
+from concurrent.futures import Executor, Future
+from typing import Callable, Dict, Optional, Tuple
+
+from azure.core.pipeline import PipelineResponse
+
+from ._exceptions import IoTStorageError, classify_error
+
+# the operation being recorded in the current thread or task, if any
+_current: "contextvars.ContextVar[Optional[OperationRecord]]" = contextvars.ContextVar(
+    "iot_storage_operation", default=None
+)
+
+# the typed error of the last failed client call in this thread or task
+_last_error: "contextvars.ContextVar[Optional[IoTStorageError]]" = (
+    contextvars.ContextVar("iot_storage_last_error", default=None)
+)
+
+
+class OperationRecord:
+    """timing, bytes, retries and error of one client operation"""
+
+    __slots__ = (
+        "operation",
+        "container_name",
+        "started",
+        "duration",
+        "bytes_in",
+        "bytes_out",
+        "retries",
+        "error",
+        "_lock",
+    )
+
+    def __init__(self, operation: str, container_name: Optional[str]) -> None:
+        self.operation = operation
+        self.container_name = container_name
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.retries = 0
+        self.error: Optional[IoTStorageError] = None
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return (
+            "IoT Storage Operation\n"
+            "---------------------\n"
+            f"operation: {self.operation}\n"
+            f"container: {self.container_name}\n"
+            f"duration: {self.duration:.3f}s\n"
+            f"bytes in/out: {self.bytes_in}/{self.bytes_out}"
+        )
+
+    def add(
+        self,
+        bytes_in: Optional[int] = 0,
+        bytes_out: Optional[int] = 0,
+        retries: Optional[int] = 0,
+    ) -> None:
+        """add to the operation's totals, safe from worker threads"""
+        with self._lock:
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+            self.retries += retries
+
+
+class Instrumentation:
+    """
+    hooks called around every client operation, subclass it and override
+    the hooks needed - calls made by another operation, like upload_file
+    inside upload_dir, are part of the outer operation's record
+    """
+
+    def operation_started(self, record: OperationRecord) -> None:
+        """called when an operation starts"""
+
+    def operation_finished(self, record: OperationRecord) -> None:
+        """called when an operation returns or raises"""
+
+
+class CallbackInstrumentation(Instrumentation):
+    """call plain functions with each operation's record"""
+
+    def __init__(
+        self,
+        on_finished: Callable[[OperationRecord], None],
+        on_started: Optional[Callable[[OperationRecord], None]] = None,
+    ) -> None:
+        self.on_finished = on_finished
+        self.on_started = on_started
+
+    def operation_started(self, record: OperationRecord) -> None:
+        if self.on_started is not None:
+            self.on_started(record)
+
+    def operation_finished(self, record: OperationRecord) -> None:
+        self.on_finished(record)
+
+
+class MetricsRecorder(Instrumentation):
+    """
+    thread-safe in-memory totals per operation and container, an in-flight
+    gauge and error counts per error class
+    """
+
+    def __init__(self) -> None:
+        self.in_flight = 0
+        self._operations: Dict[Tuple[str, Optional[str]], Dict[str, float]] = {}
+        self._errors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return (
+            "IoT Storage Metrics Recorder\n"
+            "---------------------\n"
+            f"in flight: {self.in_flight}\n"
+            f"operations: {sum(o['count'] for o in self._operations.values())}"
+        )
+
+    def operation_started(self, record: OperationRecord) -> None:
+        with self._lock:
+            self.in_flight += 1
+
+    def operation_finished(self, record: OperationRecord) -> None:
+        key = (record.operation, record.container_name)
+        with self._lock:
+            self.in_flight -= 1
+            totals = self._operations.setdefault(
+                key,
+                dict.fromkeys(
+                    ("count", "errors", "duration", "bytes_in", "bytes_out", "retries"),
+                    0,
+                ),
+            )
+            totals["count"] += 1
+            totals["duration"] += record.duration
+            totals["bytes_in"] += record.bytes_in
+            totals["bytes_out"] += record.bytes_out
+            totals["retries"] += record.retries
+            if record.error is not None:
+                totals["errors"] += 1
+                name = type(record.error).__name__
+                self._errors[name] = self._errors.get(name, 0) + 1
+
+    def snapshot(self) -> Dict:
+        """a copy of the current totals, busiest containers by bytes first"""
+        with self._lock:
+            operations = [
+                {"operation": operation, "container": container, **totals}
+                for (operation, container), totals in self._operations.items()
+            ]
+            errors = dict(self._errors)
+            in_flight = self.in_flight
+        operations.sort(key=lambda o: o["bytes_in"] + o["bytes_out"], reverse=True)
+        return {"in_flight": in_flight, "operations": operations, "errors": errors}
+
+    def reset(self) -> None:
+        """clear the totals, the in-flight gauge is kept"""
+        with self._lock:
+            self._operations.clear()
+            self._errors.clear()
+
+
+class OpenTelemetryInstrumentation(Instrumentation):
+    """
+    report operations to an opentelemetry meter, or any object with the
+    same create_histogram, create_counter and create_up_down_counter methods
+    """
+
+    def __init__(self, meter, prefix: Optional[str] = "iot.storage") -> None:
+        self.duration = meter.create_histogram(
+            f"{prefix}.operation.duration",
+            unit="s",
+            description="duration of storage client operations",
+        )
+        self.in_flight = meter.create_up_down_counter(
+            f"{prefix}.operation.in_flight",
+            description="storage client operations in progress",
+        )
+        self.bytes_in = meter.create_counter(
+            f"{prefix}.bytes_received", unit="By", description="bytes downloaded"
+        )
+        self.bytes_out = meter.create_counter(
+            f"{prefix}.bytes_sent", unit="By", description="bytes uploaded"
+        )
+        self.retries = meter.create_counter(
+            f"{prefix}.retries", description="requests retried by the retry policy"
+        )
+        self.errors = meter.create_counter(
+            f"{prefix}.errors", description="failed storage client operations"
+        )
+
+    @staticmethod
+    def _attributes(record: OperationRecord) -> Dict[str, str]:
+        return {"operation": record.operation, "container": record.container_name}
+
+    def operation_started(self, record: OperationRecord) -> None:
+        self.in_flight.add(1, attributes=self._attributes(record))
+
+    def operation_finished(self, record: OperationRecord) -> None:
+        attributes = self._attributes(record)
+        self.in_flight.add(-1, attributes=attributes)
+        self.duration.record(record.duration, attributes=attributes)
+        if record.bytes_in:
+            self.bytes_in.add(record.bytes_in, attributes=attributes)
+        if record.bytes_out:
+            self.bytes_out.add(record.bytes_out, attributes=attributes)
+        if record.retries:
+            self.retries.add(record.retries, attributes=attributes)
+        if record.error is not None:
+            self.errors.add(
+                1, attributes={**attributes, "error.type": type(record.error).__name__}
+            )
+
+
+def current_operation() -> Optional[OperationRecord]:
+    """the operation being recorded in this thread or task, if any"""
+    return _current.get()
+
+
+def note_error(ex: Exception) -> None:
+    """mark the current operation as failed with the typed form of ex"""
+    error = classify_error(ex)
+    _last_error.set(error)
+    record = _current.get()
+    if record is not None and record.error is None:
+        record.error = error
+
+
+def pop_last_error() -> Optional[IoTStorageError]:
+    """
+    the typed error of the last failed client call in this thread or task,
+    cleared so the next call starts fresh - lets callers tell why a call
+    returned false when the client doesn't raise errors
+    """
+    error = _last_error.get()
+    _last_error.set(None)
+    return error
+
+
+def note_retry() -> None:
+    """count a retried request against the current operation"""
+    record = _current.get()
+    if record is not None:
+        record.add(retries=1)
+
+
+def count_transfer(response: PipelineResponse) -> None:
+    """
+    add a request's body and response's body sizes to the current operation,
+    installed on every service client as the sdk's raw_response_hook
+    """
+    record = _current.get()
+    if record is None:
+        return
+    request = response.http_request
+    bytes_out = int(request.headers.get("Content-Length") or 0)
+    # a head response describes the blob without sending it
+    bytes_in = 0
+    if request.method != "HEAD":
+        bytes_in = int(response.http_response.headers.get("Content-Length") or 0)
+    record.add(bytes_in=bytes_in, bytes_out=bytes_out)
+
+
+def submit(executor: Executor, func: Callable, *args, **kwargs) -> Future:
+    """submit to an executor so the work counts towards the caller's operation"""
+    return executor.submit(contextvars.copy_context().run, func, *args, **kwargs)
+
+
+def instrumented(func: Callable) -> Callable:
+    """
+    record calls to a client method when its client has instrumentation,
+    only the outermost call is recorded when operations call each other
+    """
+    operation = func.__name__
+    parameters = list(inspect.signature(func).parameters)
+    position = parameters.index("container_name") - 1
+
+    def start(args, kwargs) -> OperationRecord:
+        container_name = (
+            args[position] if len(args) > position else kwargs.get("container_name")
+        )
+        return OperationRecord(operation, container_name)
+
+    def finish(instrumentation: Instrumentation, record: OperationRecord) -> None:
+        record.duration = time.perf_counter() - record.started
+        instrumentation.operation_finished(record)
+
+    if inspect.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def async_wrapper(self, *args, **kwargs):
+            instrumentation = self.instrumentation
+            if instrumentation is None or _current.get() is not None:
+                return await func(self, *args, **kwargs)
+            record = start(args, kwargs)
+            token = _current.set(record)
+            instrumentation.operation_started(record)
+            try:
+                return await func(self, *args, **kwargs)
+            except Exception as ex:
+                note_error(ex)
+                raise
+            finally:
+                _current.reset(token)
+                finish(instrumentation, record)
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        instrumentation = self.instrumentation
+        if instrumentation is None or _current.get() is not None:
+            return func(self, *args, **kwargs)
+        record = start(args, kwargs)
+        token = _current.set(record)
+        instrumentation.operation_started(record)
+        try:
+            return func(self, *args, **kwargs)
+        except Exception as ex:
+            note_error(ex)
+            raise
+        finally:
+            _current.reset(token)
+            finish(instrumentation, record)
+
+    return wrapper
@@ -0,0 +1,92 @@
+"""in-memory listing index for blob paths"""
+
+import heapq
+from typing import Dict, Iterable, List
+
+
+def parent_dirs(name: str) -> List[str]:
+    """list every parent directory of a blob path, outermost first"""
+    parts = [part for part in name.split("/") if part][:-1]
+    return ["/".join(parts[: i + 1]) for i in range(len(parts))]
+
+
+def merge_listings(listings: Iterable[List[str]]) -> List[str]:
+    """
+    merge sorted listings of partitions into one sorted listing, dropping
+    names listed by more than one overlapping partition
+    """
+    merged: List[str] = []
+    for name in heapq.merge(*listings):
+        if not merged or merged[-1] != name:
+            merged.append(name)
+    return merged
+
+
+class _Node:
+    """a directory inside the blob tree"""
+
+    __slots__ = ("dirs", "files")
+
+    def __init__(self) -> None:
+        self.dirs: Dict[str, "_Node"] = {}
+        self.files: List[str] = []
+
+
+class BlobTree:
+    """prefix tree of blob paths built from a single listing pass"""
+
+    root: _Node
+
+    def __init__(self, names: Iterable[str] = ()) -> None:
+        self.root = _Node()
+        for name in names:
+            self.add(name)
+
+    def __repr__(self) -> str:
+        return (
+            "IoT Storage Blob Tree\n"
+            "---------------------\n"
+            f"top-level files: {len(self.root.files)}\n"
+            f"top-level dirs: {len(self.root.dirs)}"
+        )
+
+    def add(self, name: str) -> None:
+        """add a blob path, relative to the listed prefix, to the tree"""
+        parts = [part for part in name.split("/") if part]
+        if not parts:
+            return
+        node = self.root
+        for part in parts[:-1]:
+            child = node.dirs.get(part)
+            if child is None:
+                child = node.dirs[part] = _Node()
+            node = child
+        node.files.append(parts[-1])
+
+    def files(self, recursive: bool = False) -> List[str]:
+        """list files under the root, optionally recursive"""
+        if not recursive:
+            return list(self.root.files)
+        files = []
+        stack = [("", self.root)]
+        while stack:
+            prefix, node = stack.pop()
+            files.extend(prefix + name for name in node.files)
+            # reversed so sub-directories come off the stack in order
+            for name, child in reversed(list(node.dirs.items())):
+                stack.append((prefix + name + "/", child))
+        return files
+
+    def dirs(self, recursive: bool = False) -> List[str]:
+        """list directories under the root, optionally recursive"""
+        if not recursive:
+            return list(self.root.dirs)
+        dirs = []
+        stack = [("", self.root)]
+        while stack:
+            prefix, node = stack.pop()
+            if prefix:
+                dirs.append(prefix[:-1])
+            for name, child in reversed(list(node.dirs.items())):
+                stack.append((prefix + name + "/", child))
+        return dirs
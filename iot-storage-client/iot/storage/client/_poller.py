@@ -0,0 +1,116 @@
+"""non-blocking copy status polling for the async client"""
+
+import asyncio
+from typing import List, Optional
+
+from azure.storage.blob.aio import BlobClient
+
+
+class _PendingCopy:
+    """a server-side copy waiting to leave the pending state"""
+
+    def __init__(
+        self,
+        blob_client: BlobClient,
+        future: asyncio.Future,
+        deadline: float,
+        delay: float,
+    ) -> None:
+        self.blob_client = blob_client
+        self.future = future
+        self.deadline = deadline
+        self.delay = delay
+        self.next_poll = 0.0
+
+
+class CopyPoller:
+    """poll many pending server-side copies from a single task"""
+
+    initial_delay: float
+    max_delay: float
+    backoff: float
+
+    def __init__(
+        self,
+        initial_delay: Optional[float] = 0.5,
+        max_delay: Optional[float] = 10.0,
+        backoff: Optional[float] = 2.0,
+    ) -> None:
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.backoff = backoff
+        self._pending: List[_PendingCopy] = []
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def __repr__(self) -> str:
+        return (
+            "IoT Storage Copy Poller\n"
+            "---------------------\n"
+            f"pending copies: {len(self._pending)}\n"
+            f"delay: {self.initial_delay}s - {self.max_delay}s"
+        )
+
+    def track(self, blob_client: BlobClient, timeout: float) -> asyncio.Future:
+        """
+        track a pending copy on blob_client, the returned future resolves
+        to its final copy status or "pending" once timeout seconds pass
+        """
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # copies tracked on another loop stay with that loop's task
+            self._loop = loop
+            self._pending = []
+            self._task = None
+        now = loop.time()
+        copy = _PendingCopy(
+            blob_client=blob_client,
+            future=loop.create_future(),
+            deadline=now + timeout,
+            delay=self.initial_delay,
+        )
+        copy.next_poll = now + copy.delay
+        self._pending.append(copy)
+
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = loop.create_task(self._run(self._pending, self._wakeup))
+        else:
+            # the poller may be sleeping past this copy's first poll
+            self._wakeup.set()
+        return copy.future
+
+    async def _run(self, pending: List[_PendingCopy], wakeup: asyncio.Event) -> None:
+        """poll due copies together, then sleep until the next one is due"""
+        loop = asyncio.get_running_loop()
+        while pending:
+            now = loop.time()
+            due = [copy for copy in pending if copy.next_poll <= now]
+            if not due:
+                wakeup.clear()
+                wait = min(copy.next_poll for copy in pending) - now
+                try:
+                    await asyncio.wait_for(wakeup.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            results = await asyncio.gather(
+                *[copy.blob_client.get_blob_properties() for copy in due],
+                return_exceptions=True,
+            )
+            now = loop.time()
+            for copy, props in zip(due, results):
+                if copy.future.done():
+                    # the caller stopped waiting on this copy
+                    pending.remove(copy)
+                elif isinstance(props, Exception):
+                    copy.future.set_exception(props)
+                    pending.remove(copy)
+                elif props.copy.status != "pending" or now >= copy.deadline:
+                    copy.future.set_result(props.copy.status)
+                    pending.remove(copy)
+                else:
+                    copy.delay = min(copy.delay * self.backoff, self.max_delay)
+                    copy.next_poll = min(now + copy.delay, copy.deadline)
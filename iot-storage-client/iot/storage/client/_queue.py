@@ -0,0 +1,365 @@
+"""durable write-behind upload queue for offline edge operation"""
+
+import os
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from ._client import IoTStorageClient
+from ._exceptions import IoTStorageError
+from ._instrumentation import pop_last_error
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS uploads (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    container_name TEXT NOT NULL,
+    source TEXT NOT NULL,
+    dest TEXT NOT NULL,
+    content_type TEXT NOT NULL,
+    overwrite INTEGER NOT NULL,
+    priority INTEGER NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    enqueued_at REAL NOT NULL,
+    not_before REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS uploads_order ON uploads (priority DESC, id);
+CREATE TABLE IF NOT EXISTS dead_uploads (
+    id INTEGER PRIMARY KEY,
+    container_name TEXT NOT NULL,
+    source TEXT NOT NULL,
+    dest TEXT NOT NULL,
+    content_type TEXT NOT NULL,
+    overwrite INTEGER NOT NULL,
+    priority INTEGER NOT NULL,
+    attempts INTEGER NOT NULL,
+    enqueued_at REAL NOT NULL,
+    failed_at REAL NOT NULL,
+    error TEXT
+);
+"""
+
+# backoff stops doubling after this many attempts, well past max_backoff
+_MAX_BACKOFF_EXPONENT = 30
+
+
+class UploadQueue:
+    """
+    accept uploads immediately into a sqlite queue on local disk and drain
+    it in the background, surviving outages and process restarts
+    """
+
+    storage_client: IoTStorageClient
+    path: str
+    max_concurrency: int
+    batch_size: int
+    initial_backoff: float
+    max_backoff: float
+    max_attempts: Optional[int]
+
+    def __init__(
+        self,
+        storage_client: IoTStorageClient,
+        path: str,
+        max_concurrency: Optional[int] = 4,
+        batch_size: Optional[int] = 16,
+        initial_backoff: Optional[float] = 1.0,
+        max_backoff: Optional[float] = 300.0,
+        max_attempts: Optional[int] = None,
+    ) -> None:
+        self.storage_client = storage_client
+        self.path = path
+        self.max_concurrency = max_concurrency
+        self.batch_size = batch_size
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts
+        self.uploaded = 0
+        self.retried = 0
+        self.dropped = 0
+        self.dead = 0
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # wal keeps enqueueing fast while the drain thread reads and deletes
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def __repr__(self) -> str:
+        return (
+            "IoT Storage Upload Queue\n"
+            "---------------------\n"
+            f"path: {self.path}\n"
+            f"depth: {self.depth()}\n"
+            f"lag: {self.lag():.1f}s"
+        )
+
+    def __enter__(self) -> "UploadQueue":
+        self.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    def put(
+        self,
+        container_name: str,
+        source: str,
+        dest: str,
+        content_type: Optional[str] = "application/octet-stream",
+        overwrite: Optional[bool] = True,
+        priority: Optional[int] = 0,
+    ) -> int:
+        """
+        persist an upload of the local file source and return its id, higher
+        priorities are uploaded first - source must exist until it is uploaded
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO uploads (container_name, source, dest, content_type,"
+                " overwrite, priority, enqueued_at, not_before)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    container_name,
+                    source,
+                    dest,
+                    content_type,
+                    overwrite,
+                    priority,
+                    now,
+                    now,
+                ),
+            )
+            self._conn.commit()
+        self._wakeup.set()
+        return cursor.lastrowid
+
+    def depth(self) -> int:
+        """number of uploads waiting in the queue, including in-flight ones"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM uploads").fetchone()[0]
+
+    def lag(self) -> float:
+        """age in seconds of the oldest upload still in the queue"""
+        with self._lock:
+            oldest = self._conn.execute(
+                "SELECT MIN(enqueued_at) FROM uploads"
+            ).fetchone()[0]
+        return 0.0 if oldest is None else max(0.0, time.time() - oldest)
+
+    def metrics(self) -> Dict[str, float]:
+        """queue depth and lag with running totals for monitoring"""
+        return {
+            "depth": self.depth(),
+            "lag": self.lag(),
+            "in_flight": self.in_flight,
+            "uploaded": self.uploaded,
+            "retried": self.retried,
+            "dropped": self.dropped,
+            "dead": self.dead,
+        }
+
+    def dead_letters(self) -> List[Dict]:
+        """uploads that failed for good, oldest failure first"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "SELECT id, container_name, source, dest, attempts, failed_at, error"
+                " FROM dead_uploads ORDER BY failed_at, id"
+            )
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def retry_dead(self, ids: Optional[List[int]] = None) -> int:
+        """
+        move dead-lettered uploads back into the queue, all of them unless
+        ids are given, and return how many were moved
+        """
+        now = time.time()
+        condition, params = "", ()
+        if ids is not None:
+            condition = f" WHERE id IN ({', '.join('?' * len(ids))})"
+            params = tuple(ids)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO uploads (container_name, source, dest, content_type,"
+                " overwrite, priority, enqueued_at, not_before)"
+                " SELECT container_name, source, dest, content_type, overwrite,"
+                f" priority, enqueued_at, ? FROM dead_uploads{condition}",
+                (now,) + params,
+            )
+            moved = self._conn.execute(
+                f"DELETE FROM dead_uploads{condition}", params
+            ).rowcount
+            self._conn.commit()
+        self._wakeup.set()
+        return moved
+
+    def start(self) -> None:
+        """start draining the queue in the background"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="iot-storage-upload-queue", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """stop draining after the current batch, queued uploads are kept"""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def close(self) -> None:
+        """stop draining and close the queue database"""
+        self.stop()
+        with self._lock:
+            self._conn.close()
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """wait until the queue is empty, false if timeout passed first"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.depth():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def _run(self) -> None:
+        """claim due uploads batch by batch, pausing while every upload fails"""
+        backoff = 0.0
+        with ThreadPoolExecutor(max_workers=max(1, self.max_concurrency)) as executor:
+            while not self._stopping.is_set():
+                self._wakeup.clear()
+                batch, next_due = self._claim()
+                if not batch:
+                    self._wakeup.wait(next_due)
+                    continue
+
+                self.in_flight = len(batch)
+                results = list(executor.map(self._attempt, batch))
+                self.in_flight = 0
+                if not all(result is False for result in results):
+                    backoff = 0.0
+                    continue
+
+                # nothing got through, likely an outage - stop hammering it
+                backoff = min(max(backoff * 2, self.initial_backoff), self.max_backoff)
+                self._stopping.wait(backoff)
+
+    def _claim(self) -> Tuple[List[Tuple], Optional[float]]:
+        """
+        the highest priority batch of due uploads, or the seconds
+        until the next one is due when none are
+        """
+        now = time.time()
+        with self._lock:
+            batch = self._conn.execute(
+                "SELECT id, container_name, source, dest, content_type,"
+                " overwrite, attempts FROM uploads WHERE not_before <= ?"
+                " ORDER BY priority DESC, id LIMIT ?",
+                (now, self.batch_size),
+            ).fetchall()
+            if batch:
+                return batch, None
+            next_due = self._conn.execute(
+                "SELECT MIN(not_before) FROM uploads"
+            ).fetchone()[0]
+        return [], None if next_due is None else max(0.0, next_due - now)
+
+    def _attempt(self, job: Tuple) -> Optional[bool]:
+        """upload one queued file, never letting an error stop the drain thread"""
+        try:
+            return self._upload(job)
+        except Exception as ex:
+            print(f"queued upload {job[0]} failed unexpectedly: {ex}")
+            return False
+
+    def _upload(self, job: Tuple) -> Optional[bool]:
+        """
+        upload one queued file, then remove or reschedule it - none
+        when the file is gone and the upload was dropped
+        """
+        job_id, container_name, source, dest, content_type, overwrite, attempts = job
+        if not os.path.isfile(source):
+            print(f"dropping queued upload of missing file {source}")
+            self._finish(job_id, "dropped")
+            return None
+
+        # errors left over from an earlier call on this thread are not ours
+        pop_last_error()
+        error = None
+        try:
+            uploaded = self.storage_client.upload_file(
+                container_name,
+                source,
+                dest,
+                content_type=content_type,
+                overwrite=bool(overwrite),
+            )
+        except IoTStorageError as ex:
+            # raised by a client with raise_errors set
+            print(f"queued upload of {source} failed: {ex}")
+            uploaded, error = False, ex
+        if uploaded:
+            self._finish(job_id, "uploaded")
+            return True
+
+        if error is None:
+            error = pop_last_error()
+        if (error is not None and not error.retryable) or (
+            self.max_attempts is not None and attempts + 1 >= self.max_attempts
+        ):
+            # retrying cannot help, set the upload aside instead of blocking
+            # the queue - none so a bad upload does not pause the drain
+            self._dead_letter(job_id, error)
+            return None
+
+        # exponential backoff with jitter so retries spread out after an outage
+        exponent = min(attempts, _MAX_BACKOFF_EXPONENT)
+        delay = min(self.initial_backoff * 2**exponent, self.max_backoff)
+        delay *= random.uniform(0.5, 1.0)
+        if error is not None and error.retry_after is not None:
+            # never retry sooner than a throttling service asked
+            delay = max(delay, error.retry_after)
+        with self._lock:
+            self._conn.execute(
+                "UPDATE uploads SET attempts = attempts + 1, not_before = ?"
+                " WHERE id = ?",
+                (time.time() + delay, job_id),
+            )
+            self._conn.commit()
+            self.retried += 1
+        return False
+
+    def _dead_letter(self, job_id: int, error: Optional[IoTStorageError]) -> None:
+        """move an upload that failed for good out of the queue"""
+        print(f"giving up on queued upload {job_id}: {error}")
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO dead_uploads (id, container_name, source, dest,"
+                " content_type, overwrite, priority, attempts, enqueued_at,"
+                " failed_at, error) SELECT id, container_name, source, dest,"
+                " content_type, overwrite, priority, attempts + 1, enqueued_at,"
+                " ?, ? FROM uploads WHERE id = ?",
+                (time.time(), None if error is None else str(error), job_id),
+            )
+            self._conn.execute("DELETE FROM uploads WHERE id = ?", (job_id,))
+            self._conn.commit()
+            self.dead += 1
+
+    def _finish(self, job_id: int, counter: str) -> None:
+        """remove a finished upload from the queue and count it"""
+        with self._lock:
+            self._conn.execute("DELETE FROM uploads WHERE id = ?", (job_id,))
+            self._conn.commit()
+            setattr(self, counter, getattr(self, counter) + 1)
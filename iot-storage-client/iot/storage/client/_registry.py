@@ -0,0 +1,138 @@
+"""process-wide registry of shared blob service clients"""
+
+import hashlib
+import threading
+import time
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+from azure.storage.blob import BlobServiceClient
+
+
+def registry_key(
+    credential_type: str,
+    location_type: str,
+    account_name: str,
+    credential: str,
+    module: Optional[str] = None,
+    host: Optional[str] = None,
+    port: Optional[str] = None,
+    max_chunk_size: Optional[int] = None,
+    retry_policy: Optional[object] = None,
+) -> Tuple:
+    """
+    key a service client by its connection parameters, the credential is
+    hashed so different keys for one account never share a client
+    """
+    return (
+        credential_type,
+        location_type,
+        account_name,
+        host,
+        port,
+        module,
+        max_chunk_size,
+        # clients only share a pipeline when they share a retry policy
+        id(retry_policy) if retry_policy is not None else None,
+        hashlib.sha256(credential.encode()).hexdigest(),
+    )
+
+
+class _Entry:
+    """a shared service client and the clients borrowing it"""
+
+    __slots__ = ("service_client", "users", "last_used")
+
+    def __init__(self, service_client: BlobServiceClient) -> None:
+        self.service_client = service_client
+        self.users = 0
+        self.last_used = time.monotonic()
+
+
+class ClientRegistry:
+    """thread-safe cache of blob service clients, evicted once idle"""
+
+    idle_timeout: float
+
+    def __init__(self, idle_timeout: Optional[float] = 300.0) -> None:
+        self.idle_timeout = idle_timeout
+        self._entries: Dict[Hashable, _Entry] = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return (
+            "IoT Storage Client Registry\n"
+            "---------------------\n"
+            f"clients: {len(self._entries)}\n"
+            f"idle timeout: {self.idle_timeout}s"
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def acquire(
+        self, key: Hashable, factory: Callable[[], BlobServiceClient]
+    ) -> BlobServiceClient:
+        """borrow the service client for key, creating it on first use"""
+        with self._lock:
+            self._evict_idle()
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry(factory())
+            entry.users += 1
+            entry.last_used = time.monotonic()
+            return entry.service_client
+
+    def release(self, key: Hashable) -> None:
+        """return a borrowed service client, it stays cached until idle"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.users > 0:
+                entry.users -= 1
+                entry.last_used = time.monotonic()
+            self._evict_idle()
+
+    def evict_idle(self) -> int:
+        """close unused clients idle for longer than idle_timeout"""
+        with self._lock:
+            return self._evict_idle()
+
+    def close(self, key: Hashable) -> bool:
+        """
+        close and forget the service client for key, only once every client
+        borrowing it has released it
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False
+            if entry.users > 0:
+                raise RuntimeError(
+                    f"service client is still borrowed by {entry.users} client(s)"
+                )
+            del self._entries[key]
+        entry.service_client.close()
+        return True
+
+    def close_all(self) -> None:
+        """close and forget every service client"""
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            entry.service_client.close()
+
+    def _evict_idle(self) -> int:
+        """evict idle clients, the caller holds the lock"""
+        now = time.monotonic()
+        idle = [
+            key
+            for key, entry in self._entries.items()
+            if entry.users == 0 and now - entry.last_used >= self.idle_timeout
+        ]
+        for key in idle:
+            self._entries.pop(key).service_client.close()
+        return len(idle)
+
+
+# shared by every IoTStorageClient created with shared_client=True
+client_registry = ClientRegistry()
@@ -0,0 +1,260 @@
+"""retry, backoff and circuit breaking shared by the storage clients"""
+
+import asyncio
+import random
+import threading
+import time
+from io import UnsupportedOperation
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from azure.core.exceptions import ServiceRequestError, ServiceResponseError
+from azure.core.pipeline import PipelineRequest, PipelineResponse
+from azure.core.pipeline.policies import AsyncHTTPPolicy, HTTPPolicy
+from azure.storage.blob import LocationMode
+
+from ._exceptions import (
+    THROTTLE_STATUSES,
+    TRANSIENT_STATUSES,
+    CircuitOpenError,
+    retry_after_seconds,
+)
+from ._instrumentation import note_retry
+
+# per-request options set for, and removed by, the sdk's StorageRetryPolicy
+_STORAGE_RETRY_OPTIONS = (
+    "retry_total",
+    "retry_connect",
+    "retry_read",
+    "retry_status",
+    "retry_to_secondary",
+    "retry_hook",
+    "location_mode",
+    "hosts",
+)
+
+
+class RetryPolicy:
+    """
+    retry settings and per-endpoint circuit breakers, one policy can be
+    shared by any number of sync and async clients so they back off together
+    """
+
+    max_retries: int
+    initial_backoff: float
+    max_backoff: float
+    max_retry_after: float
+    failure_threshold: int
+    recovery_time: float
+
+    def __init__(
+        self,
+        max_retries: Optional[int] = 3,
+        initial_backoff: Optional[float] = 0.5,
+        max_backoff: Optional[float] = 30.0,
+        max_retry_after: Optional[float] = 60.0,
+        failure_threshold: Optional[int] = 5,
+        recovery_time: Optional[float] = 30.0,
+    ) -> None:
+        self.max_retries = max_retries
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.max_retry_after = max_retry_after
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        # endpoint -> (consecutive failures, monotonic time the circuit reopens)
+        self._circuits: Dict[str, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return (
+            "IoT Storage Retry Policy\n"
+            "---------------------\n"
+            f"max retries: {self.max_retries}\n"
+            f"backoff: {self.initial_backoff}s-{self.max_backoff}s\n"
+            f"open circuits: {len(self.open_endpoints())}"
+        )
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        seconds to wait before retry number attempt + 1, the server's
+        retry-after when it sent one, else exponential with full jitter
+        """
+        if retry_after is not None:
+            return min(retry_after, self.max_retry_after)
+        ceiling = min(self.max_backoff, self.initial_backoff * 2**attempt)
+        return random.uniform(0, ceiling)
+
+    def allow(self, endpoint: str) -> bool:
+        """
+        check if a request may go to the endpoint - once an open circuit's
+        recovery time passes, one trial request is let through at a time
+        """
+        with self._lock:
+            failures, reopens = self._circuits.get(endpoint, (0, 0.0))
+            if failures < self.failure_threshold:
+                return True
+            now = time.monotonic()
+            if now < reopens:
+                return False
+            self._circuits[endpoint] = (failures, now + self.recovery_time)
+            return True
+
+    def retry_in(self, endpoint: str) -> float:
+        """seconds until an open circuit lets a trial request through"""
+        with self._lock:
+            _, reopens = self._circuits.get(endpoint, (0, 0.0))
+        return max(0.0, reopens - time.monotonic())
+
+    def record_success(self, endpoint: str) -> None:
+        """close the endpoint's circuit"""
+        with self._lock:
+            self._circuits.pop(endpoint, None)
+
+    def record_failure(self, endpoint: str) -> None:
+        """count a request that failed after its retries, opening the circuit"""
+        with self._lock:
+            failures, reopens = self._circuits.get(endpoint, (0, 0.0))
+            failures += 1
+            if failures >= self.failure_threshold:
+                reopens = time.monotonic() + self.recovery_time
+            self._circuits[endpoint] = (failures, reopens)
+
+    def open_endpoints(self) -> List[str]:
+        """endpoints whose circuits are currently open"""
+        with self._lock:
+            return [
+                endpoint
+                for endpoint, (failures, _) in self._circuits.items()
+                if failures >= self.failure_threshold
+            ]
+
+    def reset(self) -> None:
+        """close every circuit"""
+        with self._lock:
+            self._circuits.clear()
+
+    def pipeline_policy(self) -> "RetryPipelinePolicy":
+        """the azure-core policy for a sync client's pipeline"""
+        return RetryPipelinePolicy(self)
+
+    def async_pipeline_policy(self) -> "AsyncRetryPipelinePolicy":
+        """the azure-core policy for an async client's pipeline"""
+        return AsyncRetryPipelinePolicy(self)
+
+
+class _RetryAttempts:
+    """decisions shared by the sync and async pipeline policies"""
+
+    def __init__(self, retry: RetryPolicy) -> None:
+        super().__init__()
+        self.retry = retry
+
+    def _start(self, request: PipelineRequest) -> Tuple[str, Optional[int]]:
+        """the request's endpoint and body position, failing fast on an open circuit"""
+        # options the sdk's storage retry policy consumes, left in place they
+        # reach the transport as unexpected keyword arguments
+        for option in _STORAGE_RETRY_OPTIONS:
+            request.context.options.pop(option, None)
+        endpoint = urlparse(request.http_request.url).netloc
+        if not self.retry.allow(endpoint):
+            retry_in = self.retry.retry_in(endpoint)
+            raise CircuitOpenError(
+                f"circuit open for {endpoint}, retry in {retry_in:.1f}s",
+                retry_after=retry_in,
+            )
+        position = None
+        body = request.http_request.body
+        if hasattr(body, "read"):
+            try:
+                position = body.tell()
+            except (AttributeError, UnsupportedOperation):
+                pass
+        return endpoint, position
+
+    def _delay(
+        self,
+        attempt: int,
+        request: PipelineRequest,
+        position: Optional[int],
+        response: Optional[PipelineResponse] = None,
+    ) -> Optional[float]:
+        """seconds to wait before retrying, none when it should not be retried"""
+        if attempt >= self.retry.max_retries:
+            return None
+        body = request.http_request.body
+        if hasattr(body, "read"):
+            # a streamed body must be rewound to be sent again
+            if position is None:
+                return None
+            try:
+                body.seek(position)
+            except (UnsupportedOperation, ValueError):
+                return None
+        retry_after = None
+        if (
+            response is not None
+            and response.http_response.status_code in THROTTLE_STATUSES
+        ):
+            retry_after = retry_after_seconds(response.http_response.headers)
+        return self.retry.backoff(attempt, retry_after)
+
+    @staticmethod
+    def _finish(response: PipelineResponse) -> PipelineResponse:
+        """mark the response as coming from the primary endpoint like the sdk does"""
+        response.http_response.location_mode = LocationMode.PRIMARY
+        return response
+
+
+class RetryPipelinePolicy(_RetryAttempts, HTTPPolicy):
+    """retry transient failures of a sync client's requests"""
+
+    def send(self, request: PipelineRequest) -> PipelineResponse:
+        endpoint, position = self._start(request)
+        attempt = 0
+        while True:
+            try:
+                response = self.next.send(request)
+            except (ServiceRequestError, ServiceResponseError):
+                delay = self._delay(attempt, request, position)
+                if delay is None:
+                    self.retry.record_failure(endpoint)
+                    raise
+            else:
+                if response.http_response.status_code not in TRANSIENT_STATUSES:
+                    self.retry.record_success(endpoint)
+                    return self._finish(response)
+                delay = self._delay(attempt, request, position, response)
+                if delay is None:
+                    self.retry.record_failure(endpoint)
+                    return self._finish(response)
+            attempt += 1
+            note_retry()
+            time.sleep(delay)
+
+
+class AsyncRetryPipelinePolicy(_RetryAttempts, AsyncHTTPPolicy):
+    """retry transient failures of an async client's requests"""
+
+    async def send(self, request: PipelineRequest) -> PipelineResponse:
+        endpoint, position = self._start(request)
+        attempt = 0
+        while True:
+            try:
+                response = await self.next.send(request)
+            except (ServiceRequestError, ServiceResponseError):
+                delay = self._delay(attempt, request, position)
+                if delay is None:
+                    self.retry.record_failure(endpoint)
+                    raise
+            else:
+                if response.http_response.status_code not in TRANSIENT_STATUSES:
+                    self.retry.record_success(endpoint)
+                    return self._finish(response)
+                delay = self._delay(attempt, request, position, response)
+                if delay is None:
+                    self.retry.record_failure(endpoint)
+                    return self._finish(response)
+            attempt += 1
+            note_retry()
+            await asyncio.sleep(delay)
@@ -0,0 +1,98 @@
+"""cache of signed SAS tokens reused until shortly before they expire"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Hashable, Optional, Tuple, Union
+
+DEFAULT_SAS_LIFETIME = timedelta(minutes=15)
+
+
+def sas_expiry(expiry: Optional[Union[datetime, str]] = None) -> Union[datetime, str]:
+    """the given expiry, or the default lifetime from now"""
+    if expiry is None:
+        return datetime.utcnow() + DEFAULT_SAS_LIFETIME
+    return expiry
+
+
+def seconds_until(expiry: datetime) -> float:
+    """seconds from now until expiry, naive datetimes are utc like the sdk's"""
+    if expiry.tzinfo is None:
+        expiry = expiry.replace(tzinfo=timezone.utc)
+    return expiry.timestamp() - time.time()
+
+
+class SasTokenCache:
+    """
+    thread-safe lru cache of SAS tokens keyed by scope and permissions,
+    a token is handed out until refresh_margin seconds before it expires
+    """
+
+    refresh_margin: float
+    max_entries: int
+
+    def __init__(
+        self, refresh_margin: float = 300.0, max_entries: Optional[int] = 1024
+    ) -> None:
+        self.refresh_margin = refresh_margin
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return (
+            "IoT Storage SAS Token Cache\n"
+            "---------------------\n"
+            f"entries: {len(self._entries)}/{self.max_entries}\n"
+            f"refresh margin: {self.refresh_margin}s"
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[str]:
+        """a cached token, none when missing or due for a refresh"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: Hashable, token: str, expiry: datetime) -> None:
+        """store a token, evicting the least recently used"""
+        refresh_at = time.monotonic() + seconds_until(expiry) - self.refresh_margin
+        with self._lock:
+            self._entries[key] = (token, refresh_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_create(
+        self,
+        key: Hashable,
+        expiry: Optional[Union[datetime, str]],
+        sign: Callable[[Union[datetime, str]], str],
+    ) -> str:
+        """
+        the cached token for key, or a new one signed with expiry
+        (the default lifetime from now when none) - tokens with a
+        string expiry are never cached
+        """
+        token = self.get(key)
+        if token is not None:
+            return token
+        expiry = sas_expiry(expiry)
+        token = sign(expiry)
+        if token and isinstance(expiry, datetime):
+            self.put(key, token, expiry)
+        return token
+
+    def clear(self) -> None:
+        """forget every token"""
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,142 @@
+"""change detection and manifest for incremental directory sync"""
+
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+from azure.storage.blob import BlobProperties
+
+from ._helpers import walk_upload_paths
+from ._types import SyncDirection
+
+
+def file_md5(path: str, chunk_size: int = 4 * 1024 * 1024) -> bytes:
+    """md5 digest of a local file, read chunk by chunk"""
+    digest = hashlib.md5()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.digest()
+
+
+class SyncManifest:
+    """local record of each file's size, mtime and etag as of its last sync"""
+
+    path: Optional[str]
+    entries: Dict[str, Dict]
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path
+        self.entries = {}
+        self._lock = threading.Lock()
+        if path and os.path.isfile(path):
+            with open(path, "r") as file:
+                self.entries = json.load(file)
+
+    def __repr__(self) -> str:
+        return (
+            "IoT Storage Sync Manifest\n"
+            "---------------------\n"
+            f"path: {self.path}\n"
+            f"entries: {len(self.entries)}"
+        )
+
+    def is_current(self, name: str, local_path: str, etag: str) -> bool:
+        """check neither side changed since name was last synced"""
+        entry = self.entries.get(name)
+        if entry is None:
+            return False
+        stat = os.stat(local_path)
+        return (
+            entry["size"] == stat.st_size
+            and entry["mtime_ns"] == stat.st_mtime_ns
+            and entry["etag"] == etag
+        )
+
+    def record(self, name: str, local_path: str, etag: str) -> None:
+        """remember the state of a file that is now in sync"""
+        stat = os.stat(local_path)
+        with self._lock:
+            self.entries[name] = {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "etag": etag,
+            }
+
+    def forget(self, name: str) -> None:
+        """drop a deleted file from the manifest"""
+        with self._lock:
+            self.entries.pop(name, None)
+
+    def save(self) -> None:
+        """atomically write the manifest, if it has a path"""
+        if not self.path:
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(self.entries, file)
+        os.replace(tmp_path, self.path)
+
+
+def is_unchanged(
+    name: str,
+    local_path: str,
+    blob: BlobProperties,
+    manifest: SyncManifest,
+    direction: str,
+) -> bool:
+    """
+    compare a local file with its blob by size, then the manifest, then
+    md5 and finally modification times when the blob has no md5
+    """
+    stat = os.stat(local_path)
+    if stat.st_size != blob.size:
+        return False
+    if manifest.is_current(name, local_path, blob.etag):
+        return True
+
+    remote_md5 = blob.content_settings.content_md5
+    if remote_md5:
+        return file_md5(local_path) == bytes(remote_md5)
+
+    # nothing to hash against, trust whichever side was written last
+    remote_mtime = blob.last_modified.timestamp()
+    if direction == SyncDirection.UPLOAD:
+        return stat.st_mtime <= remote_mtime
+    return remote_mtime <= stat.st_mtime
+
+
+def pair_paths(
+    local_dir: str,
+    prefix: str,
+    blob_names: Iterable[str],
+    direction: str,
+    exclude: Iterable[str] = (),
+) -> Tuple[Dict[str, str], Dict[str, Optional[str]]]:
+    """
+    pair the blob names to sync with their local paths, and list orphans -
+    blobs with no local file on upload, local files with no blob on download
+    """
+    blob_names = set(blob_names)
+    exclude = {os.path.abspath(path) for path in exclude}
+    local = {}
+    if os.path.isdir(local_dir):
+        local = {
+            name: path
+            for path, name in walk_upload_paths(local_dir, prefix)
+            if os.path.abspath(path) not in exclude
+        }
+
+    if direction == SyncDirection.UPLOAD:
+        orphans = {name: None for name in blob_names if name not in local}
+        return local, orphans
+
+    start = len(prefix) + 1 if prefix else 0
+    pairs = {
+        name: local.get(name, os.path.join(local_dir, *name[start:].split("/")))
+        for name in blob_names
+    }
+    orphans = {name: path for name, path in local.items() if name not in blob_names}
+    return pairs, orphans
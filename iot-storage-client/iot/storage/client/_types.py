@@ -15,3 +15,26 @@ class LocationType:
     CLOUD_BASED = "CLOUD_BASED"
     EDGE_BASED = "EDGE_BASED"
     LOCAL_BASED = "LOCAL_BASED"
+
+
+class SyncDirection:
+    """iot storage client directions for directory sync"""
+
+    UPLOAD = "UPLOAD"
+    DOWNLOAD = "DOWNLOAD"
+
+
+class SyncStatus:
+    """iot storage client per-file outcomes of a directory sync"""
+
+    TRANSFERRED = "TRANSFERRED"
+    UNCHANGED = "UNCHANGED"
+    DELETED = "DELETED"
+    FAILED = "FAILED"
+
+
+class CompressionType:
+    """iot storage client content encodings for compressed uploads"""
+
+    GZIP = "gzip"
+    ZSTD = "zstd"
@@ -1,3 +1,3 @@
-VERSION = "1.2.2"
+VERSION = "1.3.0"
 
 __version__ = VERSION
@@ -45,6 +45,7 @@ setup(
             "iot",
             "iot.storage",
             "tests",
+            "benchmarks",
         ]
     ),
     python_requires=">=3.7",
@@ -53,4 +54,7 @@ setup(
         "azure-storage-blob==12.14.1",
         "pydantic==1.9.0",
     ],
+    extras_require={
+        "zstd": ["zstandard==0.18.0"],
+    },
 )
@@ -1,6 +1,59 @@
+import asyncio
+import base64
+import contextlib
+import gzip
+import http.server
+import io
+import os
+import tempfile
+import threading
 import unittest
+from unittest import mock
 
-from iot.storage.client import IoTStorageClientAsync
+from azure.core.exceptions import ResourceNotFoundError
+from azure.storage.blob.aio import BlobPrefix
+
+from iot.storage.client import (
+    CompressionType,
+    IoTStorageClientAsync,
+    SyncDirection,
+    SyncStatus,
+)
+from iot.storage.client._cache import PropertiesCache
+
+
+class NotModifiedHandler(http.server.BaseHTTPRequestHandler):
+    """get blob properties that answer a matching if-none-match with a 304"""
+
+    protocol_version = "HTTP/1.1"
+    requests = []
+    error_code = None
+
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):
+        etag = self.headers.get("If-None-Match")
+        self.requests.append(etag)
+        self.send_response(200 if etag is None else 304)
+        self.send_header("Content-Length", "0")
+        self.send_header("ETag", '"0x1"')
+        self.send_header("Last-Modified", "Mon, 01 Jan 2024 00:00:00 GMT")
+        self.send_header("x-ms-blob-type", "BlockBlob")
+        if etag is not None and self.error_code:
+            self.send_header("x-ms-error-code", self.error_code)
+        self.end_headers()
+
+
+@contextlib.contextmanager
+def not_modified_server():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), NotModifiedHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield server.server_port
+    finally:
+        server.shutdown()
+        server.server_close()
 
 
 class TestAioClient(unittest.TestCase):
@@ -68,6 +121,635 @@ class TestAioClient(unittest.TestCase):
         self.assertEqual(storage_client.host, "myIPAddress")
         self.assertEqual(storage_client.port, "myPort")
 
+    @mock.patch.object(IoTStorageClientAsync, "open")
+    @mock.patch.object(IoTStorageClientAsync, "upload_file", return_value=True)
+    def test_upload_dir(self, mock_upload_file, mock_open):
+        storage_client = IoTStorageClientAsync(
+            credential_type="ACCOUNT_KEY",
+            location_type="CLOUD_BASED",
+            account_name="myStorageAccount",
+            credential="myAccountKey",
+        )
+        progress = []
+        with tempfile.TemporaryDirectory() as source:
+            for name in ["a.txt", "b.txt", "c.txt"]:
+                with open(os.path.join(source, name), "w") as file:
+                    file.write("data")
+
+            upload_result = asyncio.run(
+                storage_client.upload_dir(
+                    container_name="test",
+                    source=source,
+                    dest="dest",
+                    max_concurrency=2,
+                    progress_callback=lambda *args: progress.append(args),
+                )
+            )
+        self.assertEqual(upload_result, True)
+        self.assertEqual(mock_upload_file.call_count, 3)
+        self.assertEqual(len(progress), 3)
+
+    @mock.patch.object(IoTStorageClientAsync, "open")
+    def test_upload_file_blocks(self, mock_open):
+        storage_client = IoTStorageClientAsync(
+            credential_type="ACCOUNT_KEY",
+            location_type="CLOUD_BASED",
+            account_name="myStorageAccount",
+            credential="myAccountKey",
+        )
+        blob_client = mock.MagicMock()
+        blob_client.exists = mock.AsyncMock(return_value=False)
+        blob_client.get_block_list = mock.AsyncMock(
+            side_effect=ResourceNotFoundError("no blob")
+        )
+        blob_client.stage_block = mock.AsyncMock()
+        blob_client.commit_block_list = mock.AsyncMock()
+        storage_client.service_client = mock.MagicMock()
+        storage_client.service_client.get_blob_client.return_value = blob_client
+        with tempfile.TemporaryDirectory() as source:
+            file_path = os.path.join(source, "large.bin")
+            with open(file_path, "wb") as file:
+                file.write(b"0123456789")
+            upload_result = asyncio.run(
+                storage_client.upload_file(
+                    container_name="test",
+                    source=file_path,
+                    dest="large.bin",
+                    overwrite=False,
+                    block_size=4,
+                )
+            )
+        self.assertEqual(upload_result, True)
+        self.assertEqual(blob_client.stage_block.await_count, 3)
+        self.assertEqual(len(blob_client.commit_block_list.call_args.args[0]), 3)
+        self.assertIn("match_condition", blob_client.commit_block_list.call_args.kwargs)
+
+    @mock.patch.object(IoTStorageClientAsync, "open")
+    def test_download_file_resumable(self, mock_open):
+        storage_client = IoTStorageClientAsync(
+            credential_type="ACCOUNT_KEY",
+            location_type="CLOUD_BASED",
+            account_name="myStorageAccount",
+            credential="myAccountKey",
+        )
+        content = b"0123456789"
+        blob_client = mock.MagicMock()
+        blob_client.get_blob_properties = mock.AsyncMock(
+            return_value=mock.MagicMock(etag="etag", size=len(content))
+        )
+
+        async def download_blob(offset, length, **kwargs):
+            data = mock.MagicMock()
+            data.readall = mock.AsyncMock(
+                return_value=content[offset : offset + length]
+            )
+            return data
+
+        blob_client.download_blob = download_blob
+        storage_client.service_client = mock.MagicMock()
+        storage_client.service_client.get_blob_client.return_value = blob_client
+        with tempfile.TemporaryDirectory() as dest:
+            file_path = os.path.join(dest, "blob.bin")
+            download_result = asyncio.run(
+                storage_client.download_file(
+                    container_name="test",
+                    source="blob.bin",
+                    dest=file_path,
+                    max_concurrency=2,
+                    resumable=True,
+                    range_size=4,
+                )
+            )
+            with open(file_path, "rb") as file:
+                self.assertEqual(file.read(), content)
+            self.assertFalse(os.path.exists(file_path + ".checkpoint"))
+        self.assertEqual(download_result, True)
+
+    @mock.patch.object(IoTStorageClientAsync, "open")
+    def test_download_file_streams_chunks(self, mock_open):
+        storage_client = IoTStorageClientAsync(
+            credential_type="ACCOUNT_KEY",
+            location_type="CLOUD_BASED",
+            account_name="myStorageAccount",
+            credential="myAccountKey",
+            file_io_workers=1,
+        )
+
+        async def chunks():
+            for chunk in (b"0123", b"4567", b"89"):
+                yield chunk
+
+        downloader = mock.MagicMock()
+        downloader.chunks = chunks
+        downloader.properties.content_settings.content_encoding = None
+        storage_client.service_client = mock.MagicMock()
+        blob_client = storage_client.service_client.get_blob_client
+        blob_client.return_value.download_blob = mock.AsyncMock(return_value=downloader)
+        with tempfile.TemporaryDirectory() as dest:
+            file_path = os.path.join(dest, "nested", "blob.bin")
+            download_result = asyncio.run(
+                storage_client.download_file(
+                    container_name="test", source="blob.bin", dest=file_path
+                )
+            )
+            with open(file_path, "rb") as file:
+                self.assertEqual(file.read(), b"0123456789")
+        self.assertEqual(download_result, True)
+        asyncio.run(storage_client.close())
+        self.assertIsNone(storage_client._file_executor)
+
+    @mock.patch.object(IoTStorageClientAsync, "open")
+    def test_upload_bytes_blocks_share_memory(self, mock_open):
+        storage_client = IoTStorageClientAsync(
+            credential_type="ACCOUNT_KEY",
+            location_type="CLOUD_BASED",
+            account_name="myStorageAccount",
+            credential="myAccountKey",
+            max_chunk_size=4,
+        )
+        blob_client = mock.MagicMock()
+        blob_client.stage_block = mock.AsyncMock()
+        blob_client.commit_block_list = mock.AsyncMock(return_value={"etag": "etag"})
+        storage_client.service_client = mock.MagicMock()
+        storage_client.service_client.get_blob_client.return_value = blob_client
+        data = bytearray(b"0123456789")
+        upload_result = asyncio.run(
+            storage_client.upload_bytes(
+                container_name="test", data=data, dest="readings.bin", max_concurrency=2
+            )
+        )
+        self.assertEqual(upload_result, True)
+        chunks = [call.args[1] for call in blob_client.stage_block.await_args_list]
+        self.assertEqual([bytes(chunk) for chunk in chunks], [b"0123", b"4567", b"89"])
+        self.assertTrue(all(chunk.obj is data for chunk in chunks))
+        self.assertEqual(len(blob_client.commit_block_list.call_args.args[0]), 3)
+
+    @mock.patch.object(IoTStorageClientAsync, "open")
+    def test_upload_stream(self, mock_open):
+        storage_client = IoTStorageClientAsync(
+            credential_type="ACCOUNT_KEY",
+            location_type="CLOUD_BASED",
+            account_name="myStorageAccount",
+            credential="myAccountKey",
+            max_chunk_size=4,
+        )
+        blob_client = mock.MagicMock()
+        blob_client.upload_blob = mock.AsyncMock()
+        blob_client.stage_block = mock.AsyncMock()
+        blob_client.commit_block_list = mock.AsyncMock(return_value={"etag": "etag"})
+        storage_client.service_client = mock.MagicMock()
+        storage_client.service_client.get_blob_client.return_value = blob_client
+        upload_result = asyncio.run(
+            storage_client.upload_stream(
+                container_name="test", stream=io.BytesIO(b"0123456789"), dest="log.bin"
+            )
+        )
+        self.assertEqual(upload_result, True)
+        staged = [call.args[1] for call in blob_client.stage_block.await_args_list]
+        self.assertEqual(staged, [b"0123", b"4567", b"89"])
+        blob_client.upload_blob.assert_not_awaited()
+
+    @mock.patch.object(IoTStorageClientAsync, "open")
+    def test_download_into_and_to_stream(self, mock_open):
+        storage_client = IoTStorageClientAsync(
+            credential_type="ACCOUNT_KEY",
+            location_type="CLOUD_BASED",
+            account_name="myStorageAccount",
+            credential="myAccountKey",
+        )
+        content = b"0123456789"
+
+        async def readinto(stream):
+            return stream.write(content)
+
+        async def chunks():
+            for chunk in (content[:4], content[4:]):
+                yield chunk
+
+        downloader = mock.MagicMock(size=len(content))
+        downloader.readinto = readinto
+        downloader.chunks = chunks
+        storage_client.service_client = mock.MagicMock()
+        blob_client = storage_client.service_client.get_blob_client
+        blob_client.return_value.download_blob = mock.AsyncMock(return_value=downloader)
+        buffer = bytearray(10)
+        download_result = asyncio.run(
+            storage_client.download_into(
+                container_name="test", source="blob.bin", buffer=buffer
+            )
+        )
+        self.assertEqual((download_result, bytes(buffer)), (10, content))
+        stream = io.BytesIO()
+        download_result = asyncio.run(
+            storage_client.download_to_stream(
+                container_name="test", source="blob.bin", stream=stream
+            )
+        )
+        self.assertEqual((download_result, stream.getvalue()), (10, content))
+        stream = io.BytesIO()
+        download_result = asyncio.run(
+            storage_client.download_to_stream(
+                container_name="test",
+                source="blob.bin",
+                stream=stream,
+                max_concurrency=4,
+            )
+        )
+        self.assertEqual((download_result, stream.getvalue()), (10, content))
+        blob_client.return_value.download_blob.assert_awaited_with(
+            offset=None, length=None, max_concurrency=4
+        )
+        asyncio.run(storage_client.close())
+
+    @mock.patch.object(IoTStorageClientAsync, "open")
+    def test_sync_dir_download(self, mock_open):
+        storage_client = IoTStorageClientAsync(
+            credential_type="ACCOUNT_KEY",
+            location_type="CLOUD_BASED",
+            account_name="myStorageAccount",
+            credential="myAccountKey",
+        )
+        blob = mock.MagicMock(size=4, etag="etag")
+        blob.name = "source/new.txt"
+
+        async def list_blobs(name_starts_with):
+            yield blob
+
+        async def chunks():
+            yield b"da"
+            yield b"ta"
+
+        downloader = mock.MagicMock()
+        downloader.chunks = chunks
+        downloader.properties.etag = "etag"
+        container_client = mock.MagicMock()
+        container_client.list_blobs = list_blobs
+        container_client.get_blob_client.return_value.download_blob = mock.AsyncMock(
+            return_value=downloader
+        )
+        storage_client.service_client = mock.MagicMock()
+        storage_client.service_client.get_container_client.return_value = (
+            container_client
+        )
+        with tempfile.TemporaryDirectory() as dest:
+            with open(os.path.join(dest, "orphan.txt"), "w") as file:
+                file.write("gone")
+            manifest = os.path.join(dest, "manifest.json")
+            results = asyncio.run(
+                storage_client.sync_dir(
+                    container_name="test",
+                    source="source",
+                    dest=dest,
+                    direction=SyncDirection.DOWNLOAD,
+                    delete_orphans=True,
+                    manifest=manifest,
+                )
+            )
+            self.assertEqual(sorted(os.listdir(dest)), ["manifest.json", "new.txt"])
+            with open(os.path.join(dest, "new.txt"), "rb") as file:
+                self.assertEqual(file.read(), b"data")
+        self.assertEqual(
+            results,
+            {
+                "source/new.txt": SyncStatus.TRANSFERRED,
+                "source/orphan.txt": SyncStatus.DELETED,
+            },
+        )
+
+    @mock.patch.object(IoTStorageClientAsync, "open")
+    def test_upload_file_compressed(self, mock_open):
+        storage_client = IoTStorageClientAsync(
+            credential_type="ACCOUNT_KEY",
+            location_type="CLOUD_BASED",
+            account_name="myStorageAccount",
+            credential="myAccountKey",
+        )
+        uploaded = {}
+
+        async def upload_blob(data, overwrite, content_settings):
+            uploaded["data"] = data
+            uploaded["content_settings"] = content_settings
+            return {"etag": "etag"}
+
+        storage_client.service_client = mock.MagicMock()
+        blob_client = storage_client.service_client.get_blob_client
+        blob_client.return_value.upload_blob = upload_blob
+        with tempfile.TemporaryDirectory() as source:
+            file_path = os.path.join(source, "telemetry.json")
+            with open(file_path, "w") as file:
+                file.write('{"value": 42.0}\n' * 1000)
+            upload_result = asyncio.run(
+                storage_client.upload_file(
+                    container_name="test",
+                    source=file_path,
+                    dest="telemetry.json",
+                    content_type="application/json",
+                    compression=CompressionType.GZIP,
+                )
+            )
+        self.assertEqual(upload_result, True)
+        self.assertEqual(uploaded["content_settings"].content_encoding, "gzip")
+        self.assertEqual(gzip.decompress(uploaded["data"]), b'{"value": 42.0}\n' * 1000)
+
+    def test_file_exists_revalidates(self):
+        async def exists_twice(port):
+            async with IoTStorageClientAsync(
+                credential_type="ACCOUNT_KEY",
+                location_type="EDGE_BASED",
+                account_name="myStorageAccount",
+                credential=base64.b64encode(b"myAccountKey").decode(),
+                host="127.0.0.1",
+                port=str(port),
+                raise_errors=True,
+            ) as storage_client:
+                storage_client.properties_cache = PropertiesCache(ttl=0)
+                # the second call revalidates the stale entry and gets a 304
+                return [
+                    await storage_client.file_exists("test", "blob") for _ in range(2)
+                ]
+
+        for error_code in (None, "ConditionNotMet"):
+            NotModifiedHandler.requests = []
+            NotModifiedHandler.error_code = error_code
+            with not_modified_server() as port:
+                self.assertEqual(asyncio.run(exists_twice(port)), [True, True])
+            self.assertEqual(NotModifiedHandler.requests, [None, '"0x1"'])
+
+    @mock.patch.object(IoTStorageClientAsync, "open")
+    def test_container_exists_cached(self, mock_open):
+        storage_client = IoTStorageClientAsync(
+            credential_type="ACCOUNT_KEY",
+            location_type="CLOUD_BASED",
+            account_name="myStorageAccount",
+            credential="myAccountKey",
+            cache_ttl=60,
+        )
+        storage_client.service_client = mock.MagicMock()
+        container_client = storage_client.service_client.get_container_client
+        get_properties = mock.AsyncMock(return_value=mock.MagicMock(etag="etag"))
+        container_client.return_value.get_container_properties = get_properties
+        container_client.return_value.delete_container = mock.AsyncMock()
+
+        async def run():
+            results = [await storage_client.container_exists("test") for _ in range(3)]
+            await storage_client.delete_container("test")
+            get_properties.side_effect = ResourceNotFoundError("deleted")
+            results.append(await storage_client.container_exists("test"))
+            return results
+
+        self.assertEqual(asyncio.run(run()), [True, True, True, False])
+        self.assertEqual(get_properties.await_count, 2)
+        # every call that reaches the service opens the pooled session first
+        self.assertEqual(mock_open.await_count, 3)
+
+    @mock.patch.object(IoTStorageClientAsync, "open")
+    def test_files_exist(self, mock_open):
+        storage_client = IoTStorageClientAsync(
+            credential_type="ACCOUNT_KEY",
+            location_type="CLOUD_BASED",
+            account_name="myStorageAccount",
+            credential="myAccountKey",
+        )
+
+        def get_blob_client(name):
+            blob_client = mock.MagicMock()
+            blob_client.get_blob_properties = mock.AsyncMock(
+                side_effect=ResourceNotFoundError() if name == "b.txt" else None
+            )
+            return blob_client
+
+        storage_client.service_client = mock.MagicMock()
+        container_client = storage_client.service_client.get_container_client
+        container_client.return_value.get_blob_client.side_effect = get_blob_client
+        results = asyncio.run(
+            storage_client.files_exist("test", ["a.txt", "b.txt"], max_concurrency=1)
+        )
+        self.assertEqual(results, {"a.txt": True, "b.txt": False})
+
+    @mock.patch.object(IoTStorageClientAsync, "open")
+    @mock.patch.object(IoTStorageClientAsync, "download_file")
+    def test_copy_file_timeout(self, mock_download_file, mock_open):
+        storage_client = IoTStorageClientAsync(
+            credential_type="ACCOUNT_KEY",
+            location_type="CLOUD_BASED",
+            account_name="myStorageAccount",
+            credential="myAccountKey",
+        )
+        storage_client.service_client = mock.MagicMock()
+        storage_client.service_client.credential = None
+        blob_client = storage_client.service_client.get_blob_client.return_value
+        blob_client.start_copy_from_url = mock.AsyncMock(
+            return_value={"copy_id": "id", "copy_status": "pending"}
+        )
+        blob_client.abort_copy = mock.AsyncMock()
+        storage_client._copy_poller = mock.MagicMock()
+        storage_client._copy_poller.track = mock.AsyncMock(return_value="pending")
+        copy_result = asyncio.run(
+            storage_client.copy_file(
+                container_name="test",
+                source="blob",
+                dest_container="archive",
+                dest="blob",
+                timeout=0,
+            )
+        )
+        self.assertEqual(copy_result, False)
+        blob_client.abort_copy.assert_awaited_once_with("id")
+        mock_download_file.assert_not_called()
+
+    @mock.patch.object(IoTStorageClientAsync, "open")
+    @mock.patch.object(IoTStorageClientAsync, "download_file")
+    def test_copy_file_failed_status(self, mock_download_file, mock_open):
+        storage_client = IoTStorageClientAsync(
+            credential_type="ACCOUNT_KEY",
+            location_type="CLOUD_BASED",
+            account_name="myStorageAccount",
+            credential="myAccountKey",
+        )
+        storage_client.service_client = mock.MagicMock()
+        storage_client.service_client.credential = None
+        blob_client = storage_client.service_client.get_blob_client.return_value
+        blob_client.start_copy_from_url = mock.AsyncMock(
+            return_value={"copy_id": "id", "copy_status": "aborted"}
+        )
+        copy_result = asyncio.run(
+            storage_client.copy_file(
+                container_name="test",
+                source="blob",
+                dest_container="archive",
+                dest="blob",
+            )
+        )
+        self.assertEqual(copy_result, False)
+        mock_download_file.assert_not_called()
+
+    @mock.patch.object(IoTStorageClientAsync, "open")
+    @mock.patch.object(IoTStorageClientAsync, "copy_file", return_value=True)
+    def test_copy_files(self, mock_copy_file, mock_open):
+        storage_client = IoTStorageClientAsync(
+            credential_type="ACCOUNT_KEY",
+            location_type="CLOUD_BASED",
+            account_name="myStorageAccount",
+            credential="myAccountKey",
+        )
+        results = asyncio.run(
+            storage_client.copy_files(
+                container_name="test",
+                files={"a": "b", "c": "d"},
+                dest_container="archive",
+                max_concurrency=1,
+            )
+        )
+        self.assertEqual(results, {"a": True, "c": True})
+        self.assertEqual(mock_copy_file.call_count, 2)
+
+    def test_connection_lifecycle(self):
+        storage_client = IoTStorageClientAsync(
+            credential_type="ACCOUNT_KEY",
+            location_type="CLOUD_BASED",
+            account_name="myStorageAccount",
+            credential="myAccountKey",
+            connection_pool_limit=10,
+        )
+
+        async def run():
+            async with storage_client as client:
+                session = client._transport.session
+                await client.open()
+                self.assertIs(client._transport.session, session)
+                self.assertEqual(session.connector.limit, 10)
+            self.assertTrue(session.closed)
+
+            # a closed client reopens with a fresh session
+            await storage_client.open()
+            self.assertIsNot(storage_client._transport.session, session)
+            await storage_client.close()
+
+        asyncio.run(run())
+
+    def test_reused_across_event_loops(self):
+        NotModifiedHandler.requests = []
+        with not_modified_server() as port:
+            storage_client = IoTStorageClientAsync(
+                credential_type="ACCOUNT_KEY",
+                location_type="EDGE_BASED",
+                account_name="myStorageAccount",
+                credential=base64.b64encode(b"myAccountKey").decode(),
+                host="127.0.0.1",
+                port=str(port),
+                raise_errors=True,
+            )
+            self.assertTrue(asyncio.run(storage_client.file_exists("test", "blob")))
+            session = storage_client._transport.session
+            # a later asyncio.run drops the session left on the finished loop
+            self.assertTrue(asyncio.run(storage_client.file_exists("test", "blob")))
+            self.assertTrue(session.closed)
+            self.assertIsNot(storage_client._transport.session, session)
+            asyncio.run(storage_client.close())
+        self.assertEqual(NotModifiedHandler.requests, [None, None])
+
+    @mock.patch.object(IoTStorageClientAsync, "open")
+    def test_delete_files(self, mock_open):
+        async def parts(statuses):
+            for status in statuses:
+                yield mock.MagicMock(status_code=status)
+
+        async def delete_blobs(*blobs, raise_on_any_failure):
+            return parts([202] * (len(blobs) - 1) + [403])
+
+        storage_client = IoTStorageClientAsync(
+            credential_type="ACCOUNT_KEY",
+            location_type="CLOUD_BASED",
+            account_name="myStorageAccount",
+            credential="myAccountKey",
+        )
+        storage_client.service_client = mock.MagicMock()
+        container_client = storage_client.service_client.get_container_client()
+        container_client.delete_blobs.side_effect = delete_blobs
+        paths = [f"b{i}" for i in range(300)]
+        results = asyncio.run(
+            storage_client.delete_files(container_name="test", paths=paths)
+        )
+        self.assertEqual(container_client.delete_blobs.call_count, 2)
+        self.assertEqual(
+            [path for path, ok in results.items() if not ok], ["b255", "b299"]
+        )
+
+    @mock.patch.object(IoTStorageClientAsync, "open")
+    def test_iter_files(self, mock_open):
+        class Pager:
+            continuation_token = None
+
+            async def __aiter__(self):
+                for token, names in [("t1", ["dir/a", "dir/sub/"]), (None, ["dir/b"])]:
+                    self.continuation_token = token
+                    yield Page(names)
+
+        class Page:
+            def __init__(self, names):
+                self.names = names
+
+            async def __aiter__(self):
+                for name in self.names:
+                    item = mock.MagicMock(
+                        spec=BlobPrefix if name.endswith("/") else None
+                    )
+                    item.name = name
+                    yield item
+
+        storage_client = IoTStorageClientAsync(
+            credential_type="ACCOUNT_KEY",
+            location_type="CLOUD_BASED",
+            account_name="myStorageAccount",
+            credential="myAccountKey",
+        )
+        storage_client.service_client = mock.MagicMock()
+        container_client = storage_client.service_client.get_container_client()
+        container_client.walk_blobs.return_value.by_page.return_value = Pager()
+
+        async def run():
+            return [name async for name in storage_client.iter_files("test", "dir")]
+
+        self.assertEqual(asyncio.run(run()), ["a", "b"])
+
+    @mock.patch.object(IoTStorageClientAsync, "open")
+    def test_list_files_parallel(self, mock_open):
+        names = ["logs/2023/01/a", "logs/2023/02/b", "logs/2024/01/c", "logs/top"]
+
+        async def listing(name_starts_with, delimiter=None):
+            prefixes = set()
+            for name in names:
+                if not name.startswith(name_starts_with):
+                    continue
+                rest = name[len(name_starts_with) :]
+                if delimiter and delimiter in rest:
+                    prefix = name_starts_with + rest.split(delimiter)[0] + delimiter
+                    if prefix not in prefixes:
+                        prefixes.add(prefix)
+                        item = mock.MagicMock(spec=BlobPrefix)
+                        item.name = prefix
+                        yield item
+                    continue
+                item = mock.MagicMock()
+                item.name = name
+                yield item
+
+        storage_client = IoTStorageClientAsync(
+            credential_type="ACCOUNT_KEY",
+            location_type="CLOUD_BASED",
+            account_name="myStorageAccount",
+            credential="myAccountKey",
+        )
+        storage_client.service_client = mock.MagicMock()
+        container_client = storage_client.service_client.get_container_client()
+        container_client.walk_blobs.side_effect = listing
+        container_client.list_blobs.side_effect = listing
+        files = asyncio.run(
+            storage_client.list_files_parallel("test", "logs", max_concurrency=2)
+        )
+        self.assertEqual(files, ["2023/01/a", "2023/02/b", "2024/01/c", "top"])
+        self.assertEqual(container_client.list_blobs.call_count, 2)
+
 
 if __name__ == "__main__":
     unittest.main()
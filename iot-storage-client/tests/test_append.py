@@ -0,0 +1,166 @@
+import time
+import unittest
+from unittest import mock
+
+from azure.core.exceptions import (
+    HttpResponseError,
+    ResourceExistsError,
+    ResourceNotFoundError,
+    ServiceRequestError,
+)
+from azure.storage.blob import BlobType
+
+from iot.storage.client import AppendBlobWriter
+
+
+class FakeAppendBlob:
+    """an in-memory append blob behind the blob client methods the writer uses"""
+
+    def __init__(self, service, name):
+        self.service = service
+        self.name = name
+
+    def get_blob_properties(self):
+        if self.name not in self.service.blobs:
+            raise ResourceNotFoundError("missing")
+        content, blocks = self.service.blobs[self.name]
+        props = mock.MagicMock(size=len(content), blob_type=BlobType.APPENDBLOB)
+        props.append_blob_committed_block_count = blocks
+        return props
+
+    def create_append_blob(self, content_settings, match_condition):
+        if self.name in self.service.blobs:
+            raise ResourceExistsError("exists")
+        self.service.blobs[self.name] = (b"", 0)
+
+    def append_block(self, data, length, appendpos_condition):
+        if self.service.failures:
+            raise self.service.failures.pop(0)
+        content, blocks = self.service.blobs[self.name]
+        if self.service.landed:
+            # the first attempt was applied but its response was lost
+            self.service.landed = False
+            self.service.blobs[self.name] = (content + data, blocks + 1)
+            content = content + data
+        if appendpos_condition != len(content):
+            error = HttpResponseError("append position condition not met")
+            error.error_code = "AppendPositionConditionNotMet"
+            raise error
+        self.service.blobs[self.name] = (content + data, blocks + 1)
+        return {"blob_committed_block_count": blocks + 1}
+
+
+def fake_client():
+    storage_client = mock.MagicMock()
+    service = storage_client.service_client
+    service.blobs = {}
+    service.failures = []
+    service.landed = False
+    service.get_blob_client.side_effect = lambda container, blob: FakeAppendBlob(
+        service, blob
+    )
+    return storage_client
+
+
+class TestAppendBlobWriter(unittest.TestCase):
+    """package append blob writer testing"""
+
+    def test_coalesces_records_into_blocks(self):
+        storage_client = fake_client()
+        writer = AppendBlobWriter(storage_client, "test", "logs/app.log", block_size=8)
+        for record in ("abc", b"def", "gh"):
+            writer.write(record)
+        self.assertEqual(writer.flush(), True)
+        blobs = storage_client.service_client.blobs
+        # abc\n def\n fit one block, gh\n goes in the next
+        self.assertEqual(blobs["logs/app.log"], (b"abc\ndef\ngh\n", 2))
+        self.assertEqual(writer.metrics()["buffered"], 0)
+        with self.assertRaises(ValueError):
+            writer.write(b"too long for a block")
+
+    def test_resumes_existing_blob(self):
+        storage_client = fake_client()
+        storage_client.service_client.blobs["app.log"] = (b"old\n", 1)
+        writer = AppendBlobWriter(storage_client, "test", "app.log")
+        writer.write("new")
+        writer.flush()
+        self.assertEqual(
+            storage_client.service_client.blobs["app.log"][0], b"old\nnew\n"
+        )
+
+    def test_rotates_by_size(self):
+        storage_client = fake_client()
+        storage_client.service_client.blobs["app-0.log"] = (b"full", 1)
+        writer = AppendBlobWriter(
+            storage_client, "test", "app-{sequence}.log", block_size=4, max_blob_size=6
+        )
+        for record in ("aa", "bb", "cc"):
+            writer.write(record)
+        writer.flush()
+        blobs = storage_client.service_client.blobs
+        self.assertEqual(blobs["app-1.log"], (b"aa\nbb\n", 2))
+        self.assertEqual(blobs["app-2.log"], (b"cc\n", 1))
+        self.assertEqual((writer.blob_name, writer.rotations), ("app-2.log", 2))
+        with self.assertRaises(ValueError):
+            AppendBlobWriter(storage_client, "test", "app.log", max_blob_size=6)
+
+    def test_resumes_newest_sequence(self):
+        storage_client = fake_client()
+        blobs = storage_client.service_client.blobs
+        # blobs rotated by time before a restart, none of them full
+        for sequence in range(6):
+            blobs[f"app-{sequence}.log"] = (b"old\n", 1)
+        writer = AppendBlobWriter(
+            storage_client, "test", "app-{sequence}.log", rotate_interval=3600
+        )
+        writer.write("new")
+        writer.flush()
+        self.assertEqual(writer.blob_name, "app-5.log")
+        self.assertEqual(blobs["app-5.log"][0], b"old\nnew\n")
+        self.assertEqual(blobs["app-0.log"][0], b"old\n")
+        self.assertEqual(writer.rotations, 0)
+
+    def test_failed_append_keeps_records(self):
+        storage_client = fake_client()
+        storage_client.service_client.failures.append(ServiceRequestError("offline"))
+        writer = AppendBlobWriter(storage_client, "test", "app.log")
+        writer.write("reading")
+        self.assertEqual(writer.flush(), False)
+        self.assertEqual(writer.buffered(), 8)
+        self.assertEqual(writer.flush(), True)
+        blobs = storage_client.service_client.blobs
+        self.assertEqual(blobs["app.log"][0], b"reading\n")
+        self.assertEqual(writer.failed, 1)
+
+    def test_retried_append_that_landed(self):
+        storage_client = fake_client()
+        storage_client.service_client.landed = True
+        writer = AppendBlobWriter(storage_client, "test", "app.log")
+        writer.write("reading")
+        # the retried request fails its append position check
+        self.assertEqual(writer.flush(), True)
+        blobs = storage_client.service_client.blobs
+        self.assertEqual(blobs["app.log"], (b"reading\n", 1))
+
+    def test_drops_oldest_when_buffer_is_full(self):
+        writer = AppendBlobWriter(fake_client(), "test", "app.log", max_buffer_size=8)
+        for record in ("aaa", "bbb", "ccc"):
+            writer.write(record)
+        self.assertEqual((writer.buffered(), writer.dropped), (8, 1))
+
+    def test_background_flush(self):
+        storage_client = fake_client()
+        with AppendBlobWriter(
+            storage_client, "test", "app.log", flush_interval=0.01
+        ) as writer:
+            writer.write("reading")
+            deadline = time.monotonic() + 5
+            while writer.buffered() and time.monotonic() < deadline:
+                time.sleep(0.01)
+        self.assertEqual(
+            storage_client.service_client.blobs["app.log"][0], b"reading\n"
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,32 @@
+import unittest
+
+from benchmarks.bench_storage import compare, percentile, summarize
+
+
+class TestBenchmarks(unittest.TestCase):
+    """package benchmark helper testing"""
+
+    def test_percentile(self):
+        samples = [float(value) for value in range(100, 0, -1)]
+        self.assertEqual(percentile(samples, 50), 50.0)
+        self.assertEqual(percentile(samples, 99), 99.0)
+        self.assertEqual(percentile([0.5], 99), 0.5)
+
+    def test_summarize(self):
+        result = summarize("sync", "upload_file", [0.5, 1.5], 1000000, 1)
+        self.assertEqual(result["p50_ms"], 500.0)
+        self.assertEqual(result["mean_ms"], 1000.0)
+        self.assertEqual(result["mb_per_sec"], 1.0)
+        listing = summarize("async", "list_files", [0.1], 1024, 10)
+        self.assertIsNone(listing["mb_per_sec"])
+
+    def test_compare(self):
+        baseline = [summarize("sync", "upload_file", [1.0], 1024, 1)]
+        faster = [summarize("sync", "upload_file", [1.1], 1024, 1)]
+        slower = [summarize("sync", "upload_file", [1.5], 1024, 1)]
+        self.assertEqual(compare(faster, baseline, 0.25), [])
+        self.assertEqual(len(compare(slower, baseline, 0.25)), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
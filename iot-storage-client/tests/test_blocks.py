@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+
+from iot.storage.client._blocks import plan_blocks, upload_block_ids
+
+
+class TestBlocks(unittest.TestCase):
+    """package block planning testing"""
+
+    def test_plan_blocks(self):
+        with tempfile.TemporaryDirectory() as source:
+            file_path = os.path.join(source, "large.bin")
+            with open(file_path, "wb") as file:
+                file.write(b"0123456789")
+            blocks = plan_blocks(file_path, 4)
+            self.assertEqual(
+                [(b.offset, b.length) for b in blocks], [(0, 4), (4, 4), (8, 2)]
+            )
+            self.assertEqual(len({len(b.block_id) for b in blocks}), 1)
+            # ids stay stable for an unchanged file and change with the block size
+            self.assertEqual(blocks, plan_blocks(file_path, 4))
+            self.assertNotEqual(
+                blocks[0].block_id, plan_blocks(file_path, 5)[0].block_id
+            )
+
+    def test_plan_blocks_origin(self):
+        with tempfile.TemporaryDirectory() as source:
+            origin = os.path.join(source, "readings.json")
+            copy = os.path.join(source, "readings.json.gz")
+            with open(origin, "wb") as file:
+                file.write(b"original")
+            with open(copy, "wb") as file:
+                file.write(b"0123456789")
+            blocks = plan_blocks(copy, 4, origin)
+            self.assertEqual(
+                [(b.offset, b.length) for b in blocks], [(0, 4), (4, 4), (8, 2)]
+            )
+            # a rewritten copy of an unchanged origin keeps its ids
+            os.utime(copy, ns=(0, 0))
+            self.assertEqual(blocks, plan_blocks(copy, 4, origin))
+            os.utime(origin, ns=(0, 0))
+            self.assertNotEqual(blocks, plan_blocks(copy, 4, origin))
+
+    def test_plan_blocks_too_many(self):
+        with tempfile.TemporaryDirectory() as source:
+            file_path = os.path.join(source, "large.bin")
+            with open(file_path, "wb") as file:
+                file.write(b"0" * 50001)
+            with self.assertRaises(Exception):
+                plan_blocks(file_path, 1)
+
+    def test_upload_block_ids(self):
+        ids = upload_block_ids()
+        first, second = next(ids), next(ids)
+        self.assertEqual(len(first), len(second))
+        self.assertEqual((first[-6:], second[-6:]), ("-00000", "-00001"))
+        self.assertNotEqual(first[:16], next(upload_block_ids())[:16])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+import array
+import unittest
+
+from iot.storage.client._buffers import BufferWriter, as_view, split_view
+
+
+class TestBuffers(unittest.TestCase):
+    """package in-memory buffer helper testing"""
+
+    def test_split_view_shares_memory(self):
+        data = bytearray(b"0123456789")
+        chunks = list(split_view(as_view(data), 4))
+        self.assertEqual([bytes(chunk) for chunk in chunks], [b"0123", b"4567", b"89"])
+        data[0:1] = b"x"
+        self.assertEqual(bytes(chunks[0]), b"x123")
+
+    def test_as_view_flattens(self):
+        view = as_view(array.array("H", [1, 2, 3]))
+        self.assertEqual((view.format, len(view)), ("B", 6))
+
+    def test_buffer_writer_seeks(self):
+        buffer = bytearray(10)
+        writer = BufferWriter(buffer)
+        writer.seek(6)
+        writer.write(b"6789")
+        writer.seek(0)
+        writer.write(memoryview(b"012345"))
+        self.assertEqual((bytes(buffer), writer.written), (b"0123456789", 10))
+        writer.seek(-1, 2)
+        with self.assertRaises(ValueError):
+            writer.write(b"xy")
+
+    def test_buffer_writer_needs_writable_buffer(self):
+        with self.assertRaises(TypeError):
+            BufferWriter(b"read only")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import time
+import unittest
+
+from iot.storage.client._cache import CachedProperties, PropertiesCache
+
+
+class TestPropertiesCache(unittest.TestCase):
+    """package properties cache testing"""
+
+    def test_repr(self):
+        self.assertIsNotNone(PropertiesCache(ttl=1).__repr__())
+        self.assertIsNotNone(CachedProperties(exists=False).__repr__())
+
+    def test_ttl(self):
+        cache = PropertiesCache(ttl=0.01)
+        self.assertEqual(cache.get("test", "blob"), (None, False))
+        entry = CachedProperties(exists=True, etag="etag")
+        cache.put("test", "blob", entry)
+        self.assertEqual(cache.get("test", "blob"), (entry, True))
+        time.sleep(0.02)
+        # stale entries are kept for revalidation
+        self.assertEqual(cache.get("test", "blob"), (entry, False))
+
+    def test_lru_eviction(self):
+        cache = PropertiesCache(ttl=60, max_entries=2)
+        cache.put("test", "a", CachedProperties(exists=True))
+        cache.put("test", "b", CachedProperties(exists=True))
+        cache.get("test", "a")
+        cache.put("test", "c", CachedProperties(exists=True))
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get("test", "b")[0])
+        self.assertIsNotNone(cache.get("test", "a")[0])
+
+    def test_invalidate(self):
+        cache = PropertiesCache(ttl=60)
+        for key in [("test", None), ("test", "a"), ("test", "b"), ("other", "a")]:
+            cache.put(*key, CachedProperties(exists=True))
+        cache.invalidate("test", "a")
+        self.assertIsNone(cache.get("test", "a")[0])
+        self.assertIsNotNone(cache.get("test", "b")[0])
+        cache.invalidate("test")
+        self.assertEqual(len(cache), 1)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
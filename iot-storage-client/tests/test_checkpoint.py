@@ -0,0 +1,38 @@
+import os
+import tempfile
+import unittest
+
+from iot.storage.client._checkpoint import DownloadCheckpoint
+
+
+class TestDownloadCheckpoint(unittest.TestCase):
+    """package download checkpoint testing"""
+
+    def test_repr(self):
+        repr_str = DownloadCheckpoint("dest", "etag", 10, 4).__repr__()
+        self.assertIsNotNone(repr_str)
+
+    def test_load_resumes(self):
+        with tempfile.TemporaryDirectory() as dest:
+            file_path = os.path.join(dest, "blob.bin")
+            checkpoint = DownloadCheckpoint.load(file_path, "etag", 10, 4)
+            self.assertEqual(os.path.getsize(file_path), 10)
+            self.assertEqual(len(checkpoint.missing()), 3)
+            checkpoint.mark(1)
+
+            resumed = DownloadCheckpoint.load(file_path, "etag", 10, 4)
+            self.assertEqual(resumed.missing(), [(0, 0, 4), (2, 8, 2)])
+
+    def test_load_restarts_on_new_etag(self):
+        with tempfile.TemporaryDirectory() as dest:
+            file_path = os.path.join(dest, "blob.bin")
+            DownloadCheckpoint.load(file_path, "etag", 10, 4).mark(0)
+
+            restarted = DownloadCheckpoint.load(file_path, "changed", 10, 4)
+            self.assertEqual(len(restarted.missing()), 3)
+            restarted.remove()
+            self.assertFalse(os.path.exists(restarted.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
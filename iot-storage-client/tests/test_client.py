@@ -1,7 +1,88 @@
+import base64
+import contextlib
+import functools
+import hashlib
+import http.server
+import io
+import os
+import tempfile
+import threading
 import unittest
+from datetime import datetime, timedelta
 from unittest import mock
 
-from iot.storage.client import IoTStorageClient, CredentialType, LocationType
+from azure.core import MatchConditions
+from azure.core.exceptions import HttpResponseError, ResourceNotFoundError
+from azure.storage.blob import BlobBlock, BlobPrefix
+
+from iot.storage.client import (
+    CompressionType,
+    ConflictError,
+    IoTStorageClient,
+    CredentialType,
+    LocationType,
+    SyncStatus,
+)
+from iot.storage.client._blocks import plan_blocks
+from iot.storage.client._cache import PropertiesCache
+from iot.storage.client._checkpoint import DownloadCheckpoint
+
+
+class NotModifiedHandler(http.server.BaseHTTPRequestHandler):
+    """get blob properties that answer a matching if-none-match with a 304"""
+
+    protocol_version = "HTTP/1.1"
+    requests = []
+    error_code = None
+
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):
+        etag = self.headers.get("If-None-Match")
+        self.requests.append(etag)
+        self.send_response(200 if etag is None else 304)
+        self.send_header("Content-Length", "0")
+        self.send_header("ETag", '"0x1"')
+        self.send_header("Last-Modified", "Mon, 01 Jan 2024 00:00:00 GMT")
+        self.send_header("x-ms-blob-type", "BlockBlob")
+        if etag is not None and self.error_code:
+            self.send_header("x-ms-error-code", self.error_code)
+        self.end_headers()
+
+
+@contextlib.contextmanager
+def not_modified_server():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), NotModifiedHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield server.server_port
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def fake_blob(name, content):
+    blob = mock.MagicMock(size=len(content), etag="etag")
+    blob.name = name
+    blob.content_settings.content_md5 = bytearray(hashlib.md5(content).digest())
+    return blob
+
+
+def fake_walk(names, name_starts_with, delimiter="/"):
+    items = {}
+    for name in sorted(names):
+        if not name.startswith(name_starts_with):
+            continue
+        rest = name[len(name_starts_with) :]
+        if delimiter in rest:
+            prefix = name_starts_with + rest.split(delimiter)[0] + delimiter
+            items.setdefault(prefix, mock.MagicMock(spec=BlobPrefix))
+        else:
+            items[name] = mock.MagicMock()
+    for name, item in items.items():
+        item.name = name
+    return list(items.values())
 
 
 class TestCloudKeyClient(unittest.TestCase):
@@ -63,6 +144,102 @@ class TestCloudKeyClient(unittest.TestCase):
         )
         self.assertEqual(exists, False)
 
+    def test_file_exists_cached(self):
+        self.storage_client.properties_cache = PropertiesCache(ttl=60)
+        self.storage_client.service_client = mock.MagicMock()
+        blob_client = self.storage_client.service_client.get_blob_client.return_value
+        blob_client.get_blob_properties.side_effect = ResourceNotFoundError("missing")
+
+        for _ in range(3):
+            exists = self.storage_client.file_exists("test", "blob")
+            self.assertEqual(exists, False)
+        self.assertEqual(blob_client.get_blob_properties.call_count, 1)
+
+        # the client's own upload invalidates the negative entry
+        blob_client.get_blob_properties.side_effect = None
+        blob_client.get_blob_properties.return_value = mock.MagicMock(
+            etag="etag", size=4
+        )
+        with tempfile.NamedTemporaryFile() as source:
+            self.storage_client.upload_file("test", source.name, "blob")
+        self.assertEqual(self.storage_client.file_exists("test", "blob"), True)
+        self.assertEqual(blob_client.get_blob_properties.call_count, 2)
+
+    def test_file_exists_revalidates(self):
+        for error_code in (None, "ConditionNotMet"):
+            NotModifiedHandler.requests = []
+            NotModifiedHandler.error_code = error_code
+            with not_modified_server() as port:
+                storage_client = IoTStorageClient(
+                    credential_type=CredentialType.ACCOUNT_KEY,
+                    location_type=LocationType.EDGE_BASED,
+                    account_name="myStorageAccount",
+                    credential=base64.b64encode(b"myAccountKey").decode(),
+                    host="127.0.0.1",
+                    port=str(port),
+                    raise_errors=True,
+                )
+                storage_client.properties_cache = PropertiesCache(ttl=0)
+                self.assertEqual(storage_client.file_exists("test", "blob"), True)
+                # the service answers the stale entry's etag with a 304
+                self.assertEqual(storage_client.file_exists("test", "blob"), True)
+                storage_client.close()
+            self.assertEqual(NotModifiedHandler.requests, [None, '"0x1"'])
+
+    def test_files_exist_listing(self):
+        container_client = mock.MagicMock()
+        container_client.list_blobs.return_value = [
+            fake_blob(f"dir/{i:03d}.txt", b"data") for i in range(0, 200, 2)
+        ]
+        self.storage_client.service_client = mock.MagicMock()
+        self.storage_client.service_client.get_container_client.return_value = (
+            container_client
+        )
+        names = [f"dir/{i:03d}.txt" for i in range(60)]
+        results = self.storage_client.files_exist("test", names)
+        self.assertEqual(results, {name: int(name[4:7]) % 2 == 0 for name in names})
+        container_client.list_blobs.assert_called_once_with(name_starts_with="dir/0")
+        container_client.get_blob_client.assert_not_called()
+
+    @mock.patch("iot.storage.client._client.generate_blob_sas")
+    def test_generate_file_sas_url_cached(self, mock_generate_blob_sas):
+        mock_generate_blob_sas.side_effect = ["token1", "token2"]
+        urls = [
+            self.storage_client.generate_file_sas_url("test", "file.txt")
+            for _ in range(3)
+        ]
+        self.storage_client.generate_file_sas_url("test", "file.txt", write=True)
+        self.assertEqual(len(set(urls)), 1)
+        self.assertTrue(urls[0].endswith("?token1"))
+        self.assertEqual(mock_generate_blob_sas.call_count, 2)
+        # the default expiry is computed when the token is signed
+        expiry = mock_generate_blob_sas.call_args.kwargs["expiry"]
+        self.assertGreater(expiry, datetime.utcnow() + timedelta(minutes=14))
+
+    def test_get_properties_many_head(self):
+        container_client = mock.MagicMock()
+
+        def get_blob_client(name):
+            blob_client = mock.MagicMock()
+            if name == "missing.txt":
+                blob_client.get_blob_properties.side_effect = ResourceNotFoundError()
+            else:
+                blob_client.get_blob_properties.return_value = fake_blob(name, b"x")
+            return blob_client
+
+        container_client.get_blob_client.side_effect = get_blob_client
+        self.storage_client.service_client = mock.MagicMock()
+        self.storage_client.service_client.get_container_client.return_value = (
+            container_client
+        )
+        results = self.storage_client.get_properties_many(
+            "test", ["a.txt", "missing.txt", "a.txt"], max_concurrency=2
+        )
+        self.assertEqual(list(results), ["a.txt", "missing.txt"])
+        self.assertEqual(results["a.txt"].name, "a.txt")
+        self.assertIsNone(results["missing.txt"])
+        container_client.list_blobs.assert_not_called()
+
     @mock.patch("iot.storage.client._client.BlobServiceClient")
     @mock.patch("iot.storage.client._client.BlobClient")
     def test_download(self, mock_BlobServiceClient, mock_BlobClient):
@@ -78,6 +255,636 @@ class TestCloudKeyClient(unittest.TestCase):
         )
         self.assertEqual(download_result, False)
 
+    def test_download_file_streams(self):
+        blob_client = mock.MagicMock()
+        self.storage_client.service_client = mock.MagicMock()
+        self.storage_client.service_client.get_blob_client.return_value = blob_client
+        with tempfile.TemporaryDirectory() as dest:
+            download_result = self.storage_client.download_file(
+                container_name="test",
+                source="blob.bin",
+                dest=os.path.join(dest, "blob.bin"),
+                max_concurrency=2,
+            )
+        self.assertEqual(download_result, True)
+        blob_client.download_blob.assert_called_once_with(max_concurrency=2)
+        blob_client.download_blob.return_value.readinto.assert_called_once()
+        blob_client.download_blob.return_value.readall.assert_not_called()
+
+    def test_download_file_resumes(self):
+        content = b"0123456789"
+        blob_client = mock.MagicMock()
+        blob_client.get_blob_properties.return_value = mock.MagicMock(
+            etag="etag", size=len(content)
+        )
+
+        def download_blob(offset, length, **kwargs):
+            data = mock.MagicMock()
+            data.readinto.side_effect = lambda file: file.write(
+                content[offset : offset + length]
+            )
+            return data
+
+        blob_client.download_blob.side_effect = download_blob
+        self.storage_client.service_client = mock.MagicMock()
+        self.storage_client.service_client.get_blob_client.return_value = blob_client
+        with tempfile.TemporaryDirectory() as dest:
+            file_path = os.path.join(dest, "blob.bin")
+            # the first range landed before the connection dropped
+            checkpoint = DownloadCheckpoint.load(file_path, "etag", len(content), 4)
+            with open(file_path, "r+b") as file:
+                file.write(content[:4])
+            checkpoint.mark(0)
+
+            download_result = self.storage_client.download_file(
+                container_name="test",
+                source="blob.bin",
+                dest=file_path,
+                max_concurrency=2,
+                resumable=True,
+                range_size=4,
+            )
+            with open(file_path, "rb") as file:
+                self.assertEqual(file.read(), content)
+            self.assertFalse(os.path.exists(checkpoint.path))
+        self.assertEqual(download_result, True)
+        offsets = sorted(
+            call.kwargs["offset"] for call in blob_client.download_blob.call_args_list
+        )
+        self.assertEqual(offsets, [4, 8])
+
+    def test_upload_and_download_compressed(self):
+        content = b"timestamp,value\n" + b"1660000000,42.0\n" * 1000
+        uploaded = {}
+
+        def upload_blob(name, data, overwrite, content_settings):
+            uploaded["data"] = data.read()
+            uploaded["content_settings"] = content_settings
+
+        def download_blob(max_concurrency):
+            data = mock.MagicMock()
+            data.readinto.side_effect = lambda file: file.write(uploaded["data"])
+            data.properties.content_settings = uploaded["content_settings"]
+            return data
+
+        self.storage_client.service_client = mock.MagicMock()
+        service_client = self.storage_client.service_client
+        service_client.get_container_client.return_value.upload_blob = upload_blob
+        service_client.get_blob_client.return_value.download_blob = download_blob
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = os.path.join(tmp_dir, "telemetry.csv")
+            with open(file_path, "wb") as file:
+                file.write(content)
+            upload_result = self.storage_client.upload_file(
+                container_name="test",
+                source=file_path,
+                dest="telemetry.csv",
+                content_type="text/csv",
+                compression=CompressionType.GZIP,
+            )
+            self.assertEqual(upload_result, True)
+            self.assertEqual(uploaded["content_settings"].content_encoding, "gzip")
+            self.assertLess(len(uploaded["data"]), len(content))
+            self.assertEqual(os.listdir(tmp_dir), ["telemetry.csv"])
+
+            dest = os.path.join(tmp_dir, "downloaded.csv")
+            download_result = self.storage_client.download_file(
+                container_name="test", source="telemetry.csv", dest=dest
+            )
+            self.assertEqual(download_result, True)
+            with open(dest, "rb") as file:
+                self.assertEqual(file.read(), content)
+
+    @mock.patch.object(IoTStorageClient, "download_file", return_value=True)
+    @mock.patch.object(
+        IoTStorageClient, "list_files", return_value=["a.txt", "sub/b.txt"]
+    )
+    def test_download_dir(self, mock_list_files, mock_download_file):
+        results = self.storage_client.download_dir(
+            container_name="test",
+            source="dir",
+            dest="dest",
+            max_concurrency=2,
+        )
+        self.assertEqual(results, {"dir/a.txt": True, "dir/sub/b.txt": True})
+        mock_download_file.assert_any_call("test", "dir/a.txt", "dest/dir/a.txt")
+        mock_download_file.assert_any_call(
+            "test", "dir/sub/b.txt", "dest/dir/sub/b.txt"
+        )
+
+    @mock.patch.object(IoTStorageClient, "download_file", side_effect=[True, False])
+    @mock.patch.object(IoTStorageClient, "list_files", return_value=["a.txt", "b.txt"])
+    def test_download_all_blobs(self, mock_list_files, mock_download_file):
+        download_result = self.storage_client.download(
+            container_name="test",
+            source="dir",
+            dest="dest",
+            max_concurrency=1,
+        )
+        self.assertEqual(download_result, False)
+        self.assertEqual(mock_download_file.call_count, 2)
+
+    def test_upload_file_blocks_resume(self):
+        blob_client = mock.MagicMock()
+        self.storage_client.service_client = mock.MagicMock()
+        self.storage_client.service_client.get_blob_client.return_value = blob_client
+        with tempfile.TemporaryDirectory() as source:
+            file_path = os.path.join(source, "large.bin")
+            with open(file_path, "wb") as file:
+                file.write(b"0123456789")
+            blocks = plan_blocks(file_path, 4)
+            # the first block survived an earlier, interrupted upload
+            blob_client.get_block_list.return_value = (
+                [],
+                [BlobBlock(block_id=blocks[0].block_id, state="Uncommitted")],
+            )
+            blob_client.get_block_list.return_value[1][0].size = 4
+            upload_result = self.storage_client.upload_file(
+                container_name="test",
+                source=file_path,
+                dest="large.bin",
+                block_size=4,
+                max_concurrency=2,
+            )
+        self.assertEqual(upload_result, True)
+        staged = sorted(call.args[1] for call in blob_client.stage_block.call_args_list)
+        self.assertEqual(staged, [b"4567", b"89"])
+        committed = blob_client.commit_block_list.call_args.args[0]
+        self.assertEqual(
+            [block.id for block in committed], [block.block_id for block in blocks]
+        )
+
+    def test_upload_file_blocks_exists(self):
+        self.storage_client.raise_errors = True
+        blob_client = mock.MagicMock()
+        blob_client.exists.return_value = True
+        self.storage_client.service_client = mock.MagicMock()
+        self.storage_client.service_client.get_blob_client.return_value = blob_client
+        with tempfile.NamedTemporaryFile() as source:
+            source.write(b"0123456789")
+            source.flush()
+            with self.assertRaises(ConflictError):
+                self.storage_client.upload_file(
+                    "test", source.name, "large.bin", overwrite=False, block_size=4
+                )
+        blob_client.stage_block.assert_not_called()
+
+    def test_upload_file_compressed_blocks_resume(self):
+        blob_client = mock.MagicMock()
+        blob_client.get_block_list.return_value = ([], [])
+        blob_client.commit_block_list.side_effect = [Exception("offline"), None]
+        self.storage_client.service_client = mock.MagicMock()
+        self.storage_client.service_client.get_blob_client.return_value = blob_client
+        with tempfile.TemporaryDirectory() as source:
+            file_path = os.path.join(source, "readings.json")
+            with open(file_path, "wb") as file:
+                file.write(os.urandom(4096).hex().encode())
+            upload = functools.partial(
+                self.storage_client.upload_file,
+                container_name="test",
+                source=file_path,
+                dest="readings.json",
+                content_type="application/json",
+                block_size=1024,
+                compression="gzip",
+            )
+            self.assertEqual(upload(), False)
+            # every block was staged before the commit failed
+            staged = []
+            for call in blob_client.stage_block.call_args_list:
+                block = BlobBlock(block_id=call.args[0], state="Uncommitted")
+                block.size = call.kwargs["length"]
+                staged.append(block)
+            blob_client.get_block_list.return_value = ([], staged)
+            blob_client.stage_block.reset_mock()
+            self.assertEqual(upload(), True)
+        blob_client.stage_block.assert_not_called()
+        committed = blob_client.commit_block_list.call_args.args[0]
+        self.assertEqual(
+            [block.id for block in committed], [block.id for block in staged]
+        )
+
+    def test_upload_bytes(self):
+        blob_client = mock.MagicMock()
+        self.storage_client.service_client = mock.MagicMock()
+        self.storage_client.service_client.get_blob_client.return_value = blob_client
+        data = b"sensor readings"
+        upload_result = self.storage_client.upload_bytes(
+            container_name="test", data=data, dest="readings.bin"
+        )
+        self.assertEqual(upload_result, True)
+        self.assertIs(blob_client.upload_blob.call_args.args[0], data)
+        blob_client.stage_block.assert_not_called()
+
+    def test_upload_bytes_blocks_exists(self):
+        self.storage_client.raise_errors = True
+        self.storage_client.max_chunk_size = 4
+        blob_client = mock.MagicMock()
+        blob_client.exists.return_value = True
+        self.storage_client.service_client = mock.MagicMock()
+        self.storage_client.service_client.get_blob_client.return_value = blob_client
+        with self.assertRaises(ConflictError):
+            self.storage_client.upload_bytes(
+                "test", b"0123456789", "readings.bin", overwrite=False
+            )
+        blob_client.stage_block.assert_not_called()
+
+    def test_upload_bytes_blocks_share_memory(self):
+        self.storage_client.max_chunk_size = 4
+        blob_client = mock.MagicMock()
+        blob_client.exists.return_value = False
+        self.storage_client.service_client = mock.MagicMock()
+        self.storage_client.service_client.get_blob_client.return_value = blob_client
+        data = bytearray(b"0123456789")
+        upload_result = self.storage_client.upload_bytes(
+            container_name="test",
+            data=memoryview(data),
+            dest="readings.bin",
+            overwrite=False,
+            max_concurrency=2,
+        )
+        self.assertEqual(upload_result, True)
+        staged = sorted(
+            (call.args[0], call.args[1])
+            for call in blob_client.stage_block.call_args_list
+        )
+        self.assertEqual(
+            [bytes(chunk) for _, chunk in staged], [b"0123", b"4567", b"89"]
+        )
+        self.assertTrue(all(chunk.obj is data for _, chunk in staged))
+        committed = blob_client.commit_block_list.call_args.args[0]
+        self.assertEqual([block.id for block in committed], [id for id, _ in staged])
+        self.assertEqual(
+            blob_client.commit_block_list.call_args.kwargs["match_condition"],
+            MatchConditions.IfMissing,
+        )
+
+    def test_upload_stream(self):
+        self.storage_client.max_chunk_size = 4
+        blob_client = mock.MagicMock()
+        self.storage_client.service_client = mock.MagicMock()
+        self.storage_client.service_client.get_blob_client.return_value = blob_client
+        upload_result = self.storage_client.upload_stream(
+            container_name="test", stream=io.BytesIO(b"0123456789"), dest="log.bin"
+        )
+        self.assertEqual(upload_result, True)
+        staged = sorted(call.args[1] for call in blob_client.stage_block.call_args_list)
+        self.assertEqual(staged, [b"0123", b"4567", b"89"])
+        self.assertEqual(len(blob_client.commit_block_list.call_args.args[0]), 3)
+        # a stream that fits in one chunk is sent in a single request
+        upload_result = self.storage_client.upload_stream(
+            container_name="test", stream=io.BytesIO(b"0123"), dest="log.bin"
+        )
+        self.assertEqual(upload_result, True)
+        self.assertEqual(blob_client.upload_blob.call_args.args[0], b"0123")
+
+    def test_download_into(self):
+        content = b"0123456789"
+        downloader = mock.MagicMock(size=len(content))
+        downloader.readinto.side_effect = lambda stream: stream.write(content)
+        self.storage_client.service_client = mock.MagicMock()
+        blob_client = self.storage_client.service_client.get_blob_client
+        blob_client.return_value.download_blob.return_value = downloader
+        buffer = bytearray(16)
+        download_result = self.storage_client.download_into(
+            container_name="test", source="blob.bin", buffer=buffer
+        )
+        self.assertEqual(download_result, 10)
+        self.assertEqual(bytes(buffer[:10]), content)
+        # a buffer too small for the blob is left untouched
+        download_result = self.storage_client.download_into(
+            container_name="test", source="blob.bin", buffer=bytearray(4)
+        )
+        self.assertIsNone(download_result)
+        self.assertEqual(downloader.readinto.call_count, 1)
+
+    def test_download_to_stream(self):
+        self.storage_client.service_client = mock.MagicMock()
+        blob_client = self.storage_client.service_client.get_blob_client
+        download_blob = blob_client.return_value.download_blob
+        download_blob.return_value.readinto.return_value = 10
+        stream = io.BytesIO()
+        download_result = self.storage_client.download_to_stream(
+            container_name="test", source="blob.bin", stream=stream, offset=2
+        )
+        self.assertEqual(download_result, 10)
+        download_blob.assert_called_once_with(offset=2, length=None, max_concurrency=1)
+        download_blob.return_value.readinto.assert_called_once_with(stream)
+
+    @mock.patch.object(IoTStorageClient, "delete_files")
+    def test_sync_dir_upload(self, mock_delete_files):
+        mock_delete_files.side_effect = lambda container, paths, *args: {
+            path: True for path in paths
+        }
+        container_client = mock.MagicMock()
+        container_client.list_blobs.return_value = [
+            fake_blob("dest/same.txt", b"same"),
+            fake_blob("dest/changed.txt", b"old!"),
+            fake_blob("dest/orphan.txt", b"gone"),
+        ]
+        blob_client = container_client.get_blob_client.return_value
+        blob_client.upload_blob.return_value = {"etag": "new"}
+        self.storage_client.service_client = mock.MagicMock()
+        self.storage_client.service_client.get_container_client.return_value = (
+            container_client
+        )
+        with tempfile.TemporaryDirectory() as source:
+            for name, content in [("same.txt", b"same"), ("changed.txt", b"new!")]:
+                with open(os.path.join(source, name), "wb") as file:
+                    file.write(content)
+            os.makedirs(os.path.join(source, "sub"))
+            with open(os.path.join(source, "sub", "added.txt"), "wb") as file:
+                file.write(b"added")
+
+            results = self.storage_client.sync_dir(
+                container_name="test",
+                source=source,
+                dest="dest",
+                delete_orphans=True,
+            )
+        self.assertEqual(
+            results,
+            {
+                "dest/same.txt": SyncStatus.UNCHANGED,
+                "dest/changed.txt": SyncStatus.TRANSFERRED,
+                "dest/sub/added.txt": SyncStatus.TRANSFERRED,
+                "dest/orphan.txt": SyncStatus.DELETED,
+            },
+        )
+        self.assertEqual(blob_client.upload_blob.call_count, 2)
+        mock_delete_files.assert_called_once_with("test", ["dest/orphan.txt"], 8)
+
+    @mock.patch.object(IoTStorageClient, "upload_file", return_value=True)
+    def test_upload_dir(self, mock_upload_file):
+        progress = []
+        with tempfile.TemporaryDirectory() as source:
+            os.makedirs(os.path.join(source, "sub"))
+            for name in ["a.txt", os.path.join("sub", "b.txt")]:
+                with open(os.path.join(source, name), "w") as file:
+                    file.write("data")
+
+            upload_result = self.storage_client.upload_dir(
+                container_name="test",
+                source=source,
+                dest="dest",
+                max_concurrency=2,
+                progress_callback=lambda *args: progress.append(args),
+            )
+        self.assertEqual(upload_result, True)
+        self.assertEqual(mock_upload_file.call_count, 2)
+        self.assertEqual(
+            sorted(blob_path for _, blob_path, _ in progress),
+            ["dest/a.txt", "dest/sub/b.txt"],
+        )
+
+    def test_copy_file_server_side(self):
+        self.storage_client.service_client = mock.MagicMock()
+        self.storage_client.service_client.credential = None
+        blob_client = self.storage_client.service_client.get_blob_client.return_value
+        blob_client.url = "https://account.blob.core.windows.net/test/blob?sig=x"
+        blob_client.start_copy_from_url.return_value = {
+            "copy_id": "id",
+            "copy_status": "success",
+        }
+        with mock.patch.object(IoTStorageClient, "download_file") as mock_download:
+            copy_result = self.storage_client.copy_file(
+                container_name="test",
+                source="blob",
+                dest_container="archive",
+                dest="blob",
+            )
+        self.assertEqual(copy_result, True)
+        blob_client.start_copy_from_url.assert_called_once_with(blob_client.url)
+        mock_download.assert_not_called()
+
+    @mock.patch.object(IoTStorageClient, "upload_file", return_value=True)
+    @mock.patch.object(IoTStorageClient, "download_file", return_value=True)
+    def test_copy_file_fallback(self, mock_download_file, mock_upload_file):
+        self.storage_client.service_client = mock.MagicMock()
+        blob_client = self.storage_client.service_client.get_blob_client.return_value
+        self.storage_client.service_client.credential = None
+        unsupported = HttpResponseError("not implemented")
+        unsupported.status_code = 501
+        blob_client.start_copy_from_url.side_effect = unsupported
+        copy_result = self.storage_client.copy_file(
+            container_name="test",
+            source="blob",
+            dest_container="archive",
+            dest="blob",
+        )
+        self.assertEqual(copy_result, True)
+        mock_download_file.assert_called_once()
+        mock_upload_file.assert_called_once()
+
+    @mock.patch.object(IoTStorageClient, "download_file")
+    def test_copy_file_no_fallback(self, mock_download_file):
+        self.storage_client.service_client = mock.MagicMock()
+        self.storage_client.service_client.credential = None
+        blob_client = self.storage_client.service_client.get_blob_client.return_value
+        blob_client.start_copy_from_url.side_effect = ResourceNotFoundError("missing")
+        copy_result = self.storage_client.copy_file(
+            container_name="test",
+            source="blob",
+            dest_container="archive",
+            dest="blob",
+        )
+        self.assertEqual(copy_result, False)
+        mock_download_file.assert_not_called()
+
+    @mock.patch.object(IoTStorageClient, "download_file")
+    def test_copy_file_timeout(self, mock_download_file):
+        self.storage_client.service_client = mock.MagicMock()
+        self.storage_client.service_client.credential = None
+        blob_client = self.storage_client.service_client.get_blob_client.return_value
+        blob_client.start_copy_from_url.return_value = {
+            "copy_id": "id",
+            "copy_status": "pending",
+        }
+        copy_result = self.storage_client.copy_file(
+            container_name="test",
+            source="blob",
+            dest_container="archive",
+            dest="blob",
+            timeout=0,
+        )
+        self.assertEqual(copy_result, False)
+        blob_client.abort_copy.assert_called_once_with("id")
+        mock_download_file.assert_not_called()
+
+    @mock.patch.object(IoTStorageClient, "download_file")
+    @mock.patch("iot.storage.client._client.time.sleep")
+    def test_copy_file_failed_status(self, mock_sleep, mock_download_file):
+        self.storage_client.service_client = mock.MagicMock()
+        self.storage_client.service_client.credential = None
+        blob_client = self.storage_client.service_client.get_blob_client.return_value
+        blob_client.start_copy_from_url.return_value = {
+            "copy_id": "id",
+            "copy_status": "pending",
+        }
+        blob_client.get_blob_properties.return_value.copy.status = "failed"
+        copy_result = self.storage_client.copy_file(
+            container_name="test",
+            source="blob",
+            dest_container="archive",
+            dest="blob",
+        )
+        self.assertEqual(copy_result, False)
+        blob_client.abort_copy.assert_not_called()
+        mock_download_file.assert_not_called()
+
+    @mock.patch.object(IoTStorageClient, "copy_file", return_value=True)
+    def test_copy_files(self, mock_copy_file):
+        results = self.storage_client.copy_files(
+            container_name="test",
+            files={"a": "archive/a"},
+            dest_container="archive",
+        )
+        self.assertEqual(results, {"a": True})
+        mock_copy_file.assert_called_once_with("test", "a", "archive", "archive/a", 100)
+
+    def test_delete_files(self):
+        def delete_blobs(*blobs, raise_on_any_failure):
+            return [
+                mock.MagicMock(status_code=404 if blob == "b7" else 202)
+                for blob in blobs
+            ]
+
+        self.storage_client.service_client = mock.MagicMock()
+        container_client = (
+            self.storage_client.service_client.get_container_client.return_value
+        )
+        container_client.delete_blobs.side_effect = delete_blobs
+        paths = [f"b{i}" for i in range(300)]
+        results = self.storage_client.delete_files(
+            container_name="test", paths=paths, max_concurrency=2
+        )
+        self.assertEqual(container_client.delete_blobs.call_count, 2)
+        self.assertEqual(len(results), 300)
+        self.assertEqual([path for path, ok in results.items() if not ok], ["b7"])
+
+    @mock.patch.object(IoTStorageClient, "delete_files", return_value={"dir/a": True})
+    @mock.patch.object(IoTStorageClient, "list_files", return_value=["a"])
+    def test_delete_dir(self, mock_list_files, mock_delete_files):
+        delete_result = self.storage_client.delete_dir(
+            container_name="test", path="dir"
+        )
+        self.assertEqual(delete_result, True)
+        mock_delete_files.assert_called_once_with("test", ["dir/a"], 4)
+
+    def test_list_files_and_dirs(self):
+        self.storage_client.service_client = mock.MagicMock()
+        container_client = (
+            self.storage_client.service_client.get_container_client.return_value
+        )
+        container_client.walk_blobs.return_value = [
+            mock.MagicMock(spec=BlobPrefix, name="prefix"),
+            mock.MagicMock(),
+        ]
+        container_client.walk_blobs.return_value[0].name = "dir/sub/"
+        container_client.walk_blobs.return_value[1].name = "dir/a.txt"
+        container_client.list_blobs.return_value = [
+            mock.MagicMock(),
+            mock.MagicMock(),
+        ]
+        container_client.list_blobs.return_value[0].name = "dir/a.txt"
+        container_client.list_blobs.return_value[1].name = "dir/sub/b.txt"
+
+        self.assertEqual(self.storage_client.list_files("test", "dir"), ["a.txt"])
+        self.assertEqual(self.storage_client.list_dirs("test", "dir"), ["sub"])
+        container_client.walk_blobs.assert_called_with(
+            name_starts_with="dir/", delimiter="/"
+        )
+        self.assertEqual(
+            self.storage_client.list_files("test", "dir", recursive=True),
+            ["a.txt", "sub/b.txt"],
+        )
+        self.assertEqual(
+            self.storage_client.list_dirs("test", "dir", recursive=True), ["sub"]
+        )
+        index = self.storage_client.index_blobs("test", "dir")
+        self.assertEqual(index.dirs(), ["sub"])
+
+    def test_list_files_parallel(self):
+        names = [
+            "archive/2022/12/31/a.json",
+            "archive/2023/01/01/b.json",
+            "archive/2023/01/02/c.json",
+            "archive/2023/notes.txt",
+            "archive/readme.txt",
+        ]
+        self.storage_client.service_client = mock.MagicMock()
+        container_client = (
+            self.storage_client.service_client.get_container_client.return_value
+        )
+        container_client.walk_blobs.side_effect = functools.partial(fake_walk, names)
+        container_client.list_blobs.side_effect = lambda name_starts_with: [
+            blob
+            for blob in fake_walk(names, name_starts_with, delimiter="\0")
+            if not isinstance(blob, BlobPrefix)
+        ]
+        expected = [name[len("archive/") :] for name in sorted(names)]
+        self.assertEqual(
+            self.storage_client.list_files_parallel(
+                "test", "archive", partition_depth=2, max_concurrency=4
+            ),
+            expected,
+        )
+        # one listing per year/month partition
+        listed = sorted(
+            call.kwargs["name_starts_with"]
+            for call in container_client.list_blobs.call_args_list
+        )
+        self.assertEqual(listed, ["archive/2022/12/", "archive/2023/01/"])
+        # caller partitions may overlap, names are listed once
+        self.assertEqual(
+            self.storage_client.list_files_parallel(
+                "test", "archive", partitions=["2023/01/0", "2023/", "2022/"]
+            ),
+            expected[:-1],
+        )
+
+    def test_iter_pages(self):
+        def blob(name):
+            item = mock.MagicMock()
+            item.name = name
+            return item
+
+        class Pager:
+            continuation_token = None
+
+            def __iter__(self):
+                for token, page in [
+                    ("t1", [blob("dir/a/1.txt"), blob("dir/a/2.txt")]),
+                    (None, [blob("dir/b/c/3.txt")]),
+                ]:
+                    self.continuation_token = token
+                    yield page
+
+        self.storage_client.service_client = mock.MagicMock()
+        container_client = (
+            self.storage_client.service_client.get_container_client.return_value
+        )
+        container_client.list_blobs.return_value.by_page.return_value = Pager()
+        pages = list(
+            self.storage_client.iter_pages(
+                "test", "dir", recursive=True, continuation_token="t0"
+            )
+        )
+        self.assertEqual(
+            pages,
+            [
+                (["a/1.txt", "a/2.txt"], ["a"], "t1"),
+                (["b/c/3.txt"], ["b", "b/c"], None),
+            ],
+        )
+        container_client.list_blobs.return_value.by_page.assert_called_with(
+            continuation_token="t0"
+        )
+
+        container_client.list_blobs.return_value.by_page.return_value = Pager()
+        files = self.storage_client.iter_files("test", "dir", recursive=True)
+        self.assertEqual(next(files), "a/1.txt")
+
 
 class TestClientInit(unittest.TestCase):
     """package client init-based testing"""
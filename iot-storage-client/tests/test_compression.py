@@ -0,0 +1,252 @@
+import asyncio
+import base64
+import http.server
+import os
+import re
+import tempfile
+import threading
+import unittest
+import urllib.parse
+
+from iot.storage.client import (
+    CompressionType,
+    CredentialType,
+    IoTStorageClient,
+    IoTStorageClientAsync,
+    LocationType,
+)
+from iot.storage.client._compression import (
+    compress_file,
+    decompress_file,
+    is_compressed,
+    should_compress,
+    zstandard,
+)
+
+
+class FakeBlobHandler(http.server.BaseHTTPRequestHandler):
+    """
+    put blob, put block list, get blob properties and ranged get blob
+    against an in-memory store, keeping the content encoding like the
+    service does
+    """
+
+    protocol_version = "HTTP/1.1"
+    blobs = {}
+    blocks = {}
+
+    def log_message(self, *args):
+        pass
+
+    def send_blob_headers(self, encoding, length):
+        self.send_header("Content-Length", str(length))
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self.send_header("ETag", '"0x1"')
+        self.send_header("Last-Modified", "Mon, 01 Jan 2024 00:00:00 GMT")
+        self.send_header("x-ms-blob-type", "BlockBlob")
+        self.send_header("x-ms-creation-time", "Mon, 01 Jan 2024 00:00:00 GMT")
+
+    def do_PUT(self):
+        if self.headers.get("Transfer-Encoding") == "chunked":
+            body = b""
+            while True:
+                size = int(self.rfile.readline(), 16)
+                body += self.rfile.read(size)
+                self.rfile.readline()
+                if not size:
+                    break
+        else:
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+        path, _, query = self.path.partition("?")
+        params = urllib.parse.parse_qs(query)
+        if params.get("comp") == ["block"]:
+            self.blocks[params["blockid"][0]] = body
+        else:
+            if params.get("comp") == ["blocklist"]:
+                ids = re.findall(rb"<Latest>(.*?)</Latest>", body)
+                body = b"".join(self.blocks[block_id.decode()] for block_id in ids)
+            encoding = self.headers.get("x-ms-blob-content-encoding")
+            self.blobs[path] = (body, encoding)
+        self.send_response(201)
+        self.send_blob_headers(None, 0)
+        self.end_headers()
+
+    def find_blob(self):
+        blob = self.blobs.get(self.path.split("?")[0])
+        if blob is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.send_header("x-ms-error-code", "BlobNotFound")
+            self.end_headers()
+        return blob
+
+    def do_HEAD(self):
+        blob = self.find_blob()
+        if blob is None:
+            return
+        body, encoding = blob
+        self.send_response(200)
+        self.send_blob_headers(encoding, len(body))
+        self.end_headers()
+
+    def do_GET(self):
+        if "comp=blocklist" in self.path:
+            # no blocks were staged by an earlier, interrupted upload
+            self.path = "/missing"
+        blob = self.find_blob()
+        if blob is None:
+            return
+        body, encoding = blob
+        start, end = 0, len(body) - 1
+        status = 200
+        requested = self.headers.get("x-ms-range") or self.headers.get("Range")
+        if requested:
+            match = re.match(r"bytes=(\d+)-(\d*)", requested)
+            start = int(match.group(1))
+            end = min(int(match.group(2) or end), end)
+            status = 206
+        self.send_response(status)
+        self.send_blob_headers(encoding, end - start + 1)
+        self.send_header("Content-Range", f"bytes {start}-{end}/{len(body)}")
+        self.end_headers()
+        self.wfile.write(body[start : end + 1])
+
+
+class TestCompression(unittest.TestCase):
+    """package compression testing"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.content = b"timestamp,value\n" + b"1660000000,42.0\n" * 1000
+        self.file_path = os.path.join(self.tmp_dir.name, "telemetry.csv")
+        with open(self.file_path, "wb") as file:
+            file.write(self.content)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_should_compress(self):
+        self.assertTrue(should_compress("text/csv", 2048, 1024))
+        self.assertTrue(should_compress("application/octet-stream", 2048, 1024))
+        self.assertFalse(should_compress("text/csv", 512, 1024))
+        self.assertFalse(should_compress("image/png", 2048, 1024))
+        self.assertFalse(should_compress("application/zip", 2048, 1024))
+
+    def test_is_compressed(self):
+        self.assertTrue(is_compressed("gzip"))
+        self.assertFalse(is_compressed(None))
+        self.assertFalse(is_compressed("br"))
+
+    def round_trip(self, compression):
+        compressed = compress_file(self.file_path, compression)
+        try:
+            self.assertLess(os.path.getsize(compressed), len(self.content))
+            decompress_file(compressed, compression)
+            with open(compressed, "rb") as file:
+                self.assertEqual(file.read(), self.content)
+        finally:
+            os.remove(compressed)
+
+    def test_gzip_round_trip(self):
+        self.round_trip(CompressionType.GZIP)
+
+    @unittest.skipIf(zstandard is None, "zstandard is not installed")
+    def test_zstd_round_trip(self):
+        self.round_trip(CompressionType.ZSTD)
+
+    def test_unsupported_compression(self):
+        with self.assertRaises(Exception):
+            compress_file(self.file_path, "br")
+
+
+class TestCompressedRoundTrip(unittest.TestCase):
+    """compressed uploads and downloads through a real transport"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), FakeBlobHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        # random text compresses to more than one small range
+        self.content = os.urandom(32 * 1024).hex().encode()
+        self.file_path = os.path.join(self.tmp_dir.name, "telemetry.csv")
+        with open(self.file_path, "wb") as file:
+            file.write(self.content)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def client_kwargs(self):
+        return dict(
+            credential_type=CredentialType.ACCOUNT_KEY,
+            location_type=LocationType.EDGE_BASED,
+            account_name="myStorageAccount",
+            credential=base64.b64encode(b"myAccountKey").decode(),
+            host="127.0.0.1",
+            port=str(self.server.server_port),
+            max_chunk_size=4096,
+            raise_errors=True,
+        )
+
+    def read_download(self, name):
+        with open(os.path.join(self.tmp_dir.name, name), "rb") as file:
+            return file.read()
+
+    def test_sync_round_trip(self):
+        storage_client = IoTStorageClient(**self.client_kwargs())
+        self.assertTrue(
+            storage_client.upload_file(
+                "test",
+                self.file_path,
+                "sync.csv",
+                content_type="text/csv",
+                compression=CompressionType.GZIP,
+            )
+        )
+        for name, kwargs in (
+            ("whole.csv", {}),
+            ("chunked.csv", {"max_concurrency": 2}),
+            ("resumed.csv", {"resumable": True, "range_size": 4096}),
+        ):
+            dest = os.path.join(self.tmp_dir.name, name)
+            self.assertTrue(
+                storage_client.download_file("test", "sync.csv", dest, **kwargs)
+            )
+            self.assertEqual(self.read_download(name), self.content)
+        storage_client.close()
+
+    def test_async_round_trip(self):
+        async def round_trip():
+            async with IoTStorageClientAsync(**self.client_kwargs()) as client:
+                self.assertTrue(
+                    await client.upload_file(
+                        "test",
+                        self.file_path,
+                        "async.csv",
+                        content_type="text/csv",
+                        compression=CompressionType.GZIP,
+                    )
+                )
+                for name, kwargs in (
+                    ("whole.csv", {}),
+                    ("resumed.csv", {"resumable": True, "range_size": 4096}),
+                ):
+                    dest = os.path.join(self.tmp_dir.name, name)
+                    self.assertTrue(
+                        await client.download_file("test", "async.csv", dest, **kwargs)
+                    )
+                    self.assertEqual(self.read_download(name), self.content)
+
+        asyncio.run(round_trip())
+
+
+if __name__ == "__main__":
+    unittest.main()
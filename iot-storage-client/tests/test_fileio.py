@@ -0,0 +1,29 @@
+import os
+import tempfile
+import unittest
+
+from iot.storage.client._fileio import allocate_file, read_at, read_file, write_at
+
+
+class TestFileIO(unittest.TestCase):
+    """package file io helper testing"""
+
+    def test_allocate_and_write_at(self):
+        with tempfile.TemporaryDirectory() as dest:
+            file_path = os.path.join(dest, "nested", "blob.bin")
+            allocate_file(file_path, 10)
+            write_at(file_path, 6, b"6789")
+            write_at(file_path, 0, b"012345")
+            self.assertEqual(read_file(file_path), b"0123456789")
+
+    def test_read_at(self):
+        with tempfile.TemporaryDirectory() as source:
+            file_path = os.path.join(source, "blob.bin")
+            with open(file_path, "wb") as file:
+                file.write(b"0123456789")
+            self.assertEqual(read_at(file_path, 4, 3), b"456")
+            self.assertEqual(read_at(file_path, 8, 4), b"89")
+
+
+if __name__ == "__main__":
+    unittest.main()
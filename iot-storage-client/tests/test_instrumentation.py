@@ -0,0 +1,138 @@
+import asyncio
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from azure.core.exceptions import ResourceNotFoundError
+
+from iot.storage.client import (
+    CallbackInstrumentation,
+    IoTStorageClient,
+    MetricsRecorder,
+    OpenTelemetryInstrumentation,
+)
+from iot.storage.client._instrumentation import (
+    count_transfer,
+    current_operation,
+    instrumented,
+    submit,
+)
+
+
+class FakeClient:
+    def __init__(self, instrumentation=None):
+        self.instrumentation = instrumentation
+
+    @instrumented
+    def upload_dir(self, container_name, count):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = [
+                submit(executor, self.upload_file, container_name) for _ in range(count)
+            ]
+        return all(future.result() for future in futures)
+
+    @instrumented
+    def upload_file(self, container_name):
+        record = current_operation()
+        if record is not None:
+            record.add(bytes_out=10)
+        return True
+
+    @instrumented
+    async def download_file(self, container_name):
+        await asyncio.gather(*[self.read() for _ in range(3)])
+        return True
+
+    async def read(self):
+        record = current_operation()
+        if record is not None:
+            record.add(bytes_in=5)
+
+
+def fake_response(method, request_length=None, response_length=None):
+    response = mock.MagicMock()
+    response.http_request.method = method
+    response.http_request.headers = (
+        {"Content-Length": str(request_length)} if request_length else {}
+    )
+    response.http_response.headers = (
+        {"Content-Length": str(response_length)} if response_length else {}
+    )
+    return response
+
+
+class TestInstrumentation(unittest.TestCase):
+    """package instrumentation testing"""
+
+    def test_disabled(self):
+        self.assertEqual(FakeClient().upload_dir("test", 2), True)
+        self.assertIsNone(current_operation())
+
+    def test_outer_operation_collects_nested_calls(self):
+        records = []
+        client = FakeClient(CallbackInstrumentation(records.append))
+        self.assertEqual(client.upload_dir("test", 3), True)
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0].operation, "upload_dir")
+        self.assertEqual(records[0].container_name, "test")
+        self.assertEqual(records[0].bytes_out, 30)
+        self.assertGreater(records[0].duration, 0)
+
+    def test_async_operation(self):
+        recorder = MetricsRecorder()
+        client = FakeClient(recorder)
+        self.assertEqual(asyncio.run(client.download_file(container_name="logs")), True)
+        snapshot = recorder.snapshot()
+        self.assertEqual(snapshot["in_flight"], 0)
+        self.assertEqual(snapshot["operations"][0]["bytes_in"], 15)
+        self.assertEqual(snapshot["operations"][0]["container"], "logs")
+
+    def test_count_transfer(self):
+        records = []
+        client = FakeClient(CallbackInstrumentation(records.append))
+
+        def transfer(self, container_name):
+            count_transfer(fake_response("PUT", request_length=100))
+            count_transfer(fake_response("GET", response_length=40))
+            count_transfer(fake_response("HEAD", response_length=1000))
+            return True
+
+        with mock.patch.object(FakeClient, "upload_file", instrumented(transfer)):
+            client.upload_file("test")
+        self.assertEqual((records[0].bytes_in, records[0].bytes_out), (40, 100))
+        # nothing is recorded outside an operation
+        count_transfer(fake_response("GET", response_length=40))
+
+    def test_open_telemetry(self):
+        meter = mock.MagicMock()
+        client = FakeClient(OpenTelemetryInstrumentation(meter))
+        client.upload_file("test")
+        counter = meter.create_counter.return_value
+        counter.add.assert_called_with(
+            10, attributes={"operation": "upload_file", "container": "test"}
+        )
+        meter.create_histogram.return_value.record.assert_called_once()
+        in_flight = meter.create_up_down_counter.return_value
+        self.assertEqual([c.args[0] for c in in_flight.add.call_args_list], [1, -1])
+
+    @mock.patch("iot.storage.client._client.BlobServiceClient")
+    def test_client_error_counters(self, mock_BlobServiceClient):
+        recorder = MetricsRecorder()
+        storage_client = IoTStorageClient(
+            credential_type="ACCOUNT_KEY",
+            location_type="CLOUD_BASED",
+            account_name="myStorageAccount",
+            credential="myAccountKey",
+            instrumentation=recorder,
+        )
+        container_client = storage_client.service_client.get_container_client
+        container_client.return_value.delete_blob.side_effect = ResourceNotFoundError()
+        self.assertEqual(storage_client.delete_file("test", "missing.txt"), False)
+        snapshot = recorder.snapshot()
+        self.assertEqual(snapshot["errors"], {"NotFoundError": 1})
+        self.assertEqual(snapshot["operations"][0]["operation"], "delete_file")
+        self.assertEqual(snapshot["operations"][0]["errors"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+
+from iot.storage.client._listing import BlobTree, merge_listings
+
+
+class TestBlobTree(unittest.TestCase):
+    """package listing index testing"""
+
+    def setUp(self):
+        self.index = BlobTree(
+            [
+                "a.txt",
+                "logs/2022/12/13/b.txt",
+                "logs/2022/12/14/c.txt",
+                "logs/d.txt",
+                "video/e.mp4",
+            ]
+        )
+
+    def test_repr(self):
+        repr_str = self.index.__repr__()
+        self.assertIsNotNone(repr_str)
+
+    def test_files(self):
+        self.assertEqual(self.index.files(), ["a.txt"])
+        self.assertEqual(
+            self.index.files(recursive=True),
+            [
+                "a.txt",
+                "logs/d.txt",
+                "logs/2022/12/13/b.txt",
+                "logs/2022/12/14/c.txt",
+                "video/e.mp4",
+            ],
+        )
+
+    def test_dirs(self):
+        self.assertEqual(self.index.dirs(), ["logs", "video"])
+        self.assertEqual(
+            self.index.dirs(recursive=True),
+            [
+                "logs",
+                "logs/2022",
+                "logs/2022/12",
+                "logs/2022/12/13",
+                "logs/2022/12/14",
+                "video",
+            ],
+        )
+
+    def test_empty(self):
+        index = BlobTree()
+        index.add("")
+        self.assertEqual(index.files(recursive=True), [])
+        self.assertEqual(index.dirs(recursive=True), [])
+
+    def test_merge_listings(self):
+        self.assertEqual(
+            merge_listings([["a.txt", "logs/d.txt"], ["logs/2022/b.txt"], ["a.txt"]]),
+            ["a.txt", "logs/2022/b.txt", "logs/d.txt"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from iot.storage.client._poller import CopyPoller
+
+
+def fake_blob_client(*statuses):
+    blob_client = mock.MagicMock()
+    blob_client.get_blob_properties = mock.AsyncMock(
+        side_effect=[mock.MagicMock(**{"copy.status": status}) for status in statuses]
+    )
+    return blob_client
+
+
+class TestCopyPoller(unittest.TestCase):
+    """package copy poller testing"""
+
+    def test_repr(self):
+        repr_str = CopyPoller().__repr__()
+        self.assertIsNotNone(repr_str)
+
+    def test_track_many(self):
+        poller = CopyPoller(initial_delay=0.01, max_delay=0.02)
+        fast = fake_blob_client("success")
+        slow = fake_blob_client("pending", "pending", "failed")
+
+        async def run():
+            return await asyncio.gather(
+                poller.track(fast, timeout=5), poller.track(slow, timeout=5)
+            )
+
+        self.assertEqual(asyncio.run(run()), ["success", "failed"])
+        self.assertEqual(fast.get_blob_properties.await_count, 1)
+        self.assertEqual(slow.get_blob_properties.await_count, 3)
+
+    def test_track_timeout(self):
+        poller = CopyPoller(initial_delay=0.01, max_delay=0.01)
+        blob_client = fake_blob_client(*["pending"] * 100)
+
+        async def run():
+            return await poller.track(blob_client, timeout=0.05)
+
+        self.assertEqual(asyncio.run(run()), "pending")
+
+    def test_track_error(self):
+        poller = CopyPoller(initial_delay=0.01)
+        blob_client = mock.MagicMock()
+        blob_client.get_blob_properties = mock.AsyncMock(side_effect=Exception("gone"))
+
+        async def run():
+            return await poller.track(blob_client, timeout=5)
+
+        with self.assertRaises(Exception):
+            asyncio.run(run())
+
+    def test_track_across_event_loops(self):
+        poller = CopyPoller(initial_delay=0.01)
+        stale = fake_blob_client(*["pending"] * 100)
+        fresh = fake_blob_client("success")
+
+        async def abandon():
+            poller.track(stale, timeout=60)
+
+        # leave the poller's task suspended on a loop that is no longer run
+        first_loop = asyncio.new_event_loop()
+        try:
+            first_loop.run_until_complete(abandon())
+
+            async def run():
+                return await asyncio.wait_for(poller.track(fresh, timeout=5), 1)
+
+            self.assertEqual(asyncio.run(run()), "success")
+            stale.get_blob_properties.assert_not_awaited()
+        finally:
+            first_loop.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
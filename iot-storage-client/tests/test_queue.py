@@ -0,0 +1,131 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from iot.storage.client import NotFoundError, UploadQueue
+
+
+class TestUploadQueue(unittest.TestCase):
+    """package upload queue testing"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp_dir.name, "queue.db")
+        self.file_path = os.path.join(self.tmp_dir.name, "reading.json")
+        with open(self.file_path, "w") as file:
+            file.write("{}")
+        self.storage_client = mock.MagicMock()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_repr(self):
+        queue = UploadQueue(self.storage_client, self.db_path)
+        self.assertIsNotNone(queue.__repr__())
+        queue.close()
+
+    def test_put_persists(self):
+        queue = UploadQueue(self.storage_client, self.db_path)
+        queue.put("test", self.file_path, "a.json")
+        queue.put("test", self.file_path, "b.json")
+        queue.close()
+
+        reopened = UploadQueue(self.storage_client, self.db_path)
+        self.assertEqual(reopened.depth(), 2)
+        self.assertGreaterEqual(reopened.lag(), 0.0)
+        reopened.close()
+
+    def test_drain_by_priority(self):
+        self.storage_client.upload_file.return_value = True
+        queue = UploadQueue(self.storage_client, self.db_path, max_concurrency=1)
+        queue.put("test", self.file_path, "low.json")
+        queue.put("test", self.file_path, "high.json", priority=10)
+        queue.put("test", os.path.join(self.tmp_dir.name, "gone.json"), "gone.json")
+        with queue:
+            self.assertTrue(queue.join(timeout=5))
+        dests = [
+            call.args[2] for call in self.storage_client.upload_file.call_args_list
+        ]
+        self.assertEqual(dests, ["high.json", "low.json"])
+        self.assertEqual(queue.metrics()["uploaded"], 2)
+        self.assertEqual(queue.metrics()["dropped"], 1)
+        queue.close()
+
+    def test_retry_with_backoff(self):
+        self.storage_client.upload_file.side_effect = [False, True]
+        queue = UploadQueue(
+            self.storage_client, self.db_path, initial_backoff=0.01, max_backoff=0.02
+        )
+        queue.put("test", self.file_path, "a.json")
+        with queue:
+            self.assertTrue(queue.join(timeout=5))
+        self.assertEqual(self.storage_client.upload_file.call_count, 2)
+        self.assertEqual(queue.metrics()["retried"], 1)
+        self.assertEqual(queue.metrics()["depth"], 0)
+        queue.close()
+
+    def test_dead_letter_permanent_error(self):
+        self.storage_client.upload_file.side_effect = NotFoundError("no container")
+        queue = UploadQueue(self.storage_client, self.db_path)
+        queue.put("test", self.file_path, "a.json")
+        with queue:
+            self.assertTrue(queue.join(timeout=5))
+        self.assertEqual(self.storage_client.upload_file.call_count, 1)
+        self.assertEqual(queue.metrics()["dead"], 1)
+        dead = queue.dead_letters()
+        self.assertEqual(len(dead), 1)
+        self.assertEqual(dead[0]["dest"], "a.json")
+        self.assertEqual(dead[0]["error"], "no container")
+
+        self.storage_client.upload_file.side_effect = None
+        self.storage_client.upload_file.return_value = True
+        self.assertEqual(queue.retry_dead(), 1)
+        self.assertEqual(queue.dead_letters(), [])
+        with queue:
+            self.assertTrue(queue.join(timeout=5))
+        self.assertEqual(queue.metrics()["uploaded"], 1)
+        queue.close()
+
+    def test_dead_letter_max_attempts(self):
+        self.storage_client.upload_file.return_value = False
+        queue = UploadQueue(
+            self.storage_client,
+            self.db_path,
+            initial_backoff=0.01,
+            max_backoff=0.02,
+            max_attempts=3,
+        )
+        queue.put("test", self.file_path, "a.json")
+        with queue:
+            self.assertTrue(queue.join(timeout=5))
+        self.assertEqual(self.storage_client.upload_file.call_count, 3)
+        self.assertEqual(queue.metrics()["retried"], 2)
+        self.assertEqual(queue.dead_letters()[0]["attempts"], 3)
+        queue.close()
+
+    def test_unexpected_error_keeps_draining(self):
+        self.storage_client.upload_file.side_effect = [ValueError("boom"), True]
+        queue = UploadQueue(
+            self.storage_client, self.db_path, initial_backoff=0.01, max_backoff=0.02
+        )
+        queue.put("test", self.file_path, "a.json")
+        with queue:
+            self.assertTrue(queue.join(timeout=5))
+            self.assertTrue(queue._thread.is_alive())
+        self.assertEqual(queue.metrics()["uploaded"], 1)
+        queue.close()
+
+    def test_backoff_capped(self):
+        self.storage_client.upload_file.return_value = False
+        queue = UploadQueue(self.storage_client, self.db_path, max_backoff=60.0)
+        queue.put("test", self.file_path, "a.json")
+        job = queue._claim()[0][0]
+        job = job[:-1] + (5000,)
+        self.assertFalse(queue._upload(job))
+        self.assertEqual(queue.metrics()["retried"], 1)
+        queue.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+from unittest import mock
+
+from iot.storage.client import ClientRegistry, IoTStorageClient, client_registry
+from iot.storage.client._registry import registry_key
+
+
+class TestClientRegistry(unittest.TestCase):
+    """package client registry testing"""
+
+    def test_repr(self):
+        repr_str = ClientRegistry().__repr__()
+        self.assertIsNotNone(repr_str)
+
+    def test_registry_key_hashes_credential(self):
+        key = registry_key("ACCOUNT_KEY", "CLOUD_BASED", "account", "secret")
+        self.assertNotIn("secret", key)
+        self.assertNotEqual(
+            key, registry_key("ACCOUNT_KEY", "CLOUD_BASED", "account", "other")
+        )
+
+    def test_acquire_shares_and_evicts_idle(self):
+        registry = ClientRegistry(idle_timeout=0)
+        factory = mock.MagicMock(side_effect=lambda: mock.MagicMock())
+        first = registry.acquire("key", factory)
+        second = registry.acquire("key", factory)
+        self.assertIs(first, second)
+        self.assertEqual(factory.call_count, 1)
+
+        registry.release("key")
+        self.assertEqual(len(registry), 1)
+        first.close.assert_not_called()
+        registry.release("key")
+        self.assertEqual(len(registry), 0)
+        first.close.assert_called_once()
+
+    def test_close_all(self):
+        registry = ClientRegistry()
+        service_client = registry.acquire("key", mock.MagicMock)
+        self.assertEqual(registry.close("missing"), False)
+        registry.close_all()
+        self.assertEqual(len(registry), 0)
+        service_client.close.assert_called_once()
+
+    def test_close_borrowed(self):
+        registry = ClientRegistry()
+        service_client = registry.acquire("key", mock.MagicMock)
+        with self.assertRaises(RuntimeError):
+            registry.close("key")
+        self.assertEqual(len(registry), 1)
+        service_client.close.assert_not_called()
+
+        registry.release("key")
+        self.assertEqual(registry.close("key"), True)
+        self.assertEqual(len(registry), 0)
+        service_client.close.assert_called_once()
+
+    @mock.patch("iot.storage.client._client.BlobServiceClient")
+    def test_shared_client(self, mock_BlobServiceClient):
+        mock_BlobServiceClient.from_connection_string.side_effect = (
+            lambda *args, **kwargs: mock.MagicMock()
+        )
+        params = dict(
+            credential_type="ACCOUNT_KEY",
+            location_type="CLOUD_BASED",
+            account_name="myStorageAccount",
+            credential="myAccountKey",
+            shared_client=True,
+        )
+        first = IoTStorageClient(**params)
+        second = IoTStorageClient(**params)
+        unshared = IoTStorageClient(**{**params, "shared_client": False})
+        self.assertIs(first.service_client, second.service_client)
+        self.assertIsNot(first.service_client, unshared.service_client)
+
+        first.close()
+        second.close()
+        client_registry.close_all()
+        first.service_client.close.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,228 @@
+import asyncio
+import io
+import unittest
+from unittest import mock
+
+import requests
+import urllib3
+
+from azure.core.exceptions import (
+    HttpResponseError,
+    ResourceNotFoundError,
+    ServiceRequestError,
+)
+from azure.core.pipeline import PipelineContext, PipelineRequest, PipelineResponse
+from azure.core.pipeline.transport import AsyncHttpTransport, RequestsTransport
+from azure.core.rest import HttpRequest
+from azure.storage.blob import BlobServiceClient
+from azure.storage.blob.aio import BlobServiceClient as AsyncBlobServiceClient
+
+from iot.storage.client import (
+    CircuitOpenError,
+    IoTStorageClient,
+    NotFoundError,
+    RetryPolicy,
+    ThrottledError,
+    TransientError,
+)
+from iot.storage.client._exceptions import classify_error, retry_after_seconds
+
+AZURITE_CONNECTION_STRING = (
+    "DefaultEndpointsProtocol=http;AccountName=devstoreaccount1;"
+    "AccountKey=Eby8vdM02xNOcqFlqUwJPLlmEtlCDXJ1OUzFT50uSRZ6IFsuFq2UVErCz4I6tq/"
+    "K1SZFPTOtr/KBHBeksoGMGw==;"
+    "BlobEndpoint=http://127.0.0.1:10000/devstoreaccount1;"
+)
+
+
+def requests_session():
+    """a requests session that rejects keyword arguments requests doesn't take"""
+    session = mock.create_autospec(requests.Session, instance=True)
+
+    def request(method, url, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response.headers["Content-Length"] = "0"
+        response.raw = urllib3.HTTPResponse(
+            body=io.BytesIO(b""), status=200, preload_content=False
+        )
+        response.url = url
+        response.request = requests.Request(method, url).prepare()
+        return response
+
+    session.request.side_effect = request
+    return session
+
+
+class RecordingAsyncTransport(AsyncHttpTransport):
+    """an async transport recording the options it is sent, then failing"""
+
+    def __init__(self):
+        self.options = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    async def open(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def send(self, request, **kwargs):
+        self.options.append(kwargs)
+        raise ServiceRequestError("offline")
+
+
+def pipeline_request():
+    request = HttpRequest("GET", "https://account.blob.core.windows.net/test/blob")
+    return PipelineRequest(request, PipelineContext(None))
+
+
+def pipeline_response(request, status_code, headers=None):
+    http_response = mock.MagicMock(status_code=status_code, headers=headers or {})
+    return PipelineResponse(request.http_request, http_response, request.context)
+
+
+def responder(*steps):
+    """a fake next policy returning or raising each step in turn"""
+
+    def send(request):
+        step = steps[len(send.calls)]
+        send.calls.append(step)
+        if isinstance(step, Exception):
+            raise step
+        return pipeline_response(request, *step)
+
+    send.calls = []
+    return send
+
+
+class TestRetryPolicy(unittest.TestCase):
+    """package retry policy testing"""
+
+    @mock.patch("iot.storage.client._retry.time.sleep")
+    def test_honours_retry_after(self, mock_sleep):
+        policy = RetryPolicy(max_retries=3).pipeline_policy()
+        policy.next = mock.MagicMock()
+        policy.next.send.side_effect = responder(
+            (503, {"Retry-After": "2"}), (429, {"Retry-After": "120"}), (200,)
+        )
+        response = policy.send(pipeline_request())
+        self.assertEqual(response.http_response.status_code, 200)
+        # the second wait is capped at max_retry_after
+        self.assertEqual([c.args[0] for c in mock_sleep.call_args_list], [2.0, 60.0])
+
+    @mock.patch("iot.storage.client._retry.time.sleep")
+    def test_jittered_backoff_until_exhausted(self, mock_sleep):
+        retry = RetryPolicy(max_retries=2, initial_backoff=1.0)
+        policy = retry.pipeline_policy()
+        policy.next = mock.MagicMock()
+        policy.next.send.side_effect = responder(
+            ServiceRequestError("down"), (500,), (500,)
+        )
+        response = policy.send(pipeline_request())
+        self.assertEqual(response.http_response.status_code, 500)
+        delays = [c.args[0] for c in mock_sleep.call_args_list]
+        self.assertEqual(len(delays), 2)
+        self.assertTrue(0 <= delays[0] <= 1.0 and 0 <= delays[1] <= 2.0)
+
+    def test_circuit_opens_per_endpoint(self):
+        retry = RetryPolicy(max_retries=0, failure_threshold=2, recovery_time=60)
+        policy = retry.pipeline_policy()
+        policy.next = mock.MagicMock()
+        policy.next.send.side_effect = lambda r: pipeline_response(r, 503)
+        for _ in range(2):
+            policy.send(pipeline_request())
+        with self.assertRaises(CircuitOpenError) as context:
+            policy.send(pipeline_request())
+        self.assertGreater(context.exception.retry_after, 0)
+        self.assertEqual(retry.open_endpoints(), ["account.blob.core.windows.net"])
+        self.assertTrue(retry.allow("other.blob.core.windows.net"))
+
+    def test_circuit_closes_after_trial_request(self):
+        retry = RetryPolicy(failure_threshold=1, recovery_time=0)
+        retry.record_failure("edge")
+        self.assertTrue(retry.allow("edge"))
+        retry.record_success("edge")
+        self.assertEqual(retry.open_endpoints(), [])
+
+    @mock.patch("iot.storage.client._retry.asyncio.sleep")
+    def test_async_policy(self, mock_sleep):
+        policy = RetryPolicy().async_pipeline_policy()
+        send = responder((503, {"retry-after-ms": "1500"}), (201,))
+
+        async def next_send(request):
+            return send(request)
+
+        policy.next = mock.MagicMock()
+        policy.next.send = next_send
+        response = asyncio.run(policy.send(pipeline_request()))
+        self.assertEqual(response.http_response.status_code, 201)
+        mock_sleep.assert_awaited_once_with(1.5)
+
+    def test_sdk_pipeline(self):
+        session = requests_session()
+        service_client = BlobServiceClient.from_connection_string(
+            AZURITE_CONNECTION_STRING,
+            transport=RequestsTransport(session=session),
+            retry_policy=RetryPolicy().pipeline_policy(),
+        )
+        self.assertTrue(service_client.get_container_client("test").exists())
+        self.assertNotIn("hosts", session.request.call_args.kwargs)
+
+    def test_async_sdk_pipeline(self):
+        transport = RecordingAsyncTransport()
+        service_client = AsyncBlobServiceClient.from_connection_string(
+            AZURITE_CONNECTION_STRING,
+            transport=transport,
+            retry_policy=RetryPolicy(max_retries=0).async_pipeline_policy(),
+        )
+        with self.assertRaises(ServiceRequestError):
+            asyncio.run(service_client.get_container_client("test").exists())
+        self.assertNotIn("hosts", transport.options[0])
+        self.assertNotIn("retry_total", transport.options[0])
+
+
+class TestErrors(unittest.TestCase):
+    """package typed error testing"""
+
+    def test_classify_error(self):
+        throttled = HttpResponseError("busy")
+        throttled.status_code = 503
+        throttled.response = mock.MagicMock(headers={"Retry-After": "5"})
+        error = classify_error(throttled)
+        self.assertIsInstance(error, ThrottledError)
+        self.assertTrue(error.retryable)
+        self.assertEqual(error.retry_after, 5.0)
+        self.assertIsInstance(classify_error(ResourceNotFoundError()), NotFoundError)
+        self.assertIsInstance(classify_error(ServiceRequestError("x")), TransientError)
+        self.assertFalse(classify_error(ValueError("bad")).retryable)
+
+    def test_retry_after_http_date(self):
+        self.assertEqual(
+            retry_after_seconds({"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"}), 0.0
+        )
+        self.assertIsNone(retry_after_seconds({}))
+
+    @mock.patch("iot.storage.client._client.BlobServiceClient")
+    def test_client_raise_errors(self, mock_BlobServiceClient):
+        storage_client = IoTStorageClient(
+            credential_type="ACCOUNT_KEY",
+            location_type="CLOUD_BASED",
+            account_name="myStorageAccount",
+            credential="myAccountKey",
+            raise_errors=True,
+        )
+        delete_blob = mock.MagicMock(side_effect=ResourceNotFoundError("missing"))
+        container_client = storage_client.service_client.get_container_client
+        container_client.return_value.delete_blob = delete_blob
+        with self.assertRaises(NotFoundError):
+            storage_client.delete_file("test", "missing.txt")
+
+
+if __name__ == "__main__":
+    unittest.main()
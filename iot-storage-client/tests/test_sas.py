@@ -0,0 +1,54 @@
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+from iot.storage.client._sas import SasTokenCache, sas_expiry
+
+
+class TestSasTokenCache(unittest.TestCase):
+    """package sas token cache testing"""
+
+    def test_reuses_token_until_refresh_margin(self):
+        cache = SasTokenCache(refresh_margin=60.0)
+        sign = mock.MagicMock(side_effect=["token1", "token2"])
+        key = ("test", "file.txt", "r", None, None)
+        with mock.patch("iot.storage.client._sas.time.monotonic", return_value=0.0):
+            self.assertEqual(cache.get_or_create(key, None, sign), "token1")
+            self.assertEqual(cache.get_or_create(key, None, sign), "token1")
+        # the default 15 minute token is refreshed a minute before it expires
+        with mock.patch("iot.storage.client._sas.time.monotonic", return_value=850.0):
+            self.assertEqual(cache.get_or_create(key, None, sign), "token2")
+        self.assertEqual(sign.call_count, 2)
+
+    def test_keys_are_separate(self):
+        cache = SasTokenCache()
+        sign = mock.MagicMock(side_effect=["token1", "token2"])
+        self.assertEqual(cache.get_or_create(("test", None, "r"), None, sign), "token1")
+        self.assertEqual(
+            cache.get_or_create(("test", None, "rw"), None, sign), "token2"
+        )
+        self.assertEqual(len(cache), 2)
+
+    def test_string_expiry_not_cached(self):
+        cache = SasTokenCache()
+        sign = mock.MagicMock(return_value="token")
+        cache.get_or_create(("test", None, "r"), "2030-01-01T00:00:00Z", sign)
+        sign.assert_called_once_with("2030-01-01T00:00:00Z")
+        self.assertEqual(len(cache), 0)
+
+    def test_evicts_least_recently_used(self):
+        cache = SasTokenCache(max_entries=2)
+        expiry = datetime.utcnow() + timedelta(hours=1)
+        for name in ("a", "b", "c"):
+            cache.put(name, name, expiry)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("c"), "c")
+
+    def test_sas_expiry_computed_per_call(self):
+        before = datetime.utcnow()
+        self.assertGreaterEqual(sas_expiry(), before + timedelta(minutes=15))
+        self.assertEqual(sas_expiry("2030-01-01"), "2030-01-01")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import hashlib
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from iot.storage.client import SyncDirection
+from iot.storage.client._sync import SyncManifest, is_unchanged, pair_paths
+
+
+def fake_blob(name, content, md5=True, etag="etag", age=0):
+    blob = mock.MagicMock(
+        size=len(content),
+        etag=etag,
+        last_modified=datetime.now(timezone.utc) + timedelta(seconds=age),
+    )
+    blob.name = name
+    blob.content_settings.content_md5 = (
+        bytearray(hashlib.md5(content).digest()) if md5 else None
+    )
+    return blob
+
+
+class TestSync(unittest.TestCase):
+    """package directory sync testing"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.tmp_dir.name, "a.txt")
+        with open(self.file_path, "wb") as file:
+            file.write(b"data")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_manifest_round_trip(self):
+        manifest_path = os.path.join(self.tmp_dir.name, "manifest.json")
+        manifest = SyncManifest(manifest_path)
+        manifest.record("dir/a.txt", self.file_path, "etag")
+        manifest.save()
+
+        loaded = SyncManifest(manifest_path)
+        self.assertTrue(loaded.is_current("dir/a.txt", self.file_path, "etag"))
+        self.assertFalse(loaded.is_current("dir/a.txt", self.file_path, "changed"))
+        loaded.forget("dir/a.txt")
+        self.assertFalse(loaded.is_current("dir/a.txt", self.file_path, "etag"))
+
+    def test_is_unchanged(self):
+        manifest = SyncManifest()
+        upload = SyncDirection.UPLOAD
+        self.assertTrue(
+            is_unchanged(
+                "a.txt", self.file_path, fake_blob("a.txt", b"data"), manifest, upload
+            )
+        )
+        self.assertFalse(
+            is_unchanged(
+                "a.txt", self.file_path, fake_blob("a.txt", b"diff"), manifest, upload
+            )
+        )
+        self.assertFalse(
+            is_unchanged(
+                "a.txt", self.file_path, fake_blob("a.txt", b"longer"), manifest, upload
+            )
+        )
+        # without an md5 the newer side wins
+        older = fake_blob("a.txt", b"data", md5=False, age=-3600)
+        self.assertFalse(is_unchanged("a.txt", self.file_path, older, manifest, upload))
+        self.assertTrue(
+            is_unchanged(
+                "a.txt", self.file_path, older, manifest, SyncDirection.DOWNLOAD
+            )
+        )
+
+    def test_pair_paths(self):
+        local_dir = self.tmp_dir.name
+        pairs, orphans = pair_paths(
+            local_dir, "dir", ["dir/a.txt", "dir/b.txt"], SyncDirection.UPLOAD
+        )
+        self.assertEqual(pairs, {"dir/a.txt": self.file_path})
+        self.assertEqual(list(orphans), ["dir/b.txt"])
+
+        pairs, orphans = pair_paths(
+            local_dir, "dir", ["dir/sub/b.txt"], SyncDirection.DOWNLOAD
+        )
+        self.assertEqual(
+            pairs, {"dir/sub/b.txt": os.path.join(local_dir, "sub", "b.txt")}
+        )
+        self.assertEqual(orphans, {"dir/a.txt": self.file_path})
+
+
+if __name__ == "__main__":
+    unittest.main()